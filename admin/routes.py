@@ -1,18 +1,38 @@
 import re
-from datetime import datetime
+from datetime import datetime, timezone
+from os import getenv
+from typing import Optional
 
-from fastapi import APIRouter, Request, Depends, Form
-from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Request, Depends, Form, HTTPException
+from fastapi.responses import JSONResponse, RedirectResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.orm import Session, load_only, selectinload, undefer
+from sqlalchemy import func, select
 
+import db_utils.database as database
 from db_utils.database import SessionLocal
-from db_utils.models import Post, Tag, post_tags
+from db_utils.content_version import bump_content_version
+from db_utils.models import POST_LIST_COLUMNS, Post, Tag, post_tags
+from db_utils.pagination import paginate_posts
+from db_utils.pool import pool_stats
+from db_utils.replicas import pin_reads_to_primary
+from db_utils.slugs import assign_unique_slug
+from db_utils.snapshot import snapshots
+from db_utils.tags import sync_tags
+from http_utils.scanner_guard import scanner_guard
+from cache_utils.backends import shared_cache
+from cache_utils.refill import refiller
+from render_utils.markdown import render_cache, render_post
+from render_utils import static_export
+from render_utils.streaming import render_timings
+from search_utils.typeahead import typeahead
 from admin.auth import require_admin, verify_csrf_token, generate_csrf_token
 
 
 router = APIRouter(prefix="/admin")
 
+ADMIN_POSTS_PER_PAGE = int(getenv("ADMIN_POSTS_PER_PAGE", "50"))
+
 
 def get_db():
     db = SessionLocal()
@@ -29,30 +49,33 @@ def slugify(text: str) -> str:
     return text
 
 
-def ensure_unique_slug(db: Session, slug: str, exclude_post_id: int = None) -> str:
-    candidate = slug
-    counter = 2
-    while True:
-        query = db.query(Post).filter(Post.slug == candidate)
-        if exclude_post_id is not None:
-            query = query.filter(Post.id != exclude_post_id)
-        if not query.first():
-            return candidate
-        candidate = f"{slug}-{counter}"
-        counter += 1
-
-
-def sync_tags(db: Session, post: Post, tags_input: str):
-    tag_names = [t.strip() for t in tags_input.split(",") if t.strip()]
-    tags = []
-    for name in tag_names:
-        tag = db.query(Tag).filter(Tag.name == name).first()
-        if not tag:
-            tag = Tag(name=name)
-            db.add(tag)
-            db.flush()
-        tags.append(tag)
-    post.tags = tags
+def _to_minute_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes and the form sends naive ones; both are UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(second=0, microsecond=0)
+
+
+def _publish_date_changed(stored: Optional[datetime], submitted: datetime) -> bool:
+    """The edit form shows the date to the minute: anything finer isn't a change."""
+    return stored is None or _to_minute_utc(stored) != _to_minute_utc(submitted)
+
+
+def _redirect_after_write(request: Request, url: str) -> RedirectResponse:
+    """
+    Redirect back to the admin page, rebuilding the static export afterwards
+    if enabled. With read replicas, the admin's public page views go to the
+    primary for a while so they show the write before the replicas catch up.
+    """
+    background = None
+    if static_export.EXPORT_DIR and static_export.EXPORT_ON_WRITE:
+        background = BackgroundTask(
+            static_export.export_site, request.app, static_export.EXPORT_DIR, static_export.SITE_URL
+        )
+    response = RedirectResponse(url=url, status_code=303, background=background)
+    if database.replicas:
+        pin_reads_to_primary(response, secure=request.url.scheme == "https")
+    return response
 
 
 # --- Dashboard ---
@@ -60,17 +83,55 @@ def sync_tags(db: Session, post: Post, tags_input: str):
 @router.get("/")
 def admin_dashboard(
     request: Request,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
     username: str = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
     templates = request.app.state.templates
-    posts = db.query(Post).order_by(Post.id.desc()).all()
+    statement = select(Post).options(load_only(*POST_LIST_COLUMNS), selectinload(Post.tags))
+    try:
+        page = paginate_posts(db, statement, ADMIN_POSTS_PER_PAGE, after=after, before=before)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid page cursor")
     csrf_token = generate_csrf_token(request)
     return templates.TemplateResponse("admin/dashboard.html", {
         "request": request,
         "username": username,
-        "posts": posts,
+        "posts": page.items,
+        "page": page,
         "csrf_token": csrf_token,
+        "static_export_enabled": bool(static_export.EXPORT_DIR),
+    })
+
+
+@router.post("/export")
+async def admin_export(
+    request: Request,
+    username: str = Depends(require_admin),
+    _csrf: None = Depends(verify_csrf_token),
+):
+    if static_export.EXPORT_DIR:
+        await static_export.export_site(request.app, static_export.EXPORT_DIR, static_export.SITE_URL)
+
+    return RedirectResponse(url="/admin/", status_code=303)
+
+
+# --- Metrics ---
+
+@router.get("/metrics")
+def admin_metrics(username: str = Depends(require_admin)):
+    return JSONResponse({
+        "render_cache": render_cache.stats(),
+        "render_timings": render_timings.stats(),
+        "db_pool": pool_stats(database.engine),
+        "db_pool_async": pool_stats(database.async_engine),
+        "db_replicas": database.replicas.stats(),
+        "content_snapshot": snapshots.stats(),
+        "typeahead": typeahead.stats(),
+        "shared_cache": shared_cache.stats(),
+        "cache_refills": refiller.stats(),
+        "scanner_guard": scanner_guard.stats(),
     })
 
 
@@ -107,24 +168,24 @@ async def admin_create_post(
 ):
     if not slug.strip():
         slug = slugify(meta_title or title)
-    slug = ensure_unique_slug(db, slug)
 
     post = Post(
         title=title,
         meta_title=meta_title.strip() or None,
-        slug=slug,
         summary=summary,
         post_content=post_content,
     )
     if publish_date.strip():
         post.publish_date = datetime.fromisoformat(publish_date)
 
+    render_post(post)
+    assign_unique_slug(db, post, slug)
     sync_tags(db, post, tags_input)
 
-    db.add(post)
+    bump_content_version(db)
     db.commit()
 
-    return RedirectResponse(url="/admin/", status_code=303)
+    return _redirect_after_write(request, "/admin/")
 
 
 @router.get("/posts/{post_id}/edit")
@@ -144,6 +205,8 @@ def admin_edit_post(
         "request": request,
         "username": username,
         "post": post,
+        # Shown and compared on save in UTC, to the minute
+        "publish_date": _to_minute_utc(post.publish_date).strftime("%Y-%m-%dT%H:%M") if post.publish_date else "",
         "csrf_token": csrf_token,
     })
 
@@ -163,26 +226,39 @@ async def admin_update_post(
     post_content: str = Form(...),
     publish_date: str = Form(""),
 ):
-    post = db.query(Post).filter(Post.id == post_id).first()
+    # Load the bodies so is_modified() below compares against their stored values
+    post = (
+        db.query(Post)
+        .options(undefer(Post.post_content), undefer(Post.content_html))
+        .filter(Post.id == post_id)
+        .first()
+    )
     if not post:
         return RedirectResponse(url="/admin/", status_code=303)
 
+    # Before any other change: a slug conflict retry expires unflushed state
+    slug_changed = bool(slug.strip()) and slug != post.slug
+    if slug_changed:
+        assign_unique_slug(db, post, slug)
+
     post.title = title
     post.meta_title = meta_title.strip() or None
-
-    if slug.strip() and slug != post.slug:
-        post.slug = ensure_unique_slug(db, slug, exclude_post_id=post.id)
-
     post.summary = summary
     post.post_content = post_content
+    render_post(post)
     if publish_date.strip():
-        post.publish_date = datetime.fromisoformat(publish_date)
+        submitted = datetime.fromisoformat(publish_date)
+        if _publish_date_changed(post.publish_date, submitted):
+            post.publish_date = submitted
 
-    sync_tags(db, post, tags_input)
+    tags_changed = sync_tags(db, post, tags_input)
 
-    db.commit()
+    # Re-saving an unchanged form writes nothing and keeps every cache warm
+    if slug_changed or tags_changed or db.is_modified(post):
+        bump_content_version(db)
+        db.commit()
 
-    return RedirectResponse(url="/admin/", status_code=303)
+    return _redirect_after_write(request, "/admin/")
 
 
 @router.post("/posts/{post_id}/delete")
@@ -196,9 +272,10 @@ async def admin_delete_post(
     post = db.query(Post).filter(Post.id == post_id).first()
     if post:
         db.delete(post)
+        bump_content_version(db)
         db.commit()
 
-    return RedirectResponse(url="/admin/", status_code=303)
+    return _redirect_after_write(request, "/admin/")
 
 
 # --- Tags ---
@@ -238,9 +315,10 @@ async def admin_rename_tag(
     tag = db.query(Tag).filter(Tag.id == tag_id).first()
     if tag and name.strip():
         tag.name = name.strip()
+        bump_content_version(db)
         db.commit()
 
-    return RedirectResponse(url="/admin/tags", status_code=303)
+    return _redirect_after_write(request, "/admin/tags")
 
 
 @router.post("/tags/{tag_id}/delete")
@@ -254,9 +332,10 @@ async def admin_delete_tag(
     tag = db.query(Tag).filter(Tag.id == tag_id).first()
     if tag:
         db.delete(tag)
+        bump_content_version(db)
         db.commit()
 
-    return RedirectResponse(url="/admin/tags", status_code=303)
+    return _redirect_after_write(request, "/admin/tags")
 
 
 @router.post("/tags/cleanup")
@@ -275,6 +354,8 @@ async def admin_cleanup_tags(
     )
     for tag in orphaned:
         db.delete(tag)
+    if orphaned:
+        bump_content_version(db)
     db.commit()
 
-    return RedirectResponse(url="/admin/tags", status_code=303)
+    return _redirect_after_write(request, "/admin/tags")
@@ -0,0 +1,48 @@
+"""add posts search vector
+
+Revision ID: a4b6c8d0e2f3
+Revises: f3a5c7e9b1d2
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4b6c8d0e2f3'
+down_revision: Union[str, Sequence[str], None] = 'f3a5c7e9b1d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Weighted title > summary > body; the config must match search_utils.fulltext.TEXT_SEARCH_CONFIG
+SEARCH_VECTOR_EXPRESSION = """
+    setweight(to_tsvector('english', coalesce(title, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(summary, '')), 'B')
+    || setweight(to_tsvector('english', coalesce(post_content, '')), 'C')
+"""
+
+
+def upgrade() -> None:
+    # Full-text search is Postgres-only; SQLite uses the fallback search
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # A stored generated column: Postgres keeps it current on every insert
+    # and update, with no trigger or application code involved
+    op.execute(
+        f"ALTER TABLE posts ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED"
+    )
+    op.create_index('ix_posts_search_vector', 'posts', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_posts_search_vector', table_name='posts')
+    op.drop_column('posts', 'search_vector')
@@ -0,0 +1,29 @@
+"""add rendered html to posts
+
+Revision ID: b7e2f1c9d3a4
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f1c9d3a4'
+down_revision: Union[str, Sequence[str], None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows stay NULL and are rendered lazily on first view
+    op.add_column('posts', sa.Column('content_html', sa.Text(), nullable=True))
+    op.add_column('posts', sa.Column('renderer_version', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'renderer_version')
+    op.drop_column('posts', 'content_html')
@@ -0,0 +1,32 @@
+"""add content_version table
+
+Revision ID: c4d8e2a1f7b3
+Revises: b7e2f1c9d3a4
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e2a1f7b3'
+down_revision: Union[str, Sequence[str], None] = 'b7e2f1c9d3a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    content_version = op.create_table(
+        'content_version',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+    )
+    op.bulk_insert(content_version, [{'id': 1, 'version': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('content_version')
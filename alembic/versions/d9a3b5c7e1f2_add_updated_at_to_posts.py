@@ -0,0 +1,26 @@
+"""add updated_at to posts
+
+Revision ID: d9a3b5c7e1f2
+Revises: c4d8e2a1f7b3
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a3b5c7e1f2'
+down_revision: Union[str, Sequence[str], None] = 'c4d8e2a1f7b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')))
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'updated_at')
@@ -0,0 +1,26 @@
+"""add posts publish_date id index
+
+Revision ID: e2f4a6b8c0d1
+Revises: d9a3b5c7e1f2
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f4a6b8c0d1'
+down_revision: Union[str, Sequence[str], None] = 'd9a3b5c7e1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_posts_publish_date_id', 'posts', ['publish_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_publish_date_id', table_name='posts')
@@ -0,0 +1,62 @@
+"""make posts slug unique
+
+Revision ID: f3a5c7e9b1d2
+Revises: e2f4a6b8c0d1
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a5c7e9b1d2'
+down_revision: Union[str, Sequence[str], None] = 'e2f4a6b8c0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+posts_table = sa.table(
+    'posts',
+    sa.column('id', sa.Integer),
+    sa.column('slug', sa.String),
+)
+
+
+def upgrade() -> None:
+    # --- Data Migration: rename duplicate slugs so the unique index can be built ---
+    bind = op.get_bind()
+    duplicates = bind.execute(
+        sa.select(posts_table.c.slug)
+        .group_by(posts_table.c.slug)
+        .having(sa.func.count() > 1)
+    ).scalars().all()
+
+    taken = set(bind.execute(sa.select(posts_table.c.slug)).scalars())
+
+    for slug in duplicates:
+        ids = bind.execute(
+            sa.select(posts_table.c.id)
+            .where(posts_table.c.slug == slug)
+            .order_by(posts_table.c.id)
+        ).scalars().all()
+        # The oldest post keeps the slug; later ones get the lowest free
+        # slug-N, N >= 2, as db_utils.slugs.ensure_unique_slug() would give them
+        for post_id in ids[1:]:
+            counter = 2
+            while f"{slug}-{counter}" in taken:
+                counter += 1
+            taken.add(f"{slug}-{counter}")
+            bind.execute(
+                posts_table.update().where(posts_table.c.id == post_id).values(slug=f"{slug}-{counter}")
+            )
+
+    op.drop_index('ix_posts_slug', table_name='posts')
+    op.create_index('ix_posts_slug', 'posts', ['slug'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_slug', table_name='posts')
+    op.create_index('ix_posts_slug', 'posts', ['slug'], unique=False)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Build the content snapshot over seeded corpora and count what requests ask of the database.
+
+For each corpus size, reports the snapshot's refresh time (queries included),
+its in-memory build time and its memory per 1k posts. Then serves --requests
+GETs per path in-process against the largest corpus, with the page cache off,
+and counts the SQL statements the engines run per request. The only one left
+is the content version check, at most once a second per worker; add
+"/search?q=kernel" to --paths for a route that still queries per request.
+
+    uv run python benchmarks/content_snapshot.py --posts 1000 5000
+
+Runs against a temporary SQLite file whatever DATABASE_URL is set to.
+"""
+
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from argparse import ArgumentParser, Namespace
+from sys import path
+from pathlib import Path
+
+scratch = tempfile.mkdtemp(prefix="blog-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{scratch}/bench.db"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ.setdefault("SESSION_SECRET_KEY", "benchmark")
+os.environ["PAGE_CACHE_MAX_ENTRIES"] = "0"
+
+project_root = Path(__file__).resolve().parents[1]
+path.append(str(project_root))
+os.chdir(project_root)
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import db_utils.database as database
+from db_utils.database import Base
+from db_utils.models import Post, Tag
+from db_utils.snapshot import snapshots
+from render_utils.markdown import render_post
+
+
+def parse_arguments() -> Namespace:
+    parser = ArgumentParser(description="Content snapshot build time, memory and per-request queries.")
+    parser.add_argument("--posts", type=int, nargs="+", default=[1000, 5000], help="Corpus sizes.")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per path.")
+    parser.add_argument("--paths", nargs="+", default=["/", "/posts/post-0", "/feed.xml"])
+
+    return parser.parse_args()
+
+
+def seed(posts: int) -> None:
+    Base.metadata.drop_all(database.engine)
+    Base.metadata.create_all(database.engine)
+    body = "## Section\n\nSome text about the kernel with `code` and a [link](https://example.com).\n\n" * 20
+    with Session(database.engine) as db:
+        tags = [Tag(name=f"tag-{i}") for i in range(20)]
+        db.add_all(tags)
+        for i in range(posts):
+            post = Post(title=f"Post {i}", slug=f"post-{i}", summary="Summary", post_content=body)
+            post.tags = [tags[i % 20], tags[(i + 7) % 20]]
+            render_post(post)
+            db.add(post)
+        db.commit()
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def measure_build(posts: int) -> None:
+    seed(posts)
+    asyncio.run(snapshots.refresh())
+    stats = snapshots.stats()
+    print(f"{posts:>8}{stats['refresh_ms']:>14.1f}{stats['build_ms']:>12.1f}{stats['kib_per_1k_posts']:>14.0f}")
+
+
+async def count_requests(paths, total: int) -> None:
+    from main import app, lifespan
+
+    counter = StatementCounter()
+    for target in (database.engine, database.async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", counter)
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for target in paths:
+                await client.get(target)
+                counter.count = 0
+                started = time.perf_counter()
+                for _ in range(total):
+                    response = await client.get(target)
+                    assert response.status_code == 200, (target, response.status_code)
+                elapsed = time.perf_counter() - started
+                print(f"{target:20}{counter.count / total:>14.3f}{total / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    try:
+        print(f"{'posts':>8}{'refresh ms':>14}{'build ms':>12}{'KiB/1k posts':>14}")
+        for posts in args.posts:
+            measure_build(posts)
+
+        print(f"\n{max(args.posts)} posts, {args.requests} requests per path, page cache off")
+        print(f"{'path':20}{'queries/req':>14}{'req/s':>10}")
+        asyncio.run(count_requests(args.paths, args.requests))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Compare the post list query with and without column projection.
+
+Seeds a scratch database with a corpus of posts and reports, for the full-row
+query and the projected list query, the bytes fetched from the database, the
+peak Python memory while loading, and the query time.
+
+    uv run python benchmarks/list_projection.py --posts 2000 --body-kb 20
+    uv run python benchmarks/list_projection.py --database-url postgresql+psycopg://.../scratch
+
+Only point --database-url at an empty scratch database: tables are created
+and dropped.
+"""
+
+
+import time
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from os import environ
+from sys import path
+from pathlib import Path
+
+environ.setdefault("DATABASE_URL", "sqlite://")
+
+project_root = Path(__file__).resolve().parents[1]
+path.append(str(project_root))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, load_only, selectinload, undefer
+from sqlalchemy.pool import StaticPool
+
+from db_utils.database import Base
+from db_utils.models import POST_LIST_COLUMNS, Post, Tag
+
+
+def parse_arguments() -> Namespace:
+    parser = ArgumentParser(description="Measure list-view column projection on a seeded corpus.")
+    parser.add_argument("--database-url", default="sqlite://", help="Scratch database URL.")
+    parser.add_argument("--posts", type=int, default=2000, help="Posts to seed.")
+    parser.add_argument("--body-kb", type=int, default=20, help="Markdown body size per post in KiB.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query.")
+
+    return parser.parse_args()
+
+
+def seed(engine, posts: int, body_kb: int) -> None:
+    Base.metadata.create_all(engine)
+    body = ("Lorem ipsum dolor sit amet, `code` and **bold** text.\n" * 20)[:1024] * body_kb
+    tags = [Tag(name=f"tag-{i}") for i in range(20)]
+    with Session(engine) as db:
+        db.add_all(tags)
+        for i in range(posts):
+            post = Post(
+                title=f"Post {i}",
+                slug=f"post-{i}",
+                summary="A short summary of the post.",
+                post_content=body,
+                content_html=f"<p>{body}</p>",
+            )
+            post.tags = [tags[i % 20], tags[(i + 1) % 20]]
+            db.add(post)
+        db.commit()
+
+
+def fetched_bytes(engine, query) -> int:
+    """Size of every value the statement returns, as strings."""
+    with engine.connect() as conn:
+        return sum(
+            len(str(value).encode("utf-8"))
+            for row in conn.execute(query.statement)
+            for value in row
+            if value is not None
+        )
+
+
+def measure(engine, options, repeat: int) -> dict:
+    with Session(engine) as db:
+        query = db.query(Post).options(*options).order_by(Post.id.desc())
+        size = fetched_bytes(engine, query)
+
+    timings = []
+    for _ in range(repeat):
+        with Session(engine) as db:
+            started = time.perf_counter()
+            db.query(Post).options(*options).order_by(Post.id.desc()).all()
+            timings.append(time.perf_counter() - started)
+
+    with Session(engine) as db:
+        tracemalloc.start()
+        db.query(Post).options(*options).order_by(Post.id.desc()).all()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {"bytes": size, "peak": peak, "seconds": min(timings)}
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    if args.database_url.startswith("sqlite"):
+        engine = create_engine(args.database_url, poolclass=StaticPool,
+                               connect_args={"check_same_thread": False})
+    else:
+        engine = create_engine(args.database_url)
+
+    seed(engine, args.posts, args.body_kb)
+    try:
+        full = measure(engine, [undefer(Post.post_content), undefer(Post.content_html),
+                                selectinload(Post.tags)], args.repeat)
+        projected = measure(engine, [load_only(*POST_LIST_COLUMNS), selectinload(Post.tags)], args.repeat)
+    finally:
+        Base.metadata.drop_all(engine)
+
+    print(f"{args.posts} posts, {args.body_kb} KiB bodies, {engine.dialect.name}")
+    print(f"{'':12}{'fetched':>14}{'peak memory':>14}{'best time':>12}")
+    for name, result in (("full rows", full), ("projected", projected)):
+        print(
+            f"{name:12}{result['bytes'] / 1024 / 1024:>11.2f} MB"
+            f"{result['peak'] / 1024 / 1024:>11.2f} MB"
+            f"{result['seconds'] * 1000:>9.1f} ms"
+        )
+    print(f"bytes fetched reduced by {100 * (1 - projected['bytes'] / full['bytes']):.1f}%")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Time the app's middleware stack alone, per request.
+
+Wraps main.app's configured middleware around an endpoint that answers at
+once and calls it in-process, so routing, templates and the database are
+left out. Requests arrive as they do behind nginx: from 127.0.0.1, with
+X-Forwarded-Proto/-For, and with a logged-in admin's session cookie. The
+paths are not in the page cache's scope.
+
+Compare two revisions by checking the older one out into a worktree:
+
+    git worktree add /tmp/before <rev>
+    uv run python benchmarks/middleware_overhead.py --app-dir /tmp/before
+    uv run python benchmarks/middleware_overhead.py
+"""
+
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser, Namespace
+from base64 import b64encode
+from json import dumps
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+
+
+def parse_arguments() -> Namespace:
+    parser = ArgumentParser(description="Per-request overhead of the middleware stack.")
+    parser.add_argument("--app-dir", default=str(project_root), help="Checkout whose main:app is measured.")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per path and run.")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs; the median is reported.")
+    parser.add_argument("--paths", nargs="+", default=["/feed.xml", "/search", "/admin/login"])
+
+    return parser.parse_args()
+
+
+def load_app(app_dir: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='blog-bench-')}/bench.db"
+    os.environ["SESSION_SECRET_KEY"] = "benchmark"
+    os.chdir(app_dir)
+    sys.path.insert(0, app_dir)
+    import main
+
+    return main.app
+
+
+def build_stack(app):
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    stack = endpoint
+    for middleware in reversed(app.user_middleware):
+        cls, args, kwargs = middleware
+        stack = cls(stack, *args, **kwargs)
+    return stack
+
+
+def session_cookie() -> bytes:
+    from itsdangerous import TimestampSigner
+
+    data = b64encode(dumps({"admin_user": "admin", "csrf_token": "0" * 64}).encode())
+    return b"admin_session=" + TimestampSigner("benchmark").sign(data)
+
+
+async def measure(stack, path: str, total: int) -> float:
+    headers = [
+        (b"host", b"grishuk.co.il"),
+        (b"user-agent", b"Mozilla/5.0"),
+        (b"accept-encoding", b"gzip, br"),
+        (b"cookie", session_cookie()),
+        (b"x-forwarded-proto", b"https"),
+        (b"x-forwarded-for", b"203.0.113.9"),
+    ]
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(total):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": b"", "headers": list(headers),
+            "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000),
+        }
+        await stack(scope, receive, send)
+    return (time.perf_counter() - started) / total
+
+
+async def run(args) -> None:
+    app = load_app(args.app_dir)
+    stack = build_stack(app)
+    names = " > ".join(middleware.cls.__name__ for middleware in app.user_middleware)
+
+    print(f"{args.app_dir}: {names}")
+    print(f"{'path':20}{'us/request':>12}")
+    for path in args.paths:
+        await measure(stack, path, min(1000, args.requests))
+        runs = [await measure(stack, path, args.requests) for _ in range(args.runs)]
+        print(f"{path:20}{statistics.median(runs) * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_arguments()))
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Load-test the public routes of a running copy of the app.
+
+Starts uvicorn for the app in --app-dir against a seeded scratch database,
+fires --requests GETs at --concurrency in flight, and reports requests/sec and
+latency percentiles per path. The page cache is disabled so every request
+reaches the database.
+
+Compare two revisions by checking the older one out into a worktree:
+
+    git worktree add /tmp/before <rev>
+    uv run python benchmarks/public_routes.py --app-dir /tmp/before
+    uv run python benchmarks/public_routes.py
+
+Numbers are only meaningful against the database you deploy on; pass
+--database-url for an empty scratch Postgres database (tables are created and
+dropped). On the default SQLite file, routes that run a few fast statements
+per request can come out slower on the async engine than on the sync one:
+aiosqlite sends each statement to the connection's own thread and back, and
+that hop costs more than SQLite takes to answer. psycopg's async mode reads
+its socket on the event loop and has no such hop.
+"""
+
+
+import asyncio
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from argparse import ArgumentParser, Namespace
+from sys import executable, path
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+project_root = Path(__file__).resolve().parents[1]
+path.append(str(project_root))
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from db_utils.database import Base
+from db_utils.models import Post, Tag
+from render_utils.markdown import render_post
+
+
+def parse_arguments() -> Namespace:
+    parser = ArgumentParser(description="Requests/sec and tail latency of the public routes.")
+    parser.add_argument("--app-dir", default=str(project_root), help="Checkout whose main:app is served.")
+    parser.add_argument("--database-url", default=None, help="Scratch database URL [temporary SQLite file].")
+    parser.add_argument("--posts", type=int, default=200, help="Posts to seed.")
+    parser.add_argument("--concurrency", type=int, default=200, help="Requests in flight.")
+    parser.add_argument("--requests", type=int, default=3000, help="Requests per path.")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--paths", nargs="+", default=["/", "/posts/post-0", "/feed.xml"])
+
+    return parser.parse_args()
+
+
+def seed(database_url: str, posts: int) -> None:
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    body = "## Section\n\nSome text with `code` and a [link](https://example.com).\n\n" * 40
+    with Session(engine) as db:
+        tags = [Tag(name=f"tag-{i}") for i in range(10)]
+        db.add_all(tags)
+        for i in range(posts):
+            post = Post(title=f"Post {i}", slug=f"post-{i}", summary="Summary", post_content=body)
+            post.tags = [tags[i % 10]]
+            render_post(post)
+            db.add(post)
+        db.commit()
+    engine.dispose()
+
+
+def start_server(args, database_url: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "SESSION_SECRET_KEY": "benchmark",
+        "PAGE_CACHE_MAX_ENTRIES": "0",
+    }
+    return subprocess.Popen(
+        [executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=args.app_dir,
+        env=env,
+    )
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"{base_url}/robots.txt")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def load(base_url: str, target: str, total: int, concurrency: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies, errors = [], 0
+    queue = iter(range(total))
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for _ in queue:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(target)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "errors": errors,
+    }
+
+
+async def run(args) -> None:
+    base_url = f"http://127.0.0.1:{args.port}"
+    await wait_ready(base_url)
+    # Warm templates and connections before measuring
+    await load(base_url, args.paths[0], min(200, args.requests), 20)
+
+    print(f"{args.app_dir}: {args.posts} posts, {args.concurrency} concurrent, {args.workers} worker(s)")
+    print(f"{'path':20}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for target in args.paths:
+        result = await load(base_url, target, args.requests, args.concurrency)
+        print(
+            f"{target:20}{result['rps']:>10.0f}{result['p50'] * 1000:>10.1f}"
+            f"{result['p99'] * 1000:>10.1f}{result['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    scratch = None
+    database_url = args.database_url
+    if database_url is None:
+        scratch = tempfile.mkdtemp(prefix="blog-bench-")
+        database_url = f"sqlite:///{scratch}/bench.db"
+
+    seed(database_url, args.posts)
+    server = start_server(args, database_url)
+    try:
+        asyncio.run(run(args))
+    finally:
+        server.terminate()
+        server.wait()
+        if scratch is None:
+            engine = create_engine(database_url)
+            Base.metadata.drop_all(engine)
+            engine.dispose()
+        else:
+            shutil.rmtree(scratch, ignore_errors=True)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Build the typeahead index over a synthetic corpus and time suggestions.
+
+Reports the build time, the index's memory per 1k posts, and p50/p99/max
+lookup times for a mix of short prefixes, multi-word prefixes and typos.
+No database is involved: the rows are what the startup query would return.
+
+    uv run python benchmarks/typeahead.py --posts 1000 5000 20000
+"""
+
+
+import random
+import statistics
+import time
+from argparse import ArgumentParser, Namespace
+from os import environ
+from sys import path
+from pathlib import Path
+
+environ.setdefault("DATABASE_URL", "sqlite://")
+
+project_root = Path(__file__).resolve().parents[1]
+path.append(str(project_root))
+
+from search_utils.typeahead import TypeaheadIndex
+
+
+WORDS = (
+    "linux kernel module driver secure boot signing android binder memory allocator "
+    "postgres index query planner vacuum replica python asyncio threading network "
+    "socket firewall container namespace cgroup systemd debugging tracing profiling"
+).split()
+
+QUERIES = ["k", "ke", "kern", "linux ker", "secure b", "postgr", "kernal", "pyhton", "zzz", "network soc"]
+
+
+def parse_arguments() -> Namespace:
+    parser = ArgumentParser(description="Typeahead index build time, memory and lookup latency.")
+    parser.add_argument("--posts", type=int, nargs="+", default=[1000, 5000, 20000], help="Corpus sizes.")
+    parser.add_argument("--tags", type=int, default=200, help="Tags in the corpus.")
+    parser.add_argument("--lookups", type=int, default=20000, help="Timed suggestions per corpus.")
+
+    return parser.parse_args()
+
+
+def corpus(posts: int, tags: int) -> list:
+    rng = random.Random(posts)
+    rows = []
+    for i in range(posts):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))).capitalize()
+        rows.append(("post", f"{title} {i}", f"{title.lower().replace(' ', '-')}-{i}"))
+    rows.extend(("tag", f"{rng.choice(WORDS)}-{i}", f"{rng.choice(WORDS)}-{i}") for i in range(tags))
+    return rows
+
+
+def measure(posts: int, tags: int, lookups: int) -> None:
+    index = TypeaheadIndex(corpus(posts, tags))
+    memory = index.memory_bytes()
+
+    timings = []
+    for i in range(lookups):
+        started = time.perf_counter()
+        index.suggest(QUERIES[i % len(QUERIES)])
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    print(
+        f"{posts:>8}{index.build_seconds * 1000:>12.1f}{memory * 1000 / posts / 1024:>14.0f}"
+        f"{statistics.median(timings) * 1e6:>10.1f}{timings[int(len(timings) * 0.99) - 1] * 1e6:>10.1f}"
+        f"{timings[-1] * 1e6:>10.1f}"
+    )
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    print(f"{'posts':>8}{'build ms':>12}{'KiB/1k posts':>14}{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+    for posts in args.posts:
+        measure(posts, args.tags, args.lookups)
@@ -0,0 +1,327 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from os import getenv
+from urllib.parse import urlsplit
+
+import redis
+from redis.exceptions import RedisError
+
+
+# What an unreachable or failing backend raises; counted as errors, never raised to callers
+BACKEND_ERRORS = (sqlite3.Error, RedisError, OSError)
+
+
+class CacheBackend:
+    """
+    Key/value store with per-entry TTLs and hit-rate stats.
+
+    Subclasses implement _get/_set/_add/_delete/_clear. The memory backend is
+    private to a worker; the SQLite and Redis backends are seen by every
+    worker pointed at them, so values there are pickled and must come from
+    this application only. Their methods are synchronous: async code goes
+    through a thread for them (see `blocking`).
+    """
+
+    name = "base"
+    # Whether calls wait on I/O, so async callers should make them off the event loop
+    blocking = True
+
+    def __init__(self, max_entries: int, default_ttl: float = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._counter_lock = threading.Lock()
+
+    def _count_error(self) -> None:
+        with self._counter_lock:
+            self.errors += 1
+
+    def _expires_at(self, ttl):
+        ttl = self.default_ttl if ttl is None else ttl
+        return None if ttl is None else time.time() + ttl
+
+    def get(self, key: str):
+        """The stored value, or None when missing, expired or unreachable."""
+        try:
+            value = self._get(key)
+        except BACKEND_ERRORS:
+            value = None
+            self._count_error()
+        with self._counter_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value, ttl: float = None) -> None:
+        """Store value for ttl seconds (default_ttl when None). Failures are counted, not raised."""
+        if self.max_entries <= 0:
+            return
+        try:
+            self._set(key, value, self._expires_at(ttl))
+        except BACKEND_ERRORS:
+            self._count_error()
+
+    def peek(self, key: str):
+        """get() without counting a hit or miss, for polling."""
+        try:
+            return self._get(key)
+        except BACKEND_ERRORS:
+            return None
+
+    def add(self, key: str, value, ttl: float) -> bool:
+        """
+        Store value only if key is absent or expired; True if this call stored
+        it. Used as a lock between workers, so an unreachable backend says
+        True rather than leaving nobody to do the work.
+        """
+        try:
+            return self._add(key, value, time.time() + ttl)
+        except BACKEND_ERRORS:
+            self._count_error()
+            return True
+
+    def delete(self, key: str) -> None:
+        """Remove key. Failures are counted, not raised; the entry then lives out its TTL."""
+        try:
+            self._delete(key)
+        except BACKEND_ERRORS:
+            self._count_error()
+
+    def clear(self) -> None:
+        self._clear()
+        with self._counter_lock:
+            self.hits = self.misses = self.errors = 0
+
+    def entries(self):
+        return None
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            hits, misses, errors = self.hits, self.misses, self.errors
+        lookups = hits + misses
+        return {
+            "backend": self.name,
+            "entries": self.entries(),
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "errors": errors,
+        }
+
+
+class MemoryBackend(CacheBackend):
+    """LRU dict private to this worker."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_entries: int, default_ttl: float = None):
+        super().__init__(max_entries, default_ttl)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _add(self, key, value, expires_at):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.time()):
+                return False
+            self._entries[key] = (expires_at, value)
+            return True
+
+    def _delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def entries(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    A SQLite file in WAL mode that every worker on the host shares.
+
+    Reads don't write, so the size limit evicts the oldest stored entries
+    rather than the least recently read ones.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_entries: int, default_ttl: float = None):
+        super().__init__(max_entries, default_ttl)
+        self.path = path
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Workers are forked after import: each process opens its own connection
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, stored_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_stored_at ON cache (stored_at)")
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _get(self, key):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return None if row is None else pickle.loads(row[0])
+
+    def _set(self, key, value, expires_at):
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+                    (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires_at, now),
+                )
+                connection.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+                connection.execute(
+                    "DELETE FROM cache WHERE key IN "
+                    "(SELECT key FROM cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def _add(self, key, value, expires_at):
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, now))
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO cache (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+                    (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires_at, now),
+                )
+                return cursor.rowcount == 1
+
+    def _delete(self, key):
+        with self._lock:
+            self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def _clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM cache")
+
+    def entries(self):
+        with self._lock:
+            return self._connect().execute("SELECT count(*) FROM cache").fetchone()[0]
+
+
+class RedisBackend(CacheBackend):
+    """
+    Keys under a prefix on a Redis server, shared by every worker and host
+    pointed at it. TTLs are Redis expiries. A sorted set of keys by store
+    time enforces max_entries, oldest stored first.
+
+    client is anything with redis-py's get/set/delete/zadd/zcard/zpopmin,
+    so tests can pass a stand-in.
+    """
+
+    name = "redis"
+
+    def __init__(self, client, max_entries: int, default_ttl: float = None, prefix: str = "blog:"):
+        super().__init__(max_entries, default_ttl)
+        self.client = client
+        self.prefix = prefix
+        self._index = prefix + "_keys"
+
+    def _get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else pickle.loads(raw)
+
+    def _set(self, key, value, expires_at):
+        ttl_ms = None if expires_at is None else max(1, int((expires_at - time.time()) * 1000))
+        self.client.set(self.prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), px=ttl_ms)
+        self.client.zadd(self._index, {key: time.time()})
+        excess = self.client.zcard(self._index) - self.max_entries
+        if excess > 0:
+            evicted = [name for name, _ in self.client.zpopmin(self._index, excess)]
+            self.client.delete(*(self.prefix + _decode(name) for name in evicted))
+
+    def _add(self, key, value, expires_at):
+        ttl_ms = max(1, int((expires_at - time.time()) * 1000))
+        return bool(self.client.set(self.prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), px=ttl_ms, nx=True))
+
+    def _delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def _clear(self):
+        keys = [self.prefix + _decode(name) for name, _ in self.client.zpopmin(self._index, self.client.zcard(self._index))]
+        self.client.delete(self._index, *keys)
+
+    def entries(self):
+        # Includes keys Redis has already expired, until they are evicted
+        try:
+            return self.client.zcard(self._index)
+        except (RedisError, OSError):
+            return None
+
+
+def _decode(name) -> str:
+    return name.decode() if isinstance(name, bytes) else name
+
+
+def cache_from_url(url: str, max_entries: int, default_ttl: float = None) -> CacheBackend:
+    """
+    memory:// (default), sqlite:///relative.db or sqlite:////absolute.db as in
+    DATABASE_URL, or redis://host:port/db.
+    """
+    scheme = urlsplit(url).scheme
+    if scheme == "memory":
+        return MemoryBackend(max_entries, default_ttl)
+    if scheme == "sqlite":
+        return SQLiteBackend(url[len("sqlite:///"):], max_entries, default_ttl)
+    if scheme in ("redis", "rediss", "unix"):
+        client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return RedisBackend(client, max_entries, default_ttl)
+    raise ValueError(f"Unsupported CACHE_URL scheme: {scheme!r}")
+
+
+shared_cache = cache_from_url(
+    getenv("CACHE_URL", "memory://"),
+    max_entries=int(getenv("CACHE_MAX_ENTRIES", "1024")),
+)
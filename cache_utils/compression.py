@@ -0,0 +1,100 @@
+import gzip
+import re
+from os import getenv
+
+import brotli
+from starlette.responses import Response
+
+from cache_utils.conditional import variant_etag
+
+
+MINIFY_HTML = getenv("MINIFY_HTML", "false").lower() == "true"
+
+# Bodies smaller than this are not worth a compressed copy
+MIN_COMPRESS_SIZE = 512
+# Brotli quality for pages encoded while a request waits; 11 is several
+# times slower for a few percent smaller output, so only the static export uses it
+BROTLI_QUALITY = int(getenv("BROTLI_QUALITY", "5"))
+BROTLI_QUALITY_STATIC = 11
+
+# Preferred order when the client accepts several encodings equally
+ENCODINGS = ("br", "gzip", "identity")
+
+_PRESERVE_BLOCKS = re.compile(rb"(<(pre|textarea|script|style)\b.*?</\2>)", re.IGNORECASE | re.DOTALL)
+
+
+def minify_html(body: bytes) -> bytes:
+    """
+    Collapse indentation and runs of blanks outside <pre>, <textarea>,
+    <script> and <style>. Whitespace is shortened, never removed, so the
+    rendered page is unchanged.
+    """
+    parts = _PRESERVE_BLOCKS.split(body)
+    out = []
+    # re.split yields [text, block, tag-name, text, block, tag-name, ...]
+    for index in range(0, len(parts), 3):
+        text = re.sub(rb"[ \t]*\n\s*", b"\n", parts[index])
+        out.append(re.sub(rb"[ \t]{2,}", b" ", text))
+        if index + 1 < len(parts):
+            out.append(parts[index + 1])
+    return b"".join(out)
+
+
+def encode_variants(body: bytes, minify: bool = False, brotli_quality: int = BROTLI_QUALITY) -> dict:
+    """
+    Build the identity, gzip and brotli representations of a body once.
+    CPU-bound: async callers run it in the threadpool.
+    """
+    if minify:
+        body = minify_html(body)
+
+    variants = {"identity": body}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        variants["br"] = brotli.compress(body, mode=brotli.MODE_TEXT, quality=brotli_quality)
+    return variants
+
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    """Pick the best available encoding allowed by an Accept-Encoding header."""
+    if not accept_encoding:
+        return "identity"
+
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding] = quality
+
+    best, best_quality = "identity", 0.0
+    for coding in ENCODINGS:
+        if coding == "identity" or coding not in available:
+            continue
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def encoded_headers(variants: dict, encoding: str) -> dict:
+    headers = {"Vary": "Accept-Encoding", "Content-Length": str(len(variants[encoding]))}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+def compressed_response(request, variants: dict, media_type: str, headers: dict = None) -> Response:
+    """Return the pre-built variant that best matches the request."""
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), variants)
+    response_headers = dict(headers or {})
+    if "ETag" in response_headers:
+        response_headers["ETag"] = variant_etag(response_headers["ETag"], encoding)
+    response_headers.update(encoded_headers(variants, encoding))
+    return Response(content=variants[encoding], media_type=media_type, headers=response_headers)
@@ -0,0 +1,117 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+
+from starlette.responses import Response
+
+
+CACHE_CONTROL = "public, no-cache"
+
+
+def template_version(directory: Path) -> str:
+    """Hash every template file so ETags change whenever a template is edited."""
+    digest = hashlib.sha256()
+    for path in sorted(Path(directory).rglob("*")):
+        if path.is_file():
+            digest.update(str(path.relative_to(directory)).encode("utf-8"))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def templates_modified(directory: Path) -> datetime:
+    """The newest modification time of any template file, for Last-Modified."""
+    mtimes = [path.stat().st_mtime for path in Path(directory).rglob("*") if path.is_file()]
+    return datetime.fromtimestamp(max(mtimes, default=0), tz=timezone.utc)
+
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """Strong ETags must differ per Content-Encoding, so suffix compressed variants."""
+    if encoding == "identity":
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; the application stores UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def latest(*values):
+    """Return the most recent non-None datetime as UTC (or None)."""
+    values = [_as_utc(value) for value in values if value is not None]
+    return max(values) if values else None
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value).replace(microsecond=0), usegmt=True)
+
+
+def parse_http_date(value: str):
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def validator_headers(etag: str, last_modified: datetime = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def _matching_etag(header: str, etag: str):
+    """Return the entity tag from If-None-Match that matches etag or one of its variants."""
+    if header.strip() == "*":
+        return etag
+    accepted = {etag, variant_etag(etag, "gzip"), variant_etag(etag, "br")}
+    for tag in header.split(","):
+        # If-None-Match uses weak comparison, so ignore any W/ prefix
+        tag = tag.strip().removeprefix("W/")
+        if tag in accepted:
+            return tag
+    return None
+
+
+def is_not_modified(request_headers, etag: str, last_modified: datetime = None) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since for a GET request.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted when
+    the client sent no entity tags.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return _matching_etag(if_none_match, etag) is not None
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+
+    since = parse_http_date(if_modified_since)
+    if since is None:
+        return False
+
+    return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+
+
+def not_modified_response(headers: dict, request_headers=None) -> Response:
+    """
+    Build a 304 carrying the validators. When the client revalidated a
+    compressed variant, echo that variant's ETag back.
+    """
+    headers = dict(headers)
+    if request_headers is not None and "ETag" in headers:
+        matched = _matching_etag(request_headers.get("if-none-match", ""), headers["ETag"])
+        if matched is not None:
+            headers["ETag"] = matched
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,239 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from os import getenv
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.requests import cookie_parser
+
+from cache_utils.compression import MINIFY_HTML, choose_encoding, encode_variants
+from cache_utils.conditional import is_not_modified, parse_http_date, variant_etag
+from db_utils.content_version import current_content_version_async, on_content_change, peek_content_version
+from db_utils.replicas import reads_pinned
+
+
+class PageCache:
+    """
+    Per-worker store of rendered pages, each stamped with the content version
+    it was rendered from. Entries from an older version are treated as misses.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version: int, page) -> None:
+        with self._lock:
+            self._entries[key] = (version, page)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+
+page_cache = PageCache(max_entries=int(getenv("PAGE_CACHE_MAX_ENTRIES", "512")))
+# How long a request for a page already being rendered waits for that render (seconds)
+PAGE_RENDER_WAIT_SECONDS = float(getenv("PAGE_RENDER_WAIT_SECONDS", "5"))
+on_content_change(page_cache.clear)
+# Where a route records, in scope["state"], the content version its page was built from
+RENDERED_VERSION = "rendered_content_version"
+
+
+def is_cacheable_path(path: str) -> bool:
+    return path == "/" or path.startswith("/posts/")
+
+
+class PageCacheMiddleware:
+    """
+    Serve GET / and /posts/{slug} from the page cache.
+
+    A hit only checks the shared content version and replays the stored
+    response (or a 304 when the client's validators still match), so no ORM
+    session is opened and no template is rendered. Pages are stored as
+    identity, gzip and brotli variants built once when the page is rendered.
+    Concurrent misses for the same page wait for the first one's render
+    instead of all rendering it. A page is only stored if it was built from
+    the version it is stored under: while one request rebuilds the content
+    snapshot, others are still answered from the old one.
+    """
+
+    VALIDATOR_HEADERS = (b"etag", b"last-modified", b"cache-control")
+    VARIANT_HEADERS = (b"content-length", b"content-encoding", b"vary", b"etag")
+
+    def __init__(self, app, cache: PageCache = page_cache, minify: bool = MINIFY_HTML):
+        self.app = app
+        self.cache = cache
+        self.minify = minify
+        self._rendering: dict = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not is_cacheable_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        if self.cache.max_entries <= 0:
+            # Cache disabled: don't pay for encoding variants nobody will replay
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if reads_pinned(cookie_parser(headers.get(b"cookie", b"").decode("latin-1"))):
+            # Read-your-writes: rendered from the primary, ahead of what is cached
+            await self.app(scope, receive, send)
+            return
+
+        key = (
+            scope["scheme"],
+            headers.get(b"host", b"").decode("latin-1"),
+            scope["path"],
+            scope["query_string"].decode("latin-1"),
+        )
+        version = peek_content_version()
+        if version is None:
+            version = await current_content_version_async()
+
+        page = self.cache.get(key, version)
+        if page is not None:
+            await self._send_page(scope, send, page, b"HIT")
+            return
+
+        rendering = self._rendering.get((key, version))
+        if rendering is not None:
+            try:
+                await asyncio.wait_for(rendering.wait(), PAGE_RENDER_WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            page = self.cache.get(key, version)
+            if page is not None:
+                with self.cache._lock:
+                    self.cache.coalesced += 1
+                await self._send_page(scope, send, page, b"HIT")
+                return
+            # Not cacheable (e.g. a 404) or too slow: render it here
+            await self.app(scope, receive, send)
+            return
+
+        response = {"start": None, "chunks": [], "streaming": False}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["start"] = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if not response["streaming"] and not more_body:
+                # Whole body in one message: store it and answer from the entry
+                page = await self._build_page(response["start"], [body])
+                if page is not None:
+                    self._store(scope, key, version, page)
+                    await self._send_page(scope, send, page, b"MISS")
+                    return
+                await send(self._start_message(response["start"]["status"], response["start"].get("headers", []), b"MISS"))
+                await send(message)
+                return
+
+            # Streaming body: pass chunks through untouched, store at the end
+            if not response["streaming"]:
+                response["streaming"] = True
+                start_headers = list(response["start"].get("headers", [])) + [(b"vary", b"Accept-Encoding")]
+                await send(self._start_message(response["start"]["status"], start_headers, b"MISS"))
+            response["chunks"].append(body)
+            if not more_body:
+                # Before the last chunk: once the response ends, the app may be cancelled
+                page = await self._build_page(response["start"], response["chunks"])
+                if page is not None:
+                    self._store(scope, key, version, page)
+            await send(message)
+
+        rendered = self._rendering[(key, version)] = asyncio.Event()
+        try:
+            await self.app(scope, receive, capture_send)
+        finally:
+            del self._rendering[(key, version)]
+            rendered.set()
+
+    def _store(self, scope, key, version: int, page) -> None:
+        if scope.get("state", {}).get(RENDERED_VERSION, version) == version:
+            self.cache.put(key, version, page)
+
+    @staticmethod
+    def _start_message(status: int, headers, cache_status: bytes) -> dict:
+        return {
+            "type": "http.response.start",
+            "status": status,
+            "headers": list(headers) + [(b"x-cache", cache_status)],
+        }
+
+    async def _build_page(self, start, chunks):
+        if start is None or start["status"] != 200:
+            return None
+
+        headers = list(start.get("headers", []))
+        names = {name.lower() for name, _ in headers}
+        if b"set-cookie" in names:
+            return None
+
+        content_type = Headers(raw=headers).get("content-type", "")
+        minify = self.minify and content_type.startswith("text/html")
+        # Off the event loop: compressing a large page takes tens of milliseconds
+        variants = await run_in_threadpool(encode_variants, b"".join(chunks), minify=minify)
+        headers = [(name, value) for name, value in headers if name.lower() not in self.VARIANT_HEADERS]
+        etag = Headers(raw=start.get("headers", [])).get("etag")
+        return start["status"], headers, etag, variants
+
+    async def _send_page(self, scope, send, page, cache_status: bytes) -> None:
+        status, headers, etag, variants = page
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""), variants)
+        etag_header = [(b"etag", variant_etag(etag, encoding).encode("latin-1"))] if etag else []
+
+        if etag is not None:
+            last_modified = parse_http_date(Headers(raw=headers).get("last-modified"))
+            if is_not_modified(request_headers, etag, last_modified):
+                validators = [(name, value) for name, value in headers if name.lower() in self.VALIDATOR_HEADERS]
+                await send(self._start_message(304, validators + etag_header, cache_status))
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        body = variants[encoding]
+        response_headers = headers + etag_header + [
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if encoding != "identity":
+            response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+
+        await send(self._start_message(status, response_headers, cache_status))
+        await send({"type": "http.response.body", "body": body})
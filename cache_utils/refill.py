@@ -0,0 +1,156 @@
+import asyncio
+import os
+import threading
+import time
+from os import getenv
+
+from redis.exceptions import RedisError
+from sqlalchemy import exc
+from starlette.concurrency import run_in_threadpool
+
+from cache_utils.backends import CacheBackend, shared_cache
+
+
+# How long past its TTL an entry may still be served: while it is being
+# refreshed in the background, or while refills fail (seconds)
+CACHE_GRACE_SECONDS = float(getenv("CACHE_GRACE_SECONDS", "300"))
+# Longest a refill may hold the cross-worker lock before others give up waiting
+REFILL_LOCK_SECONDS = 10.0
+REFILL_POLL_SECONDS = 0.05
+
+# Failures that mean "the data source is unavailable", which a stale entry covers
+UNAVAILABLE_ERRORS = (exc.DBAPIError, OSError, RedisError, asyncio.TimeoutError)
+
+
+class Refiller:
+    """
+    Read-through access to a cache where each key is refilled by one caller.
+
+    Entries are stored as (value, version, fresh_until) and kept grace
+    seconds past their TTL:
+
+    - fresh: served as is;
+    - stale but the same version: served at once while one background task
+      refreshes it;
+    - missing or from an older version: refilled before answering. Callers in
+      this worker share one refill per key; across workers, a lock entry in
+      the cache lets one refill while the others poll for its result.
+
+    If a refill fails because the database is unavailable, any entry still
+    in the cache is served instead, whatever its version.
+    """
+
+    def __init__(self, cache: CacheBackend, grace: float):
+        self.cache = cache
+        self.grace = grace
+        self._inflight: dict = {}
+        self._background: set = set()
+        self._lock = threading.Lock()
+        self._counts = {
+            "refills": 0,
+            "coalesced": 0,
+            "waited_for_other_worker": 0,
+            "stale_served": 0,
+            "background_refreshes": 0,
+            "background_failures": 0,
+            "stale_on_error": 0,
+        }
+
+    async def _call(self, method: str, *args, **kwargs):
+        """A cache call, on a worker thread when the backend does network or file I/O."""
+        if self.cache.blocking:
+            return await run_in_threadpool(getattr(self.cache, method), *args, **kwargs)
+        return getattr(self.cache, method)(*args, **kwargs)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    async def get(self, key: str, refill, ttl: float, version=None):
+        """
+        The value for key, calling `await refill()` to build it when needed.
+        version is compared with the stored one; pass the content version so
+        an admin write is never answered from before it.
+        """
+        entry = await self._call("get", key)
+        if entry is not None and entry[1] == version:
+            if time.time() < entry[2]:
+                return entry[0]
+            self._count("stale_served")
+            self._refresh_in_background(key, refill, ttl, version)
+            return entry[0]
+
+        try:
+            return await self._refill(key, refill, ttl, version)
+        except UNAVAILABLE_ERRORS:
+            if entry is None:
+                raise
+            self._count("stale_on_error")
+            return entry[0]
+
+    def _refill(self, key, refill, ttl, version):
+        flight = (key, version)
+        task = self._inflight.get(flight)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, refill, ttl, version))
+            self._inflight[flight] = task
+            task.add_done_callback(lambda _: self._inflight.pop(flight, None))
+        else:
+            self._count("coalesced")
+        # Shielded: one caller giving up (client disconnect) doesn't cancel the others' refill
+        return asyncio.shield(task)
+
+    async def _run(self, key, refill, ttl, version):
+        lock_key = f"refill-lock:{key}"
+        locked = await self._call("add", lock_key, os.getpid(), ttl=REFILL_LOCK_SECONDS)
+        if not locked:
+            self._count("waited_for_other_worker")
+            value = await self._wait_for_other_worker(key, lock_key, version)
+            if value is not None:
+                return value
+
+        try:
+            value = await refill()
+            self._count("refills")
+            await self._call("set", key, (value, version, time.time() + ttl), ttl=ttl + self.grace)
+            return value
+        finally:
+            if locked:
+                await self._call("delete", lock_key)
+
+    async def _wait_for_other_worker(self, key, lock_key, version):
+        deadline = time.monotonic() + REFILL_LOCK_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(REFILL_POLL_SECONDS)
+            entry = await self._call("peek", key)
+            if entry is not None and entry[1] == version and time.time() < entry[2]:
+                return entry[0]
+            if await self._call("peek", lock_key) is None:
+                # Its refill failed or the entry was evicted: do it here
+                return None
+        return None
+
+    def _refresh_in_background(self, key, refill, ttl, version) -> None:
+        if (key, version) in self._inflight:
+            return
+        flight = self._refill(key, refill, ttl, version)
+
+        async def refresh():
+            try:
+                await flight
+                self._count("background_refreshes")
+            except UNAVAILABLE_ERRORS:
+                # The stale entry stays until its grace window runs out
+                self._count("background_failures")
+
+        # Held so the task isn't garbage collected before it finishes
+        task = asyncio.ensure_future(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counts, "inflight": len(self._inflight), "grace_seconds": self.grace}
+
+
+refiller = Refiller(shared_cache, CACHE_GRACE_SECONDS)
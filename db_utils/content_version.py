@@ -0,0 +1,155 @@
+import threading
+import time
+from os import getenv
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+import db_utils.database as database
+from db_utils.models import ContentVersion
+
+
+# How long a worker trusts its last read of the shared version (seconds)
+VERSION_CHECK_INTERVAL = float(getenv("CONTENT_VERSION_CHECK_INTERVAL", "1.0"))
+
+_listeners = []
+_state = {"version": None, "updated_at": None, "checked_at": 0.0}
+_lock = threading.Lock()
+
+
+def on_content_change(callback):
+    """Register a callback fired when this worker sees the content version change."""
+    _listeners.append(callback)
+    return callback
+
+
+def _notify() -> None:
+    for callback in _listeners:
+        callback()
+
+
+def bump_content_version(db: Session) -> None:
+    """
+    Increment the shared content version inside the caller's transaction.
+
+    Listeners in this worker fire once the transaction commits; other workers
+    pick up the new version on their next check.
+    """
+    result = db.execute(
+        update(ContentVersion)
+        .where(ContentVersion.id == 1)
+        .values(version=ContentVersion.version + 1, updated_at=func.now())
+    )
+    if result.rowcount == 0:
+        db.add(ContentVersion(id=1, version=1))
+        db.flush()
+    db.info["content_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop("content_changed", False):
+        reset()
+        _notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("content_changed", None)
+
+
+def read_content_version(connection):
+    """Return (version, updated_at) from the shared counter row, via a Connection or Session."""
+    row = connection.execute(
+        select(ContentVersion.version, ContentVersion.updated_at).where(ContentVersion.id == 1)
+    ).first()
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at
+
+
+def peek_content_version():
+    """Return the cached version if it is still fresh, otherwise None."""
+    with _lock:
+        if _state["version"] is not None and time.monotonic() - _state["checked_at"] < VERSION_CHECK_INTERVAL:
+            return _state["version"]
+    return None
+
+
+def _record(version, updated_at, checked_at) -> int:
+    with _lock:
+        changed = _state["version"] is not None and _state["version"] != version
+        _state["version"] = version
+        _state["updated_at"] = updated_at
+        _state["checked_at"] = checked_at
+
+    if changed:
+        _notify()
+    return version
+
+
+def current_content_version() -> int:
+    """
+    Return the shared content version without opening an ORM session.
+
+    The value is re-read from the database at most every
+    VERSION_CHECK_INTERVAL seconds per worker.
+    """
+    now = time.monotonic()
+    cached = peek_content_version()
+    if cached is not None:
+        return cached
+
+    with database.engine.connect() as connection:
+        version, updated_at = read_content_version(connection)
+    return _record(version, updated_at, now)
+
+
+async def current_content_version_async(db=None) -> int:
+    """
+    current_content_version() for async handlers, read where the public
+    routes read: a replica when configured, so cached pages are keyed by the
+    version of the data they were rendered from.
+
+    Pass the request's AsyncSession to read through the connection it already
+    holds: a second checkout per request can exhaust the pool under load,
+    with every request holding one connection and waiting for another.
+    """
+    if db is not None and db.info.get("pinned"):
+        # Read-your-writes session on the primary: keep its newer value out
+        # of the worker's shared state, which follows the replicas
+        return (await db.run_sync(read_content_version))[0]
+
+    now = time.monotonic()
+    cached = peek_content_version()
+    if cached is not None:
+        return cached
+
+    if db is not None:
+        version, updated_at = await db.run_sync(read_content_version)
+    else:
+        connection = await database.replicas.connect(database.async_engine)
+        try:
+            version, updated_at = await connection.run_sync(read_content_version)
+        finally:
+            await connection.close()
+    return _record(version, updated_at, now)
+
+
+async def content_updated_at_async(db=None):
+    """Return when the content version was last bumped (None if never)."""
+    if db is not None and db.info.get("pinned"):
+        return (await db.run_sync(read_content_version))[1]
+
+    await current_content_version_async(db)
+    with _lock:
+        return _state["updated_at"]
+
+
+def reset() -> None:
+    """Forget the cached version so the next check goes to the database."""
+    with _lock:
+        _state["version"] = None
+        _state["updated_at"] = None
+        _state["checked_at"] = 0.0
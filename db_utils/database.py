@@ -2,13 +2,105 @@
 
 
 from os import getenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 
+from db_utils.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from db_utils.replicas import ReplicaSet
+
 
 DATABASE_URL = getenv("DATABASE_URL")
+# Streaming replicas for the public routes, comma-separated; empty reads from DATABASE_URL
+DATABASE_REPLICA_URLS = [url.strip() for url in getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Seconds a replica that failed to connect is skipped before it is tried again
+DB_REPLICA_RETRY_SECONDS = float(getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+
+# Pool sizing is per worker process: total connections = workers x (size + overflow)
+DB_POOL_SIZE = int(getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# PgBouncer in transaction pooling mode: no prepared statements, no startup options
+DB_PGBOUNCER = getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+
+# Drivers used by the async engine for each backend
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_url(url):
+    """The DATABASE_URL with its driver swapped for the async one."""
+    url = make_url(url)
+    driver = _ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=driver) if driver else url
+
+
+def engine_options(url, is_async: bool = False) -> dict:
+    """create_engine() keyword arguments for url from the DB_* settings."""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return {}
+
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+    if url.get_backend_name() == "postgresql":
+        connect_args = {}
+        if DB_PGBOUNCER:
+            # Server-side prepared statements don't survive a change of backend
+            connect_args["prepare_threshold"] = None
+        elif DB_STATEMENT_TIMEOUT_MS:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+        options["connect_args"] = connect_args
 
-engine = create_engine(DATABASE_URL)
+    return options
+
+
+def _set_statement_timeout(conn):
+    # PgBouncer rejects startup options, so scope the timeout to each transaction
+    # (raw cursor: the Connection is still mid-begin when this fires)
+    cursor = conn.connection.cursor()
+    cursor.execute(f"SET LOCAL statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+    cursor.close()
+
+
+def create_configured_engine(url, is_async: bool = False):
+    """The sync engine for url, or with is_async the AsyncEngine for async_url(url)."""
+    if is_async:
+        engine = create_async_engine(async_url(url), **engine_options(url, is_async=True))
+        sync_engine = engine.sync_engine
+    else:
+        engine = sync_engine = create_engine(url, **engine_options(url))
+
+    if DB_PGBOUNCER and DB_STATEMENT_TIMEOUT_MS and sync_engine.dialect.name == "postgresql":
+        event.listen(sync_engine, "begin", _set_statement_timeout)
+
+    return engine
+
+
+engine = create_configured_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Public routes use the async engine; admin routes and CLIs stay on the sync one
+async_engine = create_configured_engine(DATABASE_URL, is_async=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+# Read-only public traffic goes to the replicas when configured; writes never do
+replicas = ReplicaSet(
+    [create_configured_engine(url, is_async=True) for url in DATABASE_REPLICA_URLS],
+    retry_after=DB_REPLICA_RETRY_SECONDS,
+)
 Base = declarative_base()
@@ -0,0 +1,42 @@
+import sys
+
+from db_utils.content_version import current_content_version_async
+
+
+def deep_sizeof(obj, seen=None) -> int:
+    """Bytes held by obj and the containers under it, each object counted once."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+class SingleFlightRebuild:
+    """
+    Keeps a worker's in-memory copy of the content (anything with a
+    `version`) in step with the content version.
+
+    Once admin writes move the version, one request rebuilds the copy while
+    concurrent ones keep answering from the old one. Only with no copy at all
+    does every request wait for a rebuild.
+    """
+
+    def __init__(self):
+        self.building = False
+
+    async def current(self, value, rebuild):
+        """value if it is current, otherwise the result of `await rebuild(version)`."""
+        version = await current_content_version_async()
+        if value is None or (value.version != version and not self.building):
+            self.building = True
+            try:
+                return await rebuild(version)
+            finally:
+                self.building = False
+        return value
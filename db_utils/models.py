@@ -1,8 +1,8 @@
 
 
 from db_utils.database import Base
-from sqlalchemy import Column, Integer, String, Text, Table, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Table, ForeignKey, DateTime, Index
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
 
@@ -42,13 +42,33 @@ class Post(Base):
     id = Column(Integer, primary_key=True)
     title = Column(String(256), nullable=False)
     meta_title = Column(String(80), nullable=True)
-    slug = Column(String, index=True, nullable=False)
+    slug = Column(String, index=True, unique=True, nullable=False)
     summary = Column(Text, nullable=False)
-    post_content = Column(Text, nullable=False)
+    # Large bodies load only on access or with undefer(); list pages never need them
+    post_content = deferred(Column(Text, nullable=False))
+    content_html = deferred(Column(Text, nullable=True))
+    renderer_version = Column(Integer, nullable=True)
     publish_date = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     tags = relationship("Tag", secondary=post_tags, back_populates="posts")
 
+    # Keyset pagination order for the post lists (db_utils.pagination)
+    __table_args__ = (Index("ix_posts_publish_date_id", "publish_date", "id"),)
+
+
+# Columns the post list pages render (home, feed, admin dashboard)
+POST_LIST_COLUMNS = (Post.id, Post.title, Post.slug, Post.summary, Post.publish_date)
+
+
+class ContentVersion(Base):
+    """Single-row counter bumped on every content write, shared by all workers."""
+    __tablename__ = "content_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
 
 class AdminUser(Base):
     __tablename__ = "admin_users"
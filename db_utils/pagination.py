@@ -0,0 +1,107 @@
+import base64
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import and_, func, or_, tuple_
+
+from db_utils.models import Post
+
+
+class Page(NamedTuple):
+    items: list
+    older: Optional[str]  # cursor for ?after=, None on the last page
+    newer: Optional[str]  # cursor for ?before=, None on the first page
+
+
+def encode_cursor(post) -> str:
+    # An undated post leaves the date empty
+    date = post.publish_date.isoformat() if post.publish_date is not None else ""
+    raw = f"{date}|{post.id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Return (publish_date, id) from a cursor, the date None for an undated post; ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        date, post_id = raw.rsplit("|", 1)
+        return (datetime.fromisoformat(date) if date else None), int(post_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _date_key(dialect: str, value=Post.publish_date):
+    # SQLite keeps server-default and ORM-written timestamps in different text
+    # formats, so normalise both sides before comparing them there
+    if dialect == "sqlite":
+        return func.datetime(value)
+    return value
+
+
+def _beyond(dialect: str, date, post_id: int, newer: bool):
+    """
+    Posts past the cursor (date, post_id): older ones, or newer ones for
+    `newer`. Undated posts sit above every dated one on Postgres and below
+    them on SQLite, where the ORDER BY puts them; a tuple comparison with a
+    NULL is never true, so they take an explicit IS NULL branch.
+    """
+    nulls_high = dialect != "sqlite"
+    if date is None:
+        undated = and_(Post.publish_date.is_(None), Post.id > post_id if newer else Post.id < post_id)
+        return or_(undated, Post.publish_date.isnot(None)) if nulls_high != newer else undated
+
+    key = tuple_(_date_key(dialect), Post.id)
+    bound = tuple_(_date_key(dialect, date), post_id)
+    dated = key > bound if newer else key < bound
+    return or_(dated, Post.publish_date.is_(None)) if nulls_high == newer else dated
+
+
+def page_statement(statement, dialect: str, per_page: int, after: str = None, before: str = None):
+    """
+    Limit a select(Post) statement to one page, by keyset on (publish_date, id).
+
+    Every page is a single indexed range scan of per_page + 1 rows, so deep
+    pages cost the same as the first one. Rows come back newest first except
+    for `before` pages, which build_page() reverses.
+    """
+    if before:
+        date, post_id = decode_cursor(before)
+        return (
+            statement.where(_beyond(dialect, date, post_id, newer=True))
+            .order_by(_date_key(dialect).asc(), Post.id.asc())
+            .limit(per_page + 1)
+        )
+
+    if after:
+        date, post_id = decode_cursor(after)
+        statement = statement.where(_beyond(dialect, date, post_id, newer=False))
+
+    return statement.order_by(_date_key(dialect).desc(), Post.id.desc()).limit(per_page + 1)
+
+
+def build_page(rows, per_page: int, after: str = None, before: str = None) -> Page:
+    """Turn the rows of page_statement() into a Page with its neighbour cursors."""
+    rows = list(rows)
+    has_more = len(rows) > per_page
+
+    if before:
+        items = list(reversed(rows[:per_page]))
+        return Page(
+            items=items,
+            older=encode_cursor(items[-1]) if items else None,
+            newer=encode_cursor(items[0]) if has_more else None,
+        )
+
+    items = rows[:per_page]
+    return Page(
+        items=items,
+        older=encode_cursor(items[-1]) if has_more else None,
+        newer=encode_cursor(items[0]) if after and items else None,
+    )
+
+
+def paginate_posts(db, statement, per_page: int, after: str = None, before: str = None) -> Page:
+    """One page of posts, newest first; ValueError on a malformed cursor."""
+    dialect = db.get_bind().dialect.name
+    rows = db.scalars(page_statement(statement, dialect, per_page, after, before)).all()
+    return build_page(rows, per_page, after, before)
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+# Key in a connection record's info holding how long its last connect took
+_CONNECT_SECONDS = "pool_connect_seconds"
+
+
+class _InstrumentedPool:
+    """
+    Records how long checkouts wait and how full the pool gets.
+
+    Opening a new database connection is timed on its own and left out of
+    the wait, so a slow connect doesn't look like a pool that is too small.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._peak_checked_out = 0
+        self._connects = 0
+        self._connect_total = 0.0
+        self._connect_max = 0.0
+        creator = self._invoke_creator
+
+        def timed_creator(record):
+            started = time.perf_counter()
+            try:
+                return creator(record)
+            finally:
+                elapsed = time.perf_counter() - started
+                record.info[_CONNECT_SECONDS] = elapsed
+                with self._stats_lock:
+                    self._connects += 1
+                    self._connect_total += elapsed
+                    self._connect_max = max(self._connect_max, elapsed)
+
+        self._invoke_creator = timed_creator
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        # Set only when this checkout opened a new connection
+        waited = max(0.0, time.perf_counter() - started - connection.info.pop(_CONNECT_SECONDS, 0.0))
+
+        checked_out = self.checkedout()
+        with self._stats_lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._peak_checked_out = max(self._peak_checked_out, checked_out)
+        return connection
+
+    def capacity(self) -> int:
+        """Connections the pool may hold at once; 0 when overflow is unbounded."""
+        return self.size() + self._max_overflow if self._max_overflow >= 0 else 0
+
+    def stats(self) -> dict:
+        capacity = self.capacity()
+        checked_out = self.checkedout()
+        with self._stats_lock:
+            return {
+                "size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_out": checked_out,
+                "peak_checked_out": self._peak_checked_out,
+                "saturation": round(checked_out / capacity, 3) if capacity else None,
+                "peak_saturation": round(self._peak_checked_out / capacity, 3) if capacity else None,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "wait_avg_ms": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+                "connects": self._connects,
+                "connect_avg_ms": round(self._connect_total / self._connects * 1000, 3) if self._connects else 0.0,
+                "connect_max_ms": round(self._connect_max * 1000, 3),
+            }
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(engine) -> dict:
+    """Pool metrics for an engine (sync or async), whatever pool class it uses."""
+    pool = engine.pool
+    if isinstance(pool, _InstrumentedPool):
+        return pool.stats()
+    return {"pool": type(pool).__name__, "status": pool.status()}
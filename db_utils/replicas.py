@@ -0,0 +1,104 @@
+import itertools
+import threading
+import time
+from os import getenv
+
+from itsdangerous import BadSignature, TimestampSigner
+from sqlalchemy import exc
+
+
+# Cookie that sends an admin's reads to the primary right after a write
+PRIMARY_COOKIE = "read_primary"
+# How long that lasts: keep it above the replicas' usual replication lag (seconds)
+DB_REPLICA_STICKY_SECONDS = int(getenv("DB_REPLICA_STICKY_SECONDS", "30"))
+
+_signer = TimestampSigner(getenv("SESSION_SECRET_KEY", ""), salt="read-primary")
+
+
+class ReplicaSet:
+    """
+    Async engines for the read replicas, handed out round-robin.
+
+    A replica that fails to connect is skipped for retry_after seconds and
+    then tried again; while none is usable, reads go to the primary.
+    """
+
+    def __init__(self, engines, retry_after: float):
+        self.engines = list(engines)
+        self.retry_after = retry_after
+        self.fallbacks = 0
+        self._down_until = [0.0] * len(self.engines)
+        self._failures = [0] * len(self.engines)
+        self._rotation = itertools.count()
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def _candidates(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            start = next(self._rotation)
+            order = [(start + offset) % len(self.engines) for offset in range(len(self.engines))]
+            return [index for index in order if self._down_until[index] <= now]
+
+    async def connect(self, primary):
+        """An AsyncConnection to a healthy replica, or to primary if there is none."""
+        for index in self._candidates():
+            try:
+                connection = await self.engines[index].connect()
+            except exc.DBAPIError:
+                with self._lock:
+                    self._down_until[index] = time.monotonic() + self.retry_after
+                    self._failures[index] += 1
+                continue
+            with self._lock:
+                self._down_until[index] = 0.0
+            return connection
+
+        with self._lock:
+            self.fallbacks += 1
+        return await primary.connect()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "replicas": [
+                    {
+                        "url": engine.url.render_as_string(hide_password=True),
+                        "healthy": self._down_until[index] <= now,
+                        "failures": self._failures[index],
+                    }
+                    for index, engine in enumerate(self.engines)
+                ],
+                "primary_fallbacks": self.fallbacks,
+            }
+
+
+def pin_reads_to_primary(response, secure: bool = False) -> None:
+    """Send this client's public reads to the primary for DB_REPLICA_STICKY_SECONDS."""
+    response.set_cookie(
+        PRIMARY_COOKIE,
+        primary_cookie_value(),
+        max_age=DB_REPLICA_STICKY_SECONDS,
+        httponly=True,
+        samesite="lax",
+        secure=secure,
+    )
+
+
+def primary_cookie_value() -> str:
+    return _signer.sign(b"primary").decode("ascii")
+
+
+def reads_pinned(cookies) -> bool:
+    """Whether the request carries a valid, unexpired primary cookie."""
+    value = cookies.get(PRIMARY_COOKIE)
+    if not value:
+        return False
+    try:
+        _signer.unsign(value, max_age=DB_REPLICA_STICKY_SECONDS)
+    except BadSignature:
+        return False
+    return True
@@ -0,0 +1,54 @@
+import re
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db_utils.models import Post
+
+
+# How many times a slug is re-allocated when a concurrent write takes it first
+SLUG_ATTEMPTS = 3
+
+
+def ensure_unique_slug(db: Session, slug: str, exclude_post_id: int = None) -> str:
+    """Return slug, or slug-N with the lowest free N >= 2, in a single query."""
+    escaped = slug.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    query = db.query(Post.slug).filter(
+        or_(Post.slug == slug, Post.slug.like(f"{escaped}-%", escape="\\"))
+    )
+    if exclude_post_id is not None:
+        query = query.filter(Post.id != exclude_post_id)
+
+    taken = {row.slug for row in query}
+    if slug not in taken:
+        return slug
+
+    suffix = re.compile(re.escape(slug) + r"-(\d+)")
+    used = {int(match.group(1)) for match in map(suffix.fullmatch, taken) if match}
+    counter = 2
+    while counter in used:
+        counter += 1
+    return f"{slug}-{counter}"
+
+
+def assign_unique_slug(db: Session, post: Post, slug: str) -> None:
+    """
+    Give post a free slug derived from slug and flush it.
+
+    The flush runs in a savepoint so a unique-index conflict with a concurrent
+    write only rolls back this attempt; the slug is then allocated again.
+    Call it before making other changes to a persistent post, since a failed
+    attempt expires the post's unflushed state.
+    """
+    for attempt in range(SLUG_ATTEMPTS):
+        candidate = ensure_unique_slug(db, slug, exclude_post_id=post.id)
+        try:
+            with db.begin_nested():
+                post.slug = candidate
+                db.add(post)
+                db.flush()
+            return
+        except IntegrityError:
+            if attempt == SLUG_ATTEMPTS - 1:
+                raise
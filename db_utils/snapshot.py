@@ -0,0 +1,235 @@
+import bisect
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import exc, select, update
+from starlette.concurrency import run_in_threadpool
+
+import db_utils.database as database
+from db_utils.content_version import read_content_version
+from db_utils.in_memory import SingleFlightRebuild, deep_sizeof
+from db_utils.models import Post, Tag, post_tags
+from db_utils.pagination import Page, build_page, decode_cursor
+from render_utils.markdown import RENDERER_VERSION, cached_markdown, post_html_is_stale
+
+
+# Everything the public pages show of a post, without its Markdown source
+_POSTS = select(
+    Post.id, Post.title, Post.meta_title, Post.slug, Post.summary,
+    Post.content_html, Post.renderer_version, Post.publish_date, Post.updated_at,
+)
+_TAG_LINKS = select(post_tags.c.post_id, Tag.id, Tag.name).join(Tag, Tag.id == post_tags.c.tag_id)
+
+
+class TagRecord(NamedTuple):
+    id: int
+    name: str
+
+
+class PostRecord(NamedTuple):
+    id: int
+    title: str
+    meta_title: Optional[str]
+    slug: str
+    summary: Optional[str]
+    content_html: str
+    publish_date: datetime
+    updated_at: Optional[datetime]
+    tags: tuple  # of TagRecord, shared between the posts carrying the tag
+
+
+def _order_key(nulls_first: bool):
+    """
+    Sort key for (publish_date, id) in the database's order. A post without a
+    date sorts above every dated one on Postgres and below them on SQLite,
+    where the pages compare datetime(publish_date).
+    """
+    missing = 1 if nulls_first else -1
+
+    def key(publish_date, post_id):
+        if publish_date is None:
+            return missing, datetime.min, post_id
+        return 0, publish_date, post_id
+
+    return key
+
+
+class ContentSnapshot:
+    """
+    Immutable copy of what the public pages show: every post as a
+    PostRecord with its tags and rendered HTML, newest first, and by slug.
+
+    Pages are cut from the post list with the same keyset cursors as
+    db_utils.pagination, so links stay valid across snapshots. Nothing here
+    touches the database; a new content version gets a new snapshot.
+    """
+
+    def __init__(self, posts, tag_links, version: int, updated_at=None, rendered: dict = None, nulls_first=False):
+        started = time.perf_counter()
+        rendered = rendered or {}
+        self._key = _order_key(nulls_first)
+
+        tags, tags_by_post = {}, {}
+        for post_id, tag_id, name in tag_links:
+            tag = tags.get(tag_id)
+            if tag is None:
+                tag = tags[tag_id] = TagRecord(tag_id, name)
+            tags_by_post.setdefault(post_id, []).append(tag)
+
+        records = [
+            PostRecord(
+                row.id, row.title, row.meta_title, row.slug, row.summary,
+                rendered.get(row.id, row.content_html), row.publish_date, row.updated_at,
+                tuple(tags_by_post.get(row.id, ())),
+            )
+            for row in posts
+        ]
+        records.sort(key=lambda post: self._key(post.publish_date, post.id), reverse=True)
+
+        self.version = version
+        self.updated_at = updated_at
+        self.posts = tuple(records)
+        self.by_slug = {post.slug: post for post in records}
+        self.tags = len(tags)
+        self.last_published = next((post.publish_date for post in records if post.publish_date is not None), None)
+        # Oldest first, for bisecting cursors
+        self._ascending = self.posts[::-1]
+        self._keys = [self._key(post.publish_date, post.id) for post in self._ascending]
+        self.build_seconds = time.perf_counter() - started
+
+    def page(self, per_page: int, after: str = None, before: str = None) -> Page:
+        """paginate_posts() over the snapshot; ValueError on a malformed cursor."""
+        try:
+            if before:
+                start = bisect.bisect_right(self._keys, self._key(*decode_cursor(before)))
+                rows = self._ascending[start:start + per_page + 1]
+            else:
+                end = bisect.bisect_left(self._keys, self._key(*decode_cursor(after))) if after else len(self._keys)
+                rows = self._ascending[max(0, end - per_page - 1):end][::-1]
+        except TypeError as exc:
+            # A cursor date with a timezone where the stored ones have none, or the reverse
+            raise ValueError("Invalid cursor") from exc
+        return build_page(rows, per_page, after, before)
+
+    def memory_bytes(self) -> int:
+        return deep_sizeof((self.posts, self.by_slug, self._ascending, self._keys))
+
+
+async def _load(db, writable: bool) -> ContentSnapshot:
+    version, updated_at = await db.run_sync(read_content_version)
+    posts = (await db.execute(_POSTS)).all()
+    tag_links = (await db.execute(_TAG_LINKS)).all()
+
+    # HTML from an older renderer: render it here, and store it unless on a replica
+    stale = [row.id for row in posts if post_html_is_stale(row)]
+    rendered = {}
+    if stale:
+        sources = (await db.execute(select(Post.id, Post.post_content).where(Post.id.in_(stale)))).all()
+        rendered = await run_in_threadpool(lambda: {row.id: cached_markdown(row.post_content or "") for row in sources})
+        if writable:
+            await db.execute(update(Post), [
+                {"id": post_id, "content_html": html, "renderer_version": RENDERER_VERSION}
+                for post_id, html in rendered.items()
+            ])
+            await db.commit()
+
+    return await run_in_threadpool(
+        ContentSnapshot, posts, tag_links, version, updated_at, rendered,
+        nulls_first=db.bind.dialect.name != "sqlite",
+    )
+
+
+class ContentSnapshots:
+    """
+    The worker's current ContentSnapshot, rebuilt when the content version moves.
+
+    Snapshots are read where the public routes read: from a replica when any
+    are configured. Admins reading their own writes get one built from the
+    primary instead, kept apart so it never replaces the replicas' version.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self.pinned = None
+        self.rebuilds = 0
+        self.refresh_seconds = 0.0
+        self.served_on_error = 0
+        self._rebuild = SingleFlightRebuild()
+
+    async def refresh(self, primary: bool = False) -> ContentSnapshot:
+        """Build a new snapshot in one pass over the posts and swap it in."""
+        started = time.perf_counter()
+        if primary:
+            connection = await database.async_engine.connect()
+        else:
+            connection = await database.replicas.connect(database.async_engine)
+        try:
+            async with database.AsyncSessionLocal(bind=connection) as db:
+                snapshot = await _load(db, writable=connection.engine is database.async_engine)
+        finally:
+            await connection.close()
+
+        if primary:
+            self.pinned = snapshot
+        else:
+            self.snapshot = snapshot
+        self.rebuilds += 1
+        self.refresh_seconds = time.perf_counter() - started
+        return snapshot
+
+    async def current(self, pinned: bool = False) -> ContentSnapshot:
+        """
+        The snapshot to answer from, rebuilt by one request after admin
+        writes. If the database can't be reached, the last one is served.
+        """
+        if pinned and database.replicas:
+            return await self._current_on_primary()
+
+        snapshot = self.snapshot
+        try:
+            return await self._rebuild.current(snapshot, lambda version: self.refresh())
+        except (exc.DBAPIError, OSError):
+            if snapshot is None:
+                raise
+            self.served_on_error += 1
+        return snapshot
+
+    async def _current_on_primary(self) -> ContentSnapshot:
+        async with database.async_engine.connect() as connection:
+            version, _ = await connection.run_sync(read_content_version)
+        for snapshot in (self.pinned, self.snapshot):
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+        return await self.refresh(primary=True)
+
+    def clear(self) -> None:
+        self.snapshot = None
+        self.pinned = None
+        self.rebuilds = 0
+        self.refresh_seconds = 0.0
+        self.served_on_error = 0
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        counts = {"rebuilds": self.rebuilds, "served_on_error": self.served_on_error}
+        if snapshot is None:
+            return {"built": False, **counts}
+
+        memory = snapshot.memory_bytes()
+        return {
+            "built": True,
+            "version": snapshot.version,
+            "posts": len(snapshot.posts),
+            "tags": snapshot.tags,
+            # Queries included, then the in-memory part alone
+            "refresh_ms": round(self.refresh_seconds * 1000, 1),
+            "build_ms": round(snapshot.build_seconds * 1000, 1),
+            "memory_kib": round(memory / 1024, 1),
+            "kib_per_1k_posts": round(memory * 1000 / len(snapshot.posts) / 1024, 1) if snapshot.posts else None,
+            "pinned_version": None if self.pinned is None else self.pinned.version,
+            **counts,
+        }
+
+
+snapshots = ContentSnapshots()
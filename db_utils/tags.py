@@ -0,0 +1,50 @@
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from db_utils.models import Post, Tag
+
+
+_UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def parse_tag_names(tags_input: str) -> list:
+    """Split a comma-separated tag string, dropping blanks and repeats."""
+    return list(dict.fromkeys(t.strip() for t in tags_input.split(",") if t.strip()))
+
+
+def get_or_create_tags(db: Session, names: list) -> list:
+    """
+    Return Tag rows for names, creating the missing ones.
+
+    One IN lookup, plus one multi-row insert and a re-read when some are new.
+    The insert skips names another transaction created in the meantime.
+    """
+    if not names:
+        return []
+
+    found = {tag.name: tag for tag in db.query(Tag).filter(Tag.name.in_(names))}
+    missing = [name for name in names if name not in found]
+    if missing:
+        dialect_insert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+        rows = [{"name": name} for name in missing]
+        if dialect_insert is not None:
+            db.execute(dialect_insert(Tag).values(rows).on_conflict_do_nothing(index_elements=["name"]))
+        else:
+            db.execute(insert(Tag).values(rows))
+        found.update((tag.name, tag) for tag in db.query(Tag).filter(Tag.name.in_(missing)))
+
+    return [found[name] for name in names]
+
+
+def sync_tags(db: Session, post: Post, tags_input: str) -> bool:
+    """Point post at the tags named in tags_input. Returns False, writing nothing, if they already match."""
+    names = parse_tag_names(tags_input)
+    if set(names) == {tag.name for tag in post.tags}:
+        return False
+
+    post.tags = get_or_create_tags(db, names)
+    return True
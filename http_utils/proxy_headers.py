@@ -0,0 +1,113 @@
+import ipaddress
+from os import getenv
+
+
+# Upstreams whose X-Forwarded-* headers are believed, comma-separated: IPs,
+# networks like 172.16.0.0/12, or "*". Same variable and default as uvicorn's.
+FORWARDED_ALLOW_IPS = getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+_SCHEMES = {
+    "http": {"http": "http", "https": "https"},
+    "websocket": {"http": "ws", "https": "wss"},
+}
+
+
+class TrustedProxies:
+    """The addresses in FORWARDED_ALLOW_IPS; other entries (e.g. "testclient") match literally."""
+
+    def __init__(self, spec: str):
+        self.everything = False
+        self.networks = []
+        self.hosts = set()
+        for item in (part.strip() for part in spec.split(",")):
+            if item == "*":
+                self.everything = True
+            elif item:
+                try:
+                    self.networks.append(ipaddress.ip_network(item, strict=False))
+                except ValueError:
+                    self.hosts.add(item)
+
+    def __contains__(self, host) -> bool:
+        if self.everything:
+            return True
+        if host is None:
+            return False
+        if host in self.hosts:
+            return True
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.networks)
+
+    def client(self, forwarded_for: str) -> str:
+        """
+        The client in an X-Forwarded-For chain: the nearest address that isn't
+        one of ours. Entries left of it were supplied by the client and can't
+        be believed, so if every entry looks trusted the nearest one is taken.
+        """
+        hosts = [host.strip() for host in forwarded_for.split(",") if host.strip()]
+        for host in reversed(hosts):
+            if host not in self:
+                return host
+        return hosts[-1] if hosts else None
+
+
+class ProxyHeadersMiddleware:
+    """
+    Take the scheme and client address from X-Forwarded-Proto and
+    X-Forwarded-For, but only on connections from a trusted proxy. Runs
+    outermost, so cached pages, the 404 page's links and rate limits all see
+    what the client sent to the proxy.
+    """
+
+    def __init__(self, app, trusted: TrustedProxies):
+        self.app = app
+        self.trusted = trusted
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in _SCHEMES:
+            client = scope.get("client")
+            if (client[0] if client else None) in self.trusted:
+                self._apply(scope)
+        await self.app(scope, receive, send)
+
+    def _apply(self, scope) -> None:
+        proto = forwarded_for = None
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-proto":
+                proto = value
+            elif name == b"x-forwarded-for":
+                # Repeated headers are one list, in order
+                forwarded_for = value if forwarded_for is None else forwarded_for + b"," + value
+
+        if proto is not None:
+            # Several proxies each append theirs: the last one is the nearest
+            scheme = _SCHEMES[scope["type"]].get(proto.decode("latin-1").rsplit(",", 1)[-1].strip().lower())
+            if scheme is not None:
+                scope["scheme"] = scheme
+        if forwarded_for is not None:
+            host = self.trusted.client(forwarded_for.decode("latin-1"))
+            if host is not None:
+                scope["client"] = (host, 0)
+
+
+class PathScopedMiddleware:
+    """Run a middleware only for requests under prefix; everything else skips it."""
+
+    def __init__(self, app, prefix: str, middleware, **options):
+        self.app = app
+        self.prefix = prefix.rstrip("/")
+        self.scoped = middleware(app, **options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in _SCHEMES:
+            path = scope["path"]
+            if path == self.prefix or path.startswith(self.prefix + "/"):
+                await self.scoped(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+trusted_proxies = TrustedProxies(FORWARDED_ALLOW_IPS)
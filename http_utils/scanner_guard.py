@@ -0,0 +1,154 @@
+import re
+import threading
+
+from markupsafe import escape
+from sqlalchemy import exc
+from starlette.datastructures import Headers
+from starlette.requests import Request, cookie_parser
+
+from db_utils.replicas import reads_pinned
+from db_utils.snapshot import ContentSnapshots, snapshots
+
+
+# Paths that only vulnerability scanners ask for on this site, by counter name
+SCANNER_PATTERNS = {
+    "php": re.compile(r"\.php\d?(/|$)", re.IGNORECASE),
+    "wordpress": re.compile(r"^/(wp-|wordpress/|xmlrpc)", re.IGNORECASE),
+    # /.env, /.git/config, /.aws/credentials; /.well-known/ is left for ACME and friends
+    "dotfiles": re.compile(r"/\.(?!well-known/)"),
+    "server_scripts": re.compile(r"\.(aspx?|jsp|cgi|bak|old|sql|swp)$", re.IGNORECASE),
+    "admin_panels": re.compile(
+        r"^/(phpmyadmin|pma|myadmin|cgi-bin|boaform|actuator|manager/html|owa|vendor|hnap1|solr)(/|$)",
+        re.IGNORECASE,
+    ),
+}
+
+POST_PREFIX = "/posts/"
+
+
+class NotFoundPage:
+    """
+    404.html rendered once. Its links are absolute, so it is rendered
+    against a placeholder site URL and the request's is put in its place.
+    """
+
+    _PLACEHOLDER_HOST = "not-found.invalid"
+
+    def __init__(self, templates):
+        self.templates = templates
+        self._parts = None
+
+    def _render(self, app) -> list:
+        scope = {
+            "type": "http",
+            "app": app,
+            "method": "GET",
+            "scheme": "http",
+            "path": "/",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", self._PLACEHOLDER_HOST.encode())],
+        }
+        html = self.templates.get_template("404.html").render({"request": Request(scope)})
+        return html.encode("utf-8").split(f"http://{self._PLACEHOLDER_HOST}".encode())
+
+    def body(self, scope) -> bytes:
+        if self._parts is None:
+            self._parts = self._render(scope["app"])
+
+        # The scheme is the forwarded one: ProxyHeadersMiddleware runs first
+        site_url = str(Request(scope).base_url).rstrip("/")
+        return str(escape(site_url)).encode("utf-8").join(self._parts)
+
+
+class ScannerGuard:
+    """
+    Decides which requests are scanner probes and counts them.
+
+    Paths matching SCANNER_PATTERNS are probes, and so is GET /posts/{slug}
+    for a slug no post has, by the content snapshot's posts. Admins reading
+    their own writes from the primary are let through, since the snapshot may
+    be loaded from a lagging replica.
+    """
+
+    def __init__(self, snapshots: ContentSnapshots):
+        self.snapshots = snapshots
+        self.counts = dict.fromkeys([*SCANNER_PATTERNS, "unknown_slug"], 0)
+        self.passed = 0
+        self._lock = threading.Lock()
+
+    async def _blocked_as(self, scope):
+        path = scope["path"]
+        for name, pattern in SCANNER_PATTERNS.items():
+            if pattern.search(path):
+                return name
+
+        slug = path[len(POST_PREFIX):] if path.startswith(POST_PREFIX) else ""
+        if not slug or "/" in slug or scope["method"] not in ("GET", "HEAD"):
+            return None
+        if reads_pinned(cookie_parser(Headers(scope=scope).get("cookie", ""))):
+            return None
+        try:
+            snapshot = await self.snapshots.current()
+        except (exc.DBAPIError, OSError):
+            # Database unreachable: leave the answer to the route
+            return None
+        return None if slug in snapshot.by_slug else "unknown_slug"
+
+    async def blocked_as(self, scope):
+        """The counter name a probe is blocked under, or None to let it through."""
+        name = await self._blocked_as(scope)
+        with self._lock:
+            if name is None:
+                self.passed += 1
+            else:
+                self.counts[name] += 1
+        return name
+
+    def clear(self) -> None:
+        with self._lock:
+            self.counts = dict.fromkeys(self.counts, 0)
+            self.passed = 0
+
+    def stats(self) -> dict:
+        snapshot = self.snapshots.snapshot
+        with self._lock:
+            blocked = sum(self.counts.values())
+            return {
+                "blocked": dict(self.counts),
+                "blocked_total": blocked,
+                "passed": self.passed,
+                "blocked_share": round(blocked / (blocked + self.passed), 3) if blocked + self.passed else None,
+                "known_slugs": None if snapshot is None else len(snapshot.by_slug),
+            }
+
+
+class ScannerGuardMiddleware:
+    """
+    Answer scanner probes with the pre-rendered 404 page before any other
+    middleware or route runs: no session, database query or template render.
+    """
+
+    def __init__(self, app, guard: ScannerGuard, not_found: NotFoundPage):
+        self.app = app
+        self.guard = guard
+        self.not_found = not_found
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or await self.guard.blocked_as(scope) is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = self.not_found.body(scope)
+        await send({
+            "type": "http.response.start",
+            "status": 404,
+            "headers": [
+                (b"content-type", b"text/html; charset=utf-8"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+
+scanner_guard = ScannerGuard(snapshots)
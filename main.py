@@ -1,44 +1,65 @@
 #!/usr/bin/env python3
 
 
+import hashlib
 import os
-import re
 import time
 import html as html_module
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Optional
 from xml.etree.ElementTree import Element, SubElement, tostring
 
-import mistune
-
 from pathlib import Path
 from fastapi import FastAPI, Request, Depends, HTTPException
-from mistune.renderers.html import HTMLRenderer
-from fastapi.responses import HTMLResponse, PlainTextResponse, Response
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import db_utils.database as database
 import db_utils.models as models
-from db_utils.database import SessionLocal
+from db_utils.database import AsyncSessionLocal
+from db_utils.replicas import reads_pinned
+from db_utils.content_version import content_updated_at_async, current_content_version_async
+from db_utils.snapshot import snapshots
+from cache_utils.compression import compressed_response, encode_variants
+from cache_utils.conditional import (
+    is_not_modified,
+    latest,
+    make_etag,
+    not_modified_response,
+    template_version,
+    templates_modified,
+    validator_headers,
+)
+from cache_utils.page_cache import RENDERED_VERSION, PageCacheMiddleware
+from cache_utils.refill import refiller
+from http_utils.proxy_headers import PathScopedMiddleware, ProxyHeadersMiddleware, trusted_proxies
+from http_utils.scanner_guard import NotFoundPage, ScannerGuardMiddleware, scanner_guard
+from search_utils.fulltext import search_posts
+from search_utils.typeahead import typeahead
+from render_utils.streaming import render_page
+from render_utils.templates import create_templates
+from render_utils.markdown import RENDERER_VERSION
 from admin.auth import RequireLoginException, limiter, router as auth_router
 from admin.routes import router as admin_router
 
 
-class SchemeFixMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        if "x-forwarded-proto" in request.headers:
-            request.scope["scheme"] = request.headers["x-forwarded-proto"]
-
-        response = await call_next(request)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Public pages, suggestions and slug checks are answered from memory, so load them before traffic
+    await snapshots.refresh()
+    await typeahead.refresh()
+    yield
 
-        return response
 
-
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Session middleware for admin panel
 session_secret = os.getenv("SESSION_SECRET_KEY")
@@ -46,15 +67,19 @@ if not session_secret:
     raise RuntimeError("SESSION_SECRET_KEY environment variable is required but not set")
 https_only = os.getenv("HTTPS_ONLY", "false").lower() == "true"
 
+# Only the admin pages use the session: public page views don't decode its cookie
 app.add_middleware(
-    SessionMiddleware,
+    PathScopedMiddleware,
+    prefix="/admin",
+    middleware=SessionMiddleware,
     secret_key=session_secret,
     session_cookie="admin_session",
     max_age=3600,
+    path="/admin",
     same_site="strict",
     https_only=https_only,
 )
-app.add_middleware(SchemeFixMiddleware)
+app.add_middleware(PageCacheMiddleware)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.mount("/images", StaticFiles(directory="images"), name="images")
 
@@ -62,53 +87,45 @@ app.mount("/images", StaticFiles(directory="images"), name="images")
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-templates = Jinja2Templates(directory="templates")
+templates = create_templates("templates")
 app.state.templates = templates
+not_found_page = NotFoundPage(templates)
+
+# Scanner probes are answered before the session or any other middleware runs
+app.add_middleware(ScannerGuardMiddleware, guard=scanner_guard, not_found=not_found_page)
+# Outermost, so everything inside sees the forwarded scheme and client address
+app.add_middleware(ProxyHeadersMiddleware, trusted=trusted_proxies)
 
 
 BASE_DIR = Path(__file__).resolve().parent
 TEMPLATE_DIR = BASE_DIR / "templates"
+TEMPLATE_VERSION = template_version(TEMPLATE_DIR)
+TEMPLATES_MODIFIED = templates_modified(TEMPLATE_DIR)
 
 
-class CustomRenderer(HTMLRenderer):
+@asynccontextmanager
+async def public_session(pinned: bool):
     """
-    Custom renderer to add target="_blank" and rel="noopener noreferrer" to external links.
+    Session for the read-only public routes: on a replica when any are
+    configured, on the primary for an admin who has just written (pinned).
     """
+    if not database.replicas or pinned:
+        async with AsyncSessionLocal() as db:
+            db.info["pinned"] = bool(database.replicas)
+            yield db
+        return
 
-    def link(self, text, url, title=None):
-        html = super().link(text, url, title)
-
-        if url.startswith(("http://", "https://", "//")):
-            return html.replace("<a href=", '<a target="_blank" rel="noopener noreferrer" href=', 1)
-
-        return html.replace("<a href=", '<a target="_blank" href=', 1)
-
-
-    def heading(self, text, level, **attrs):
-        slug = re.sub(r'[^\w\s-]', '', re.sub(r'<[^>]+>', '', text)).strip().lower()
-        slug = re.sub(r'[-\s]+', '-', slug)
-        return f'<h{level} id="{slug}">{text}</h{level}>\n'
-
-    def image(self, text, url, title = None):
-        html = super().image(text, url, title = None)
-
-        return html.replace('<img src="', '<img class="center-image" src="', 1)
-
-
-markdown_processor = mistune.create_markdown(
-    renderer=CustomRenderer()
-)
-
-templates.env.filters["markdown"] = markdown_processor
-
+    connection = await database.replicas.connect(database.async_engine)
+    try:
+        async with AsyncSessionLocal(bind=connection) as db:
+            yield db
+    finally:
+        await connection.close()
 
-def get_db():
-    db = SessionLocal()
 
-    try:
+async def get_db(request: Request):
+    async with public_session(reads_pinned(request.cookies)) as db:
         yield db
-    finally:
-        db.close()
 
 
 @app.exception_handler(RequireLoginException)
@@ -120,7 +137,7 @@ async def require_login_handler(request: Request, exc: RequireLoginException):
 @app.exception_handler(StarletteHTTPException)
 async def not_found_exception_handler(request: Request, exc: StarletteHTTPException):
     if exc.status_code == 404:
-        return templates.TemplateResponse("404.html", {"request": request}, status_code=404)
+        return HTMLResponse(not_found_page.body(request.scope), status_code=404)
 
     return HTMLResponse(content=str(exc.detail), status_code=exc.status_code)
 
@@ -132,12 +149,16 @@ app.include_router(admin_router)
 
 @app.get("/robots.txt", response_class=PlainTextResponse, name="robots_txt")
 def robots_txt():
-    return "User-agent: *\nDisallow: /admin\n"
+    return "User-agent: *\nDisallow: /admin\nDisallow: /search\n"
 
 
-# RSS feed cache (regenerate at most every 15 minutes)
-_rss_cache: dict = {"xml": None, "timestamp": 0.0}
+# RSS feed variants live in the shared cache, one entry per site URL: regenerated
+# from the content snapshot at most every 15 minutes, or when content changes
 _RSS_CACHE_TTL = 900  # seconds
+_RSS_MAX_ITEMS = int(os.getenv("RSS_MAX_ITEMS", "50"))
+
+POSTS_PER_PAGE = int(os.getenv("POSTS_PER_PAGE", "20"))
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "20"))
 
 
 def _build_rss_feed(posts, site_url: str) -> bytes:
@@ -164,52 +185,122 @@ def _build_rss_feed(posts, site_url: str) -> bytes:
     return b'<?xml version="1.0" encoding="UTF-8"?>\n' + tostring(rss, encoding="unicode").encode("utf-8")
 
 
-@app.get("/feed.xml", name="rss_feed")
-def rss_feed(request: Request, db: Session = Depends(get_db)):
-    now = time.monotonic()
-    if _rss_cache["xml"] is not None and (now - _rss_cache["timestamp"]) < _RSS_CACHE_TTL:
-        return Response(content=_rss_cache["xml"], media_type="application/rss+xml")
+async def _listing_validators(db: AsyncSession, *parts):
+    """ETag and Last-Modified for pages built from the whole post list."""
+    last_published = await db.scalar(select(func.max(models.Post.publish_date)))
+    return (
+        make_etag(*parts, await current_content_version_async(db)),
+        latest(last_published, await content_updated_at_async(db)),
+    )
+
 
-    posts = db.query(models.Post).order_by(models.Post.id.desc()).all()
+def _snapshot_validators(snapshot, *parts):
+    """_listing_validators() for pages built from a content snapshot."""
+    return (
+        make_etag(*parts, snapshot.version),
+        latest(snapshot.last_published, snapshot.updated_at),
+    )
+
+
+@app.get("/feed.xml", name="rss_feed")
+async def rss_feed(request: Request):
     site_url = str(request.base_url).rstrip("/")
-    xml_bytes = _build_rss_feed(posts, site_url)
+    snapshot = await snapshots.current(reads_pinned(request.cookies))
 
-    _rss_cache["xml"] = xml_bytes
-    _rss_cache["timestamp"] = now
+    async def refill():
+        posts = snapshot.posts[:_RSS_MAX_ITEMS]
+        variants = await run_in_threadpool(lambda: encode_variants(_build_rss_feed(posts, site_url)))
+        return _snapshot_validators(snapshot, "feed"), variants
 
-    return Response(content=xml_bytes, media_type="application/rss+xml")
+    (etag, last_modified), variants = await refiller.get(
+        f"feed.xml:{site_url}", refill, ttl=_RSS_CACHE_TTL, version=snapshot.version,
+    )
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request.headers, etag, last_modified):
+        return not_modified_response(headers, request.headers)
+    return compressed_response(request, variants, "application/rss+xml", headers)
 
 
 @app.get("/", response_class=HTMLResponse, name="root")
-def root(request: Request, db: Session = Depends(get_db)):
+async def root(request: Request, after: Optional[str] = None, before: Optional[str] = None):
+    started = time.perf_counter()
+    snapshot = await snapshots.current(reads_pinned(request.cookies))
+    setattr(request.state, RENDERED_VERSION, snapshot.version)
+    etag, last_modified = _snapshot_validators(snapshot, "home", RENDERER_VERSION, TEMPLATE_VERSION, after, before)
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request.headers, etag, last_modified):
+        return not_modified_response(headers, request.headers)
+
     # projects = db.query(models.Project).order_by(models.Project.id.desc()).all()
-    posts = db.query(models.Post).order_by(models.Post.id.desc()).all()
+    try:
+        page = snapshot.page(POSTS_PER_PAGE, after=after, before=before)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid page cursor")
 
-    return templates.TemplateResponse("home.html", {
+    return render_page(templates, "home.html", {
         "request": request,
         # "projects": projects,
-        "posts": posts
-    })
+        "posts": page.items,
+        "page": page,
+    }, route="root", started=started, headers=headers)
 
 
 @app.get("/posts/{post_slug}", response_class=HTMLResponse, name="show_post")
-def show_post(request: Request, post_slug: str, db: Session = Depends(get_db)):
-    post = db.query(models.Post).filter(models.Post.slug == post_slug).first()
+async def show_post(request: Request, post_slug: str):
+    started = time.perf_counter()
+    snapshot = await snapshots.current(reads_pinned(request.cookies))
+    setattr(request.state, RENDERED_VERSION, snapshot.version)
 
-    if not post:
+    post = snapshot.by_slug.get(post_slug)
+    if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    meta_title = post.meta_title or post.title
-    html_content = markdown_processor(str(post.post_content))
+    etag = make_etag("post", post.id, snapshot.version, RENDERER_VERSION, TEMPLATE_VERSION)
+    last_modified = latest(post.publish_date, post.updated_at)
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request.headers, etag, last_modified):
+        return not_modified_response(headers, request.headers)
 
-    return templates.TemplateResponse(
+    return render_page(
+        templates,
         "post.html",
         {
             "request": request,
             "post": post,
-            "html_content": html_content,
-            "meta_title": meta_title
-        }
+            "html_content": post.content_html,
+            "meta_title": post.meta_title or post.title,
+        },
+        route="show_post",
+        started=started,
+        headers=headers,
+    )
+
+
+@app.get("/search", response_class=HTMLResponse, name="search")
+async def search(request: Request, q: str = "", db: AsyncSession = Depends(get_db)):
+    started = time.perf_counter()
+    # Hashed: the query may hold quotes or non-Latin-1 text, neither of which fits in a header
+    query_key = hashlib.sha256(q.strip().encode("utf-8")).hexdigest()[:16]
+    etag, last_modified = await _listing_validators(db, "search", TEMPLATE_VERSION, query_key)
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request.headers, etag, last_modified):
+        return not_modified_response(headers, request.headers)
+
+    results = await search_posts(db, q, SEARCH_MAX_RESULTS)
+    return render_page(templates, "search.html", {
+        "request": request,
+        "query": q.strip(),
+        "results": results,
+    }, route="search", started=started, headers=headers)
+
+
+@app.get("/search/suggest", name="search_suggest")
+async def search_suggest(q: str = ""):
+    index = await typeahead.current()
+    suggestions, elapsed = typeahead.suggest(index, q)
+    return JSONResponse(
+        {"query": q, "suggestions": [suggestion._asdict() for suggestion in suggestions]},
+        headers={"Server-Timing": f"suggest;dur={elapsed * 1000:.3f}", "Cache-Control": "public, max-age=60"},
     )
 
 
@@ -223,4 +314,10 @@ def show_example(request: Request, page_name: str):
     if not template_path.is_file():
         raise HTTPException(status_code=404, detail=f"Page {page_name} not found")
 
-    return templates.TemplateResponse(f"examples/{page_name}", {"request": request})
+    # Examples extend base.html: a change to any template makes them newer
+    last_modified = latest(datetime.fromtimestamp(template_path.stat().st_mtime, tz=timezone.utc), TEMPLATES_MODIFIED)
+    headers = validator_headers(make_etag("example", page_name, TEMPLATE_VERSION), last_modified)
+    if is_not_modified(request.headers, headers["ETag"], last_modified):
+        return not_modified_response(headers, request.headers)
+
+    return templates.TemplateResponse(f"examples/{page_name}", {"request": request}, headers=headers)
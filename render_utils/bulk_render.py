@@ -0,0 +1,109 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+
+from sqlalchemy import select, update
+
+from db_utils.content_version import bump_content_version
+from db_utils.database import SessionLocal
+from db_utils.models import Post
+from render_utils.markdown import RENDERER_VERSION, markdown_processor
+
+
+def _render_chunk(chunk):
+    """Worker entry point: render [(id, source), ...] to [(id, html), ...]."""
+    return [(post_id, markdown_processor(source)) for post_id, source in chunk]
+
+
+def _split(items, parts: int):
+    size = max(1, -(-len(items) // parts))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def iter_post_batches(db, batch_size: int, stale_only: bool = False):
+    """
+    Yield lists of plain rows ordered by id, one keyset page at a time.
+
+    Rows are not ORM objects, so nothing accumulates in the session's identity map
+    and memory stays bounded by batch_size however large the table is.
+    """
+    columns = (Post.id, Post.slug, Post.post_content, Post.content_html, Post.renderer_version)
+    last_id = 0
+    while True:
+        query = select(*columns).where(Post.id > last_id).order_by(Post.id).limit(batch_size)
+        if stale_only:
+            query = query.where(
+                (Post.content_html.is_(None))
+                | (Post.renderer_version.is_(None))
+                | (Post.renderer_version < RENDERER_VERSION)
+            )
+        rows = db.execute(query).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def rerender_posts(
+    batch_size: int = 500,
+    workers: int = None,
+    dry_run: bool = False,
+    stale_only: bool = False,
+    session_factory=SessionLocal,
+) -> dict:
+    """
+    Re-render stored post HTML with the current renderer.
+
+    Each batch is rendered across a process pool and written back in one bulk
+    UPDATE and commit. With dry_run nothing is written; the report still lists
+    the slugs whose HTML would change. workers <= 1 renders in-process.
+    """
+    if workers is None:
+        workers = cpu_count() or 1
+    report = {"posts": 0, "changed": [], "written": 0, "bytes": 0}
+    started = time.perf_counter()
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    db = session_factory()
+    try:
+        for rows in iter_post_batches(db, batch_size, stale_only):
+            sources = [(row.id, row.post_content or "") for row in rows]
+            if pool is None:
+                rendered = dict(_render_chunk(sources))
+            else:
+                rendered = {}
+                for chunk in pool.map(_render_chunk, _split(sources, workers)):
+                    rendered.update(chunk)
+
+            updates = []
+            for row in rows:
+                html = rendered[row.id]
+                report["posts"] += 1
+                report["bytes"] += len(row.post_content.encode("utf-8")) if row.post_content else 0
+                if html != row.content_html:
+                    report["changed"].append(row.slug)
+                elif row.renderer_version == RENDERER_VERSION:
+                    continue
+                updates.append({"id": row.id, "content_html": html, "renderer_version": RENDERER_VERSION})
+
+            if updates and not dry_run:
+                db.execute(update(Post), updates)
+                db.commit()
+                report["written"] += len(updates)
+
+        if report["changed"] and not dry_run:
+            bump_content_version(db)
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - started
+    report["seconds"] = round(elapsed, 3)
+    report["posts_per_sec"] = round(report["posts"] / elapsed, 1) if elapsed else 0.0
+    report["mb_per_sec"] = round(report["bytes"] / elapsed / (1024 * 1024), 2) if elapsed else 0.0
+    return report
@@ -0,0 +1,96 @@
+import re
+from functools import lru_cache
+from html import escape
+from os import getenv
+
+import mistune
+from mistune.renderers.html import HTMLRenderer
+from pygments import highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+
+from render_utils.cache import RenderCache
+
+
+class CustomRenderer(HTMLRenderer):
+    """
+    Custom renderer to add target="_blank" and rel="noopener noreferrer" to external links
+    and to highlight fenced code blocks with Pygments at render time.
+
+    Bump `version` whenever the generated HTML changes so stored renders get refreshed.
+    """
+
+    version = 2
+
+    def link(self, text, url, title=None):
+        html = super().link(text, url, title)
+
+        if url.startswith(("http://", "https://", "//")):
+            return html.replace("<a href=", '<a target="_blank" rel="noopener noreferrer" href=', 1)
+
+        return html.replace("<a href=", '<a target="_blank" href=', 1)
+
+
+    def heading(self, text, level, **attrs):
+        slug = re.sub(r'[^\w\s-]', '', re.sub(r'<[^>]+>', '', text)).strip().lower()
+        slug = re.sub(r'[-\s]+', '-', slug)
+        return f'<h{level} id="{slug}">{text}</h{level}>\n'
+
+    def image(self, text, url, title = None):
+        html = super().image(text, url, title = None)
+
+        return html.replace('<img src="', '<img class="center-image" src="', 1)
+
+    def block_code(self, code, info=None):
+        lang = info.strip().split(None, 1)[0] if info and info.strip() else None
+        lexer = _lexer_for(lang) if lang else None
+
+        if lexer is None:
+            return super().block_code(code, info)
+
+        body = highlight(code, lexer, _code_formatter)
+        return f'<pre class="highlight"><code class="language-{escape(lang)}">{body}</code></pre>\n'
+
+
+# Token classes only; colours come from static/highlight.css
+_code_formatter = HtmlFormatter(nowrap=True)
+
+
+@lru_cache(maxsize=64)
+def _lexer_for(lang: str):
+    try:
+        return get_lexer_by_name(lang, stripnl=False)
+    except ClassNotFound:
+        return None
+
+
+RENDERER_VERSION = CustomRenderer.version
+
+markdown_processor = mistune.create_markdown(
+    renderer=CustomRenderer()
+)
+
+
+render_cache = RenderCache(max_bytes=int(getenv("RENDER_CACHE_MAX_BYTES", str(8 * 1024 * 1024))))
+
+
+def cached_markdown(source) -> str:
+    """Render Markdown through the shared render cache."""
+    source = str(source)
+    key = RenderCache.make_key(source, RENDERER_VERSION)
+    html = render_cache.get(key)
+    if html is None:
+        html = markdown_processor(source)
+        render_cache.put(key, html)
+    return html
+
+
+def render_post(post) -> None:
+    """Render post.post_content and stamp it with the current renderer version."""
+    post.content_html = cached_markdown(post.post_content)
+    post.renderer_version = RENDERER_VERSION
+
+
+def post_html_is_stale(post) -> bool:
+    return post.content_html is None or (post.renderer_version or 0) < RENDERER_VERSION
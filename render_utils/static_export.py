@@ -0,0 +1,243 @@
+import fcntl
+import hashlib
+import html
+import json
+import os
+import tempfile
+from os import getenv
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from sqlalchemy.orm import selectinload, undefer
+from starlette.concurrency import run_in_threadpool
+
+from cache_utils.compression import BROTLI_QUALITY_STATIC, encode_variants
+from cache_utils.conditional import template_version
+import db_utils.database as database
+from db_utils.database import SessionLocal
+from db_utils.models import Post
+from db_utils.replicas import PRIMARY_COOKIE, primary_cookie_value
+from render_utils.markdown import RENDERER_VERSION
+
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+TEMPLATE_DIR = BASE_DIR / "templates"
+MANIFEST_NAME = ".export-manifest.json"
+LOCK_NAME = ".export.lock"
+
+# Where the admin "rebuild" action writes, and the public URL pages are rendered for
+EXPORT_DIR = getenv("STATIC_EXPORT_DIR")
+SITE_URL = getenv("SITE_URL", "https://grishuk.co.il")
+EXPORT_ON_WRITE = getenv("STATIC_EXPORT_ON_WRITE", "false").lower() == "true"
+
+
+def _hash(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _post_inputs(post) -> tuple:
+    return (
+        post.id,
+        post.title,
+        post.meta_title,
+        post.slug,
+        post.summary,
+        post.post_content,
+        post.publish_date,
+        sorted(tag.name for tag in post.tags),
+    )
+
+
+def _list_inputs(post) -> tuple:
+    return (
+        post.id,
+        post.title,
+        post.slug,
+        post.summary,
+        post.publish_date,
+        sorted(tag.name for tag in post.tags),
+    )
+
+
+def plan_pages(posts, templates_hash: str, base_url: str) -> dict:
+    """
+    Map every exported file to the hash of the inputs it is rendered from.
+    The base URL is one of them: pages and the feed carry absolute links.
+    """
+    listing = [_list_inputs(post) for post in posts]
+    pages = {
+        "index.html": ("/", _hash("home", base_url, templates_hash, RENDERER_VERSION, listing)),
+        "feed.xml": ("/feed.xml", _hash("feed", base_url, listing)),
+        "404.html": ("/404", _hash("404", base_url, templates_hash)),
+    }
+    for post in posts:
+        # Never let a hand-written slug escape the output directory
+        if "/" in post.slug or post.slug.startswith("."):
+            continue
+        pages[f"posts/{post.slug}.html"] = (
+            f"/posts/{post.slug}",
+            _hash("post", base_url, templates_hash, RENDERER_VERSION, _post_inputs(post)),
+        )
+    for example in sorted((TEMPLATE_DIR / "examples").glob("*.html")):
+        pages[f"examples/{example.name}"] = (f"/examples/{example.name}", _hash("example", base_url, templates_hash))
+    return pages
+
+
+def build_sitemap(base_url: str, paths) -> bytes:
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for path in sorted(paths):
+        lines.append(f"  <url>\n    <loc>{html.escape(base_url + path)}</loc>\n  </url>")
+    lines.append("</urlset>")
+    return "\n".join(lines).encode("utf-8")
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write via a temporary file and rename, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def _write_with_gzip(path: Path, data: bytes) -> None:
+    # nginx gzip_static serves the .gz sibling when the client accepts gzip
+    write_atomic(path, data)
+    variants = encode_variants(data, brotli_quality=BROTLI_QUALITY_STATIC)
+    gz_path = path.with_name(path.name + ".gz")
+    if "gzip" in variants:
+        write_atomic(gz_path, variants["gzip"])
+    elif gz_path.exists():
+        gz_path.unlink()
+
+
+def _remove(path: Path) -> None:
+    for candidate in (path, path.with_name(path.name + ".gz")):
+        if candidate.exists():
+            candidate.unlink()
+
+
+def _load_plan(base_url: str) -> dict:
+    db = SessionLocal()
+    try:
+        posts = (
+            db.query(Post)
+            .options(undefer(Post.post_content), selectinload(Post.tags))
+            .order_by(Post.id.desc())
+            .all()
+        )
+        return plan_pages(posts, template_version(TEMPLATE_DIR), base_url)
+    finally:
+        db.close()
+
+
+async def fetch_page(app, base_url: str, path: str):
+    """Run a GET request through the ASGI app in-process and return (status, body)."""
+    url = urlsplit(base_url)
+    port = url.port or (443 if url.scheme == "https" else 80)
+    headers = [(b"host", url.netloc.encode("latin-1")), (b"accept-encoding", b"identity")]
+    if database.replicas:
+        # The plan was read from the primary; render from it too, not a lagging replica
+        headers.append((b"cookie", f"{PRIMARY_COOKIE}={primary_cookie_value()}".encode("latin-1")))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": url.scheme,
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "server": (url.hostname, port),
+        "client": ("127.0.0.1", 0),
+    }
+    response = {"status": None, "body": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return response["status"], b"".join(response["body"])
+
+
+async def export_site(app, output_dir, base_url: str, force: bool = False) -> dict:
+    """
+    Render the public site into output_dir for nginx to serve directly.
+
+    Only pages whose input hash differs from the manifest of the previous
+    run are re-rendered; pages that no longer exist are removed. Exports
+    into one directory take turns, in this worker and across workers, so
+    each starts from the manifest the last one wrote.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / LOCK_NAME, "a") as lock:
+        await run_in_threadpool(fcntl.flock, lock.fileno(), fcntl.LOCK_EX)
+        try:
+            return await _export_locked(app, output_dir, base_url.rstrip("/"), force)
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+async def _export_locked(app, output_dir: Path, base_url: str, force: bool) -> dict:
+    manifest_path = output_dir / MANIFEST_NAME
+    try:
+        previous = json.loads(manifest_path.read_text())
+    except (FileNotFoundError, ValueError):
+        previous = {}
+
+    pages = await run_in_threadpool(_load_plan, base_url)
+
+    report = {"rendered": [], "skipped": [], "removed": []}
+    manifest = {}
+    for name, (path, input_hash) in pages.items():
+        target = output_dir / name
+        if not force and previous.get(name) == input_hash and target.exists():
+            report["skipped"].append(name)
+            manifest[name] = input_hash
+            continue
+
+        status, body = await fetch_page(app, base_url, path)
+        if status != 200 and not (name == "404.html" and status == 404):
+            raise RuntimeError(f"Rendering {path} returned HTTP {status}")
+
+        _write_with_gzip(target, body)
+        report["rendered"].append(name)
+        manifest[name] = input_hash
+
+    urls = [path for name, (path, _) in pages.items() if name.endswith(".html") and name != "404.html"]
+    sitemap_hash = _hash("sitemap", base_url, sorted(urls))
+    if force or previous.get("sitemap.xml") != sitemap_hash or not (output_dir / "sitemap.xml").exists():
+        _write_with_gzip(output_dir / "sitemap.xml", build_sitemap(base_url, urls))
+        report["rendered"].append("sitemap.xml")
+    else:
+        report["skipped"].append("sitemap.xml")
+    manifest["sitemap.xml"] = sitemap_hash
+
+    for name in previous:
+        if name not in manifest:
+            _remove(output_dir / name)
+            report["removed"].append(name)
+
+    write_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return report
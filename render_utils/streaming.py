@@ -0,0 +1,102 @@
+import threading
+import time
+from os import getenv
+
+from starlette.responses import StreamingResponse
+
+
+STREAM_TEMPLATES = getenv("STREAM_TEMPLATES", "false").lower() == "true"
+
+# Small Jinja output events are coalesced into chunks of roughly this size
+STREAM_CHUNK_SIZE = 4096
+
+
+class RenderTimings:
+    """Per-route time-to-first-byte and total render time, in milliseconds."""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, ttfb: float, total: float) -> None:
+        with self._lock:
+            stats = self._routes.setdefault(route, {
+                "count": 0, "ttfb_ms_total": 0.0, "ttfb_ms_max": 0.0,
+                "render_ms_total": 0.0, "render_ms_max": 0.0,
+            })
+            stats["count"] += 1
+            stats["ttfb_ms_total"] += ttfb * 1000
+            stats["ttfb_ms_max"] = max(stats["ttfb_ms_max"], ttfb * 1000)
+            stats["render_ms_total"] += total * 1000
+            stats["render_ms_max"] = max(stats["render_ms_max"], total * 1000)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                route: {
+                    "count": s["count"],
+                    "ttfb_ms_avg": round(s["ttfb_ms_total"] / s["count"], 3),
+                    "ttfb_ms_max": round(s["ttfb_ms_max"], 3),
+                    "render_ms_avg": round(s["render_ms_total"] / s["count"], 3),
+                    "render_ms_max": round(s["render_ms_max"], 3),
+                }
+                for route, s in self._routes.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+render_timings = RenderTimings()
+
+
+def _coalesce(events, chunk_size: int):
+    """
+    Group Jinja output events into chunks. A pending buffer is flushed before
+    an event that would overflow it, so a large block such as the post body
+    never delays the markup rendered before it.
+    """
+    buffer = []
+    size = 0
+    for event in events:
+        if buffer and size + len(event) > chunk_size:
+            yield "".join(buffer)
+            buffer, size = [], 0
+        buffer.append(event)
+        size += len(event)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _timed(chunks, route: str, started: float):
+    first = None
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter()
+        yield chunk
+    finished = time.perf_counter()
+    render_timings.record(route, (first or finished) - started, finished - started)
+
+
+def render_page(templates, name: str, context: dict, route: str, started: float, headers: dict = None):
+    """
+    Render a page template, streaming it with Jinja's generator API when
+    STREAM_TEMPLATES is on. Timings are recorded per route and mode either way.
+    """
+    if STREAM_TEMPLATES:
+        template = templates.get_template(name)
+        chunks = _coalesce(template.generate(context), STREAM_CHUNK_SIZE)
+        return StreamingResponse(
+            _timed(chunks, f"{route}:stream", started),
+            media_type="text/html; charset=utf-8",
+            headers=headers,
+        )
+
+    response = templates.TemplateResponse(name, context, headers=headers)
+    elapsed = time.perf_counter() - started
+    render_timings.record(f"{route}:buffered", elapsed, elapsed)
+    return response
@@ -0,0 +1,56 @@
+from os import getenv
+from pathlib import Path
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+
+from render_utils.markdown import cached_markdown
+
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+# "production" turns off mtime checks and loads compiled templates from disk
+TEMPLATE_MODE = getenv("TEMPLATE_MODE", "development").lower()
+TEMPLATE_CACHE_DIR = getenv("TEMPLATE_CACHE_DIR", str(BASE_DIR / ".jinja_cache"))
+
+
+def create_environment(directory, production: bool = None, cache_dir: str = None) -> jinja2.Environment:
+    """
+    Build the Jinja environment. In production mode templates are never
+    re-checked for changes and compiled bytecode is shared through a
+    directory that every worker on the host reads.
+    """
+    if production is None:
+        production = TEMPLATE_MODE == "production"
+
+    options = {
+        "loader": jinja2.FileSystemLoader(directory),
+        "autoescape": True,
+        "auto_reload": not production,
+    }
+    if production:
+        cache_dir = Path(cache_dir or TEMPLATE_CACHE_DIR)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        options["bytecode_cache"] = jinja2.FileSystemBytecodeCache(str(cache_dir))
+        # Keep every template in memory; the set is small and fixed
+        options["cache_size"] = -1
+
+    env = jinja2.Environment(**options)
+    # Filters must exist before templates are compiled
+    env.filters["markdown"] = cached_markdown
+    return env
+
+
+def precompile_templates(env: jinja2.Environment) -> list:
+    """Load every template once so it is compiled (and written to the bytecode cache)."""
+    names = env.list_templates(extensions=["html", "xml"])
+    for name in names:
+        env.get_template(name)
+    return names
+
+
+def create_templates(directory) -> Jinja2Templates:
+    env = create_environment(directory)
+    if TEMPLATE_MODE == "production":
+        precompile_templates(env)
+    return Jinja2Templates(env=env)
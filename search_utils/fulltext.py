@@ -0,0 +1,141 @@
+import re
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from markupsafe import Markup, escape
+from sqlalchemy import func, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import ts_headline, websearch_to_tsquery
+
+from db_utils.models import Post
+
+
+# Text search configuration of the generated posts.search_vector column;
+# queries must use the same one for the GIN index to apply
+TEXT_SEARCH_CONFIG = "english"
+
+# Maintained by Postgres from title (A), summary (B) and post_content (C), and
+# not mapped on Post so SQLite's create_all() never sees it
+SEARCH_VECTOR = literal_column("posts.search_vector")
+
+# Queries longer than this are cut before they reach the database
+MAX_QUERY_LENGTH = 200
+
+# ts_headline marks matches with these; they are swapped for <mark> after escaping
+_START, _STOP = "\x02", "\x03"
+_HEADLINE_OPTIONS = f'StartSel="{_START}", StopSel="{_STOP}", MaxWords=35, MinWords=15, MaxFragments=2'
+
+# Postgres' default setweight() weights for A, B and C
+_FALLBACK_WEIGHTS = (("title", 1.0), ("summary", 0.4), ("post_content", 0.2))
+_SNIPPET_CHARS = 200
+
+
+class SearchResult(NamedTuple):
+    id: int
+    title: str
+    slug: str
+    summary: str
+    publish_date: Optional[datetime]
+    rank: float
+    snippet: Markup  # escaped text with matches wrapped in <mark>
+
+
+def _highlight(text: str) -> Markup:
+    escaped = str(escape(text))
+    return Markup(escaped.replace(_START, "<mark>").replace(_STOP, "</mark>"))
+
+
+def _postgres_statement(query: str, limit: int):
+    tsquery = websearch_to_tsquery(TEXT_SEARCH_CONFIG, query)
+    rank = func.ts_rank_cd(SEARCH_VECTOR, tsquery)
+    # Rank and limit ids alone, so neither the sort nor ts_headline (the
+    # costly part) touches a post body that isn't returned
+    ranked = (
+        select(Post.id, rank.label("rank"))
+        .where(SEARCH_VECTOR.bool_op("@@")(tsquery))
+        .order_by(rank.desc(), Post.publish_date.desc())
+        .limit(limit)
+        .subquery()
+    )
+    headline = ts_headline(TEXT_SEARCH_CONFIG, Post.post_content, tsquery, _HEADLINE_OPTIONS)
+    return (
+        select(
+            Post.id, Post.title, Post.slug, Post.summary, Post.publish_date,
+            ranked.c.rank, headline.label("snippet"),
+        )
+        .join(ranked, ranked.c.id == Post.id)
+        .order_by(ranked.c.rank.desc(), Post.publish_date.desc())
+    )
+
+
+def _terms(query: str) -> list:
+    return [term.lower() for term in re.findall(r"\w+", query)]
+
+
+def _fallback_snippet(text: str, terms: list) -> Markup:
+    lowered = text.lower()
+    first = min((lowered.find(term) for term in terms if term in lowered), default=0)
+    start = max(0, first - _SNIPPET_CHARS // 4)
+    window = text[start:start + _SNIPPET_CHARS]
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    marked = pattern.sub(lambda match: f"{_START}{match.group(0)}{_STOP}", window)
+    return _highlight(("…" if start else "") + marked + ("…" if start + _SNIPPET_CHARS < len(text) else ""))
+
+
+def _fallback_rank(row, terms: list) -> float:
+    return sum(
+        weight * (getattr(row, column) or "").lower().count(term)
+        for column, weight in _FALLBACK_WEIGHTS
+        for term in terms
+    )
+
+
+def _fallback_statement(terms: list):
+    # Every term must appear in one of the weighted columns; a sequential
+    # scan, which is fine for the SQLite development and test databases
+    statement = select(Post.id, Post.title, Post.slug, Post.summary, Post.publish_date, Post.post_content)
+    for term in terms:
+        # Terms are \w+ runs, so "_" is the only LIKE wildcard they can hold
+        pattern = "%" + term.replace("_", "\\_") + "%"
+        statement = statement.where(
+            or_(*(getattr(Post, column).ilike(pattern, escape="\\") for column, _ in _FALLBACK_WEIGHTS))
+        )
+    return statement
+
+
+def _fallback_results(rows, terms: list, limit: int) -> list:
+    results = [
+        SearchResult(
+            row.id, row.title, row.slug, row.summary, row.publish_date,
+            _fallback_rank(row, terms), _fallback_snippet(row.post_content, terms),
+        )
+        for row in rows
+    ]
+    results.sort(key=lambda result: (result.rank, result.publish_date or datetime.min), reverse=True)
+    return results[:limit]
+
+
+async def search_posts(db, query: str, limit: int) -> list:
+    """
+    Posts matching query, best first, as SearchResults with highlighted snippets.
+
+    On Postgres this is one query against the GIN-indexed search_vector,
+    using websearch_to_tsquery syntax ("quoted phrases", -excluded, or).
+    Elsewhere every word of the query must appear in the title, summary or
+    body, ranked with the same column weights.
+    """
+    query = query.strip()[:MAX_QUERY_LENGTH]
+    if not query:
+        return []
+
+    if db.bind.dialect.name == "postgresql":
+        rows = (await db.execute(_postgres_statement(query, limit))).all()
+        return [
+            SearchResult(row.id, row.title, row.slug, row.summary, row.publish_date, row.rank, _highlight(row.snippet))
+            for row in rows
+        ]
+
+    terms = _terms(query)
+    if not terms:
+        return []
+    rows = (await db.execute(_fallback_statement(terms))).all()
+    return _fallback_results(rows, terms, limit)
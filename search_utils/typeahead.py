@@ -0,0 +1,244 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import NamedTuple
+from urllib.parse import quote
+
+from sqlalchemy import literal, select, union_all
+from starlette.concurrency import run_in_threadpool
+
+import db_utils.database as database
+from db_utils.content_version import current_content_version_async
+from db_utils.in_memory import SingleFlightRebuild, deep_sizeof
+from db_utils.models import Post, Tag
+
+
+SUGGEST_LIMIT = 8
+# Query words at least this long are corrected by trigram similarity when no word starts with them
+MIN_TRIGRAM_QUERY = 3
+MIN_TRIGRAM_OVERLAP = 0.5
+
+# Everything the index holds, in one query: posts, and tags that are on a post
+_ROWS = union_all(
+    select(literal("post"), Post.title, Post.slug),
+    select(literal("tag"), Tag.name, Tag.name).where(Tag.posts.any()),
+)
+
+
+class Suggestion(NamedTuple):
+    kind: str  # "post" or "tag"
+    label: str
+    url: str
+
+
+def normalize(text: str) -> str:
+    """Lowercase with accents stripped, so "Café" is found by "cafe"."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"\w+", normalize(text)))
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TypeaheadIndex:
+    """
+    Immutable prefix and trigram index over post titles, slugs and tag names.
+
+    Entries are numbered in rank order (posts before tags, then shorter
+    labels), and every word of a label or slug maps to the entries holding
+    it in that order. A prefix covers a bisect range of the sorted words, so
+    merging their lists yields matches best first and a lookup stops once it
+    has enough. Typos are corrected against the vocabulary's trigrams, which
+    grows with distinct words rather than with posts. Lookups never touch the
+    database; a rebuilt index replaces the old one whole.
+    """
+
+    def __init__(self, rows, version=None):
+        started = time.perf_counter()
+        ranked = sorted(
+            (kind != "post", len(label), normalize(label), kind, label, slug) for kind, label, slug in rows
+        )
+
+        suggestions, entry_words, postings = [], [], {}
+        for entry, (_, _, _, kind, label, slug) in enumerate(ranked):
+            url = f"/posts/{slug}" if kind == "post" else f"/search?q={quote(label)}"
+            suggestions.append(Suggestion(kind, label, url))
+            words = (_words(label) | _words(slug)) if kind == "post" else _words(label)
+            entry_words.append(tuple(words))
+            for word in words:
+                postings.setdefault(word, []).append(entry)
+
+        self.version = version
+        self.suggestions = tuple(suggestions)
+        self.posts = sum(1 for suggestion in suggestions if suggestion.kind == "post")
+        self._entry_words = tuple(entry_words)
+        self._keys = sorted(postings)
+        self._postings = [tuple(postings[key]) for key in self._keys]
+        trigrams = {}
+        for key in self._keys:
+            for gram in _trigrams(key):
+                trigrams.setdefault(gram, []).append(key)
+        self._trigrams = {gram: tuple(keys) for gram, keys in trigrams.items()}
+        by_label = sorted((row[2], entry) for entry, row in enumerate(ranked))
+        self._labels = [label for label, _ in by_label]
+        self._label_entries = [entry for _, entry in by_label]
+        self.build_seconds = time.perf_counter() - started
+
+    def _starting_with(self, query: str, limit: int) -> list:
+        # Whole labels that start with the query, e.g. a title typed out in full
+        found = []
+        position = bisect.bisect_left(self._labels, query)
+        while position < len(self._labels) and len(found) < limit and self._labels[position].startswith(query):
+            found.append(self._label_entries[position])
+            position += 1
+        return sorted(found)
+
+    def _key_range(self, prefix: str) -> tuple:
+        start = bisect.bisect_left(self._keys, prefix)
+        return start, bisect.bisect_left(self._keys, prefix + "\U0010ffff", start)
+
+    def _matching_words(self, words: list, exclude: set, limit: int) -> list:
+        # Driven by the longest word, whose range of keys is usually the smallest
+        driver = max(words, key=len)
+        others = [word for word in words if word != driver]
+        start, end = self._key_range(driver)
+
+        found, previous = [], None
+        for entry in heapq.merge(*self._postings[start:end]):
+            if entry == previous or entry in exclude:
+                continue
+            previous = entry
+            entry_words = self._entry_words[entry]
+            if all(any(word.startswith(other) for word in entry_words) for other in others):
+                found.append(entry)
+                if len(found) == limit:
+                    break
+        return found
+
+    def _corrected(self, word: str) -> str:
+        # The vocabulary word sharing the most trigrams, or the word itself
+        start, end = self._key_range(word)
+        if start < end or len(word) < MIN_TRIGRAM_QUERY:
+            return word
+        grams = _trigrams(word)
+        overlap = Counter(key for gram in grams for key in self._trigrams.get(gram, ()))
+        for key, shared in overlap.most_common(1):
+            if shared >= len(grams) * MIN_TRIGRAM_OVERLAP:
+                return key
+        return word
+
+    def suggest(self, query: str, limit: int = SUGGEST_LIMIT) -> list:
+        """
+        Labels starting with the whole query, then entries with a word
+        starting with each word of the query, in rank order. When nothing
+        matches, query words no word starts with are swapped for their
+        closest vocabulary word, to forgive typos.
+        """
+        query = normalize(query).strip()
+        words = re.findall(r"\w+", query)
+        if not words:
+            return []
+
+        found = self._starting_with(query, limit)
+        if len(found) < limit:
+            found += self._matching_words(words, set(found), limit - len(found))
+        if not found:
+            corrected = [self._corrected(word) for word in words]
+            if corrected != words:
+                found = self._matching_words(corrected, set(), limit)
+        return [self.suggestions[entry] for entry in found]
+
+    def memory_bytes(self) -> int:
+        return deep_sizeof((
+            self.suggestions, self._entry_words, self._keys, self._postings,
+            self._trigrams, self._labels, self._label_entries,
+        ))
+
+
+class Typeahead:
+    """The worker's current TypeaheadIndex, rebuilt when the content version moves."""
+
+    def __init__(self):
+        self.index = None
+        self.rebuilds = 0
+        self._rebuild = SingleFlightRebuild()
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._lookup_total = 0.0
+        self._lookup_max = 0.0
+
+    async def refresh(self, version: int = None) -> TypeaheadIndex:
+        """Build a new index from one query and swap it in."""
+        if version is None:
+            version = await current_content_version_async()
+
+        connection = await database.replicas.connect(database.async_engine)
+        try:
+            rows = (await connection.execute(_ROWS)).all()
+        finally:
+            await connection.close()
+
+        self.index = await run_in_threadpool(TypeaheadIndex, rows, version)
+        self.rebuilds += 1
+        return self.index
+
+    async def current(self) -> TypeaheadIndex:
+        """The index to answer from, rebuilt by one request after admin writes."""
+        return await self._rebuild.current(self.index, self.refresh)
+
+    def suggest(self, index: TypeaheadIndex, query: str, limit: int = SUGGEST_LIMIT):
+        """index.suggest(), timed; returns (suggestions, seconds)."""
+        started = time.perf_counter()
+        suggestions = index.suggest(query, limit)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._lookups += 1
+            self._lookup_total += elapsed
+            self._lookup_max = max(self._lookup_max, elapsed)
+        return suggestions, elapsed
+
+    def clear(self) -> None:
+        self.index = None
+        self.rebuilds = 0
+        with self._lock:
+            self._lookups = 0
+            self._lookup_total = 0.0
+            self._lookup_max = 0.0
+
+    def stats(self) -> dict:
+        index = self.index
+        with self._lock:
+            lookups = {
+                "lookups": self._lookups,
+                "lookup_avg_us": round(self._lookup_total / self._lookups * 1e6, 1) if self._lookups else 0.0,
+                "lookup_max_us": round(self._lookup_max * 1e6, 1),
+            }
+        if index is None:
+            return {"built": False, **lookups}
+
+        memory = index.memory_bytes()
+        return {
+            "built": True,
+            "version": index.version,
+            "posts": index.posts,
+            "entries": len(index.suggestions),
+            "keys": len(index._keys),
+            "memory_bytes": memory,
+            "memory_bytes_per_1k_posts": round(memory * 1000 / index.posts) if index.posts else None,
+            "build_ms": round(index.build_seconds * 1000, 3),
+            "rebuilds": self.rebuilds,
+            **lookups,
+        }
+
+
+typeahead = Typeahead()
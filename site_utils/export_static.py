@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+from argparse import ArgumentParser, Namespace
+from sys import path
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv(".env")
+
+# Set up project root path
+project_root = Path(__file__).resolve().parents[1]
+path.append(str(project_root))
+
+from main import app
+from render_utils.static_export import EXPORT_DIR, SITE_URL, export_site
+
+
+def parse_arguments() -> Namespace:
+    """Configures and parses command-line arguments."""
+    parser = ArgumentParser(description="Render the public site to static files for nginx.")
+    parser.add_argument("-o", "--output", default=EXPORT_DIR or "export", help="Output directory.")
+    parser.add_argument("-u", "--base-url", default=SITE_URL, help="Public site URL used in links.")
+    parser.add_argument("-f", "--force", action="store_true", help="Re-render every page.")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    report = asyncio.run(export_site(app, args.output, args.base_url, force=args.force))
+
+    for name in report["rendered"]:
+        print(f"   -> Rendered: {name}")
+    for name in report["removed"]:
+        print(f"   -> Removed: {name}")
+    print(
+        f"Export finished: {len(report['rendered'])} rendered, "
+        f"{len(report['skipped'])} unchanged, {len(report['removed'])} removed."
+    )
@@ -18,7 +18,11 @@ project_root = Path(__file__).resolve().parents[1]
 path.append(str(project_root))
 
 from db_utils.database import SessionLocal
-from db_utils.models import Project, Post, Tag
+from db_utils.content_version import bump_content_version
+from db_utils.models import Project, Post
+from db_utils.slugs import assign_unique_slug
+from db_utils.tags import sync_tags
+from render_utils.markdown import render_post
 
 
 def slugify(text):
@@ -75,7 +79,7 @@ def add_item(model_class, item_name: str) -> None:
     else:
         item_data["meta_title"] = None
 
-    item_data["slug"] = slugify(item_data["meta_title"] or item_data["title"])
+    slug = slugify(item_data["meta_title"] or item_data["title"])
     item_data["summary"] = input("Enter post summary: ")
     
     post_file = input("Enter post content markdown file name: ")
@@ -87,17 +91,13 @@ def add_item(model_class, item_name: str) -> None:
     db = SessionLocal()
     try:
         new_item = model_class(**item_data)
-        
+        render_post(new_item)
+        assign_unique_slug(db, new_item, slug)
+
         # Process and associate tags
-        tag_names = [tag.strip() for tag in tags_input.split(",") if tag.strip()]
-        for tag_name in tag_names:
-            tag = db.query(Tag).filter_by(name=tag_name).first()
-            if not tag:
-                tag = Tag(name=tag_name)
-                db.add(tag)
-            new_item.tags.append(tag)
-
-        db.add(new_item)
+        sync_tags(db, new_item, tags_input)
+
+        bump_content_version(db)
         db.commit()
         print(f"\nSuccessfully added new {item_name}: {title}")
 
@@ -135,6 +135,7 @@ def delete_item(model_class, item_name: str) -> None:
         confirm = input(f"Are you sure you want to delete '{item_to_delete.title}'? [y/N] ")
         if confirm.lower() == "y":
             db.delete(item_to_delete)
+            bump_content_version(db)
             db.commit()
             print(f"Successfully deleted '{title_to_delete}'.")
         else:
@@ -194,6 +195,7 @@ def modify_item(model_class, item_name: str) -> None:
         # You could add similar logic here for Project fields
         # ...
 
+        bump_content_version(db)
         db.commit()
         print(f"\nSuccessfully updated '{item_to_modify.title}'.")
 
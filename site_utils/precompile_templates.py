@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+
+
+from sys import path
+from pathlib import Path
+
+# Set up project root path
+project_root = Path(__file__).resolve().parents[1]
+path.append(str(project_root))
+
+from render_utils.templates import TEMPLATE_CACHE_DIR, create_environment, precompile_templates
+
+
+if __name__ == "__main__":
+    env = create_environment(project_root / "templates", production=True)
+    names = precompile_templates(env)
+
+    print(f"Compiled {len(names)} templates into '{TEMPLATE_CACHE_DIR}'")
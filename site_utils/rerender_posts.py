@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+
+from argparse import ArgumentParser, Namespace
+from sys import path
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv(".env")
+
+# Set up project root path
+project_root = Path(__file__).resolve().parents[1]
+path.append(str(project_root))
+
+from render_utils.bulk_render import rerender_posts
+
+
+def parse_arguments() -> Namespace:
+    """Configures and parses command-line arguments."""
+    parser = ArgumentParser(description="Re-render stored post HTML with the current Markdown renderer.")
+    parser.add_argument("-b", "--batch-size", type=int, default=500, help="Posts per batch and transaction.")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Render processes (default: CPU count).")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="Report changes without writing them.")
+    parser.add_argument("-s", "--stale-only", action="store_true",
+                        help="Only posts rendered by an older renderer version.")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    report = rerender_posts(
+        batch_size=args.batch_size,
+        workers=args.workers,
+        dry_run=args.dry_run,
+        stale_only=args.stale_only,
+    )
+
+    verb = "Would change" if args.dry_run else "Changed"
+    for slug in report["changed"]:
+        print(f"   -> {verb}: {slug}")
+    print(
+        f"Re-rendered {report['posts']} posts in {report['seconds']}s "
+        f"({report['posts_per_sec']} posts/sec, {report['mb_per_sec']} MB/sec); "
+        f"{len(report['changed'])} changed, {report['written']} written."
+    )
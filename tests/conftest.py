@@ -1,4 +1,7 @@
+import atexit
 import os
+import shutil
+import tempfile
 
 # Set DATABASE_URL before any app imports so db_utils.database picks it up
 os.environ.setdefault("DATABASE_URL", "sqlite:///")
@@ -6,8 +9,9 @@ os.environ.setdefault("SESSION_SECRET_KEY", "test-secret-key-not-for-production"
 
 import pytest
 from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from httpx import ASGITransport, AsyncClient
 
 from db_utils.database import Base
@@ -17,35 +21,75 @@ from db_utils.models import Post, Tag, AdminUser
 import bcrypt
 
 
-# In-memory SQLite engine shared across a test session
+# File-backed SQLite shared across a test session: the sync engine (admin
+# routes, fixtures) and the async engine (public routes) must see the same data
+DB_DIR = tempfile.mkdtemp(prefix="blog-tests-")
+DB_PATH = os.path.join(DB_DIR, "test.db")
+atexit.register(shutil.rmtree, DB_DIR, ignore_errors=True)
+
 engine = create_engine(
-    "sqlite://",
+    f"sqlite:///{DB_PATH}",
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{DB_PATH}", poolclass=NullPool)
+
 
 # Enable foreign keys for SQLite
 @event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Code that talks to the engines directly (e.g. content version checks) must
+# see the same database as the overridden sessions.
+db_mod.engine = engine
+db_mod.SessionLocal.configure(bind=engine)
+db_mod.async_engine = async_engine
+db_mod.AsyncSessionLocal.configure(bind=async_engine)
 
 
 @pytest.fixture(autouse=True)
 def setup_database():
     """Create all tables before each test, drop after."""
+    from db_utils import content_version
+    from cache_utils.backends import shared_cache
+    from cache_utils.page_cache import page_cache
+    from db_utils.snapshot import snapshots
+    from http_utils.scanner_guard import scanner_guard
+    from search_utils.typeahead import typeahead
+
     Base.metadata.create_all(bind=engine)
+    content_version.reset()
+    page_cache.clear()
+    shared_cache.clear()
+    snapshots.clear()
+    typeahead.clear()
+    scanner_guard.clear()
     yield
     Base.metadata.drop_all(bind=engine)
 
 
+def _forget_in_memory_indexes(session):
+    # Fixtures write without bumping the content version: make the app
+    # reload what it keeps in memory instead of answering from before them
+    from db_utils.snapshot import snapshots
+    from search_utils.typeahead import typeahead
+
+    snapshots.snapshot = snapshots.pinned = None
+    typeahead.index = None
+
+
 @pytest.fixture()
 def db():
     """Provide a transactional database session for tests."""
     session = TestingSessionLocal()
+    event.listen(session, "after_commit", _forget_in_memory_indexes)
     try:
         yield session
     finally:
@@ -60,6 +104,11 @@ def _override_get_db():
         session.close()
 
 
+async def _override_get_async_db():
+    async with TestingAsyncSessionLocal() as session:
+        yield session
+
+
 @pytest.fixture()
 def client():
     """Synchronous-style test client using httpx."""
@@ -67,7 +116,7 @@ def client():
     from admin.auth import get_db as auth_get_db, limiter
     from admin.routes import get_db as routes_get_db
 
-    app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_db] = _override_get_async_db
     app.dependency_overrides[auth_get_db] = _override_get_db
     app.dependency_overrides[routes_get_db] = _override_get_db
 
@@ -81,6 +130,36 @@ def client():
     app.dependency_overrides.clear()
 
 
+class QueryCounter:
+    """Records the SQL statements the test engines execute while active."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        self.statements = []
+        for target in (engine, async_engine.sync_engine):
+            event.listen(target, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        for target in (engine, async_engine.sync_engine):
+            event.remove(target, "before_cursor_execute", self)
+
+
+@pytest.fixture()
+def count_queries():
+    """Context manager counting SQL statements: `with count_queries() as q: ...; q.count`."""
+    return QueryCounter
+
+
 @pytest.fixture()
 def sample_post(db):
     """Insert a sample post and return it."""
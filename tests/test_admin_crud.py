@@ -1,5 +1,6 @@
 """Tests for admin CRUD operations on posts and tags."""
 import re
+from datetime import datetime
 
 from db_utils.models import Post, Tag
 
@@ -44,6 +45,8 @@ class TestAdminPosts:
         assert post is not None
         assert post.title == "New Post"
         assert len(post.tags) == 2
+        assert 'id="content"' in post.content_html
+        assert post.renderer_version is not None
 
     def test_create_post_with_custom_slug(self, admin_client, db):
         resp = admin_client.get("/admin/posts/new")
@@ -98,6 +101,55 @@ class TestAdminPosts:
 
         db.refresh(sample_post)
         assert sample_post.title == "Updated Title"
+        assert "Updated content" in sample_post.content_html
+
+    def test_unchanged_update_keeps_content_version(self, admin_client, sample_post, db):
+        from db_utils import content_version
+
+        published = datetime(2024, 5, 6, 7, 8, 9)
+        sample_post.publish_date = published
+        db.commit()
+        form = {
+            "title": "Test Post",
+            "meta_title": "",
+            "slug": "test-post",
+            "summary": "A test summary",
+            "tags_input": "python",
+            "post_content": "# Hello\n\nThis is **bold** text.",
+        }
+        edit_page = admin_client.get(f"/admin/posts/{sample_post.id}/edit")
+        # What the form sends back: the stored date to the minute, without a timezone
+        form["publish_date"] = re.search(r'name="publish_date"\s+value="([^"]+)"', edit_page.text).group(1)
+        admin_client.post(f"/admin/posts/{sample_post.id}/edit", data={**form, "csrf_token": _get_csrf(edit_page)})
+        content_version.reset()
+        version = content_version.current_content_version()
+        db.refresh(sample_post)
+        assert sample_post.publish_date == published
+
+        csrf = _get_csrf(admin_client.get(f"/admin/posts/{sample_post.id}/edit"))
+        resp = admin_client.post(
+            f"/admin/posts/{sample_post.id}/edit",
+            data={**form, "csrf_token": csrf},
+            follow_redirects=False,
+        )
+        assert resp.status_code == 303
+
+        content_version.reset()
+        assert content_version.current_content_version() == version
+        db.refresh(sample_post)
+        assert sample_post.publish_date == published
+
+    def test_publish_date_compared_to_the_minute_in_utc(self):
+        from datetime import timedelta, timezone
+
+        from admin.routes import _publish_date_changed
+
+        # Postgres hands back an aware value, here in UTC+2
+        stored = datetime(2024, 5, 6, 9, 8, 9, tzinfo=timezone(timedelta(hours=2)))
+
+        assert not _publish_date_changed(stored, datetime(2024, 5, 6, 7, 8))
+        assert _publish_date_changed(stored, datetime(2024, 5, 6, 7, 9))
+        assert _publish_date_changed(None, datetime(2024, 5, 6, 7, 8))
 
     def test_delete_post(self, admin_client, sample_post, db):
         resp = admin_client.get("/admin/")
@@ -0,0 +1,101 @@
+"""Tests for the bulk post re-render."""
+from db_utils import content_version
+from db_utils.models import Post
+from render_utils.bulk_render import iter_post_batches, rerender_posts
+from render_utils.markdown import RENDERER_VERSION, render_post
+
+
+def _add_posts(db, count, rendered=False, prefix="post"):
+    posts = []
+    for i in range(count):
+        post = Post(title=f"Post {i}", slug=f"{prefix}-{i}", summary="S", post_content=f"# Post {i}")
+        if rendered:
+            render_post(post)
+        db.add(post)
+        posts.append(post)
+    db.commit()
+    return posts
+
+
+class TestRerenderPosts:
+    def test_renders_stale_posts(self, db):
+        posts = _add_posts(db, 3)
+
+        report = rerender_posts(batch_size=2, workers=1)
+
+        assert report["posts"] == 3
+        assert report["written"] == 3
+        assert sorted(report["changed"]) == ["post-0", "post-1", "post-2"]
+        for i, post in enumerate(posts):
+            db.refresh(post)
+            assert f'<h1 id="post-{i}">' in post.content_html
+            assert post.renderer_version == RENDERER_VERSION
+
+    def test_dry_run_writes_nothing(self, db):
+        post = _add_posts(db, 1)[0]
+
+        report = rerender_posts(workers=1, dry_run=True)
+
+        assert report["changed"] == ["post-0"]
+        assert report["written"] == 0
+        db.refresh(post)
+        assert post.content_html is None
+
+    def test_up_to_date_posts_are_skipped(self, db):
+        _add_posts(db, 2, rendered=True)
+        version = content_version.current_content_version()
+
+        report = rerender_posts(workers=1)
+
+        assert report["posts"] == 2
+        assert report["changed"] == []
+        assert report["written"] == 0
+        assert content_version.current_content_version() == version
+
+    def test_old_version_with_same_html_is_restamped(self, db):
+        post = _add_posts(db, 1, rendered=True)[0]
+        post.renderer_version = RENDERER_VERSION - 1
+        db.commit()
+
+        report = rerender_posts(workers=1)
+
+        assert report["changed"] == []
+        assert report["written"] == 1
+        db.refresh(post)
+        assert post.renderer_version == RENDERER_VERSION
+
+    def test_change_bumps_content_version(self, db):
+        _add_posts(db, 1)
+        content_version.reset()
+        before = content_version.current_content_version()
+
+        rerender_posts(workers=1)
+        content_version.reset()
+
+        assert content_version.current_content_version() > before
+
+    def test_process_pool(self, db):
+        _add_posts(db, 4)
+
+        report = rerender_posts(batch_size=4, workers=2)
+
+        assert report["written"] == 4
+        assert report["posts_per_sec"] > 0
+
+
+class TestIterPostBatches:
+    def test_batches_cover_every_post_once(self, db):
+        _add_posts(db, 5)
+
+        batches = list(iter_post_batches(db, 2))
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert len({row.id for batch in batches for row in batch}) == 5
+
+    def test_stale_only(self, db):
+        _add_posts(db, 2, rendered=True)
+        _add_posts(db, 1, prefix="stale")
+
+        rows = [row for batch in iter_post_batches(db, 10, stale_only=True) for row in batch]
+
+        assert [row.slug for row in rows] == ["stale-0"]
@@ -0,0 +1,232 @@
+"""Tests for the shared cache backends and the feed cached in them."""
+import re
+import time
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from cache_utils.backends import MemoryBackend, RedisBackend, SQLiteBackend, cache_from_url
+from cache_utils.refill import Refiller
+
+
+class FakeRedis:
+    """In-process stand-in for the redis-py calls RedisBackend makes."""
+
+    def __init__(self):
+        self.values = {}
+        self.expiries = {}
+        self.sorted_sets = {}
+
+    def get(self, name):
+        if name in self.expiries and self.expiries[name] <= time.time():
+            self.delete(name)
+        return self.values.get(name)
+
+    def set(self, name, value, px=None, nx=False):
+        if nx and self.get(name) is not None:
+            return None
+        self.values[name] = value
+        self.expiries.pop(name, None)
+        if px is not None:
+            self.expiries[name] = time.time() + px / 1000
+        return True
+
+    def delete(self, *names):
+        for name in names:
+            self.values.pop(name, None)
+            self.expiries.pop(name, None)
+            self.sorted_sets.pop(name, None)
+
+    def zadd(self, name, mapping):
+        self.sorted_sets.setdefault(name, {}).update(mapping)
+
+    def zcard(self, name):
+        return len(self.sorted_sets.get(name, {}))
+
+    def zpopmin(self, name, count):
+        members = sorted(self.sorted_sets.get(name, {}).items(), key=lambda item: item[1])[:count]
+        for member, _ in members:
+            del self.sorted_sets[name][member]
+        return [(member.encode(), score) for member, score in members]
+
+
+class BrokenRedis:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise RedisConnectionError("connection refused")
+        return fail
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def make_backend(request, tmp_path):
+    """Factory for backends of one kind; SQLite and Redis ones share a store."""
+    client = FakeRedis()
+
+    def make(max_entries=3, default_ttl=None):
+        if request.param == "memory":
+            return MemoryBackend(max_entries, default_ttl)
+        if request.param == "sqlite":
+            return SQLiteBackend(str(tmp_path / "cache.db"), max_entries, default_ttl)
+        return RedisBackend(client, max_entries, default_ttl)
+
+    make.kind = request.param
+    return make
+
+
+class TestBackends:
+    def test_round_trip(self, make_backend):
+        cache = make_backend()
+        cache.set("feed", {"identity": b"<rss/>", "gzip": b"\x1f\x8b"})
+
+        assert cache.get("feed") == {"identity": b"<rss/>", "gzip": b"\x1f\x8b"}
+        assert cache.get("missing") is None
+
+    def test_ttl(self, make_backend):
+        cache = make_backend(default_ttl=60)
+        cache.set("short", b"x", ttl=0.01)
+        cache.set("long", b"y")
+        time.sleep(0.02)
+
+        assert cache.get("short") is None
+        assert cache.get("long") == b"y"
+
+    def test_size_limit_evicts_oldest(self, make_backend):
+        cache = make_backend(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, key.encode())
+            time.sleep(0.001)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == b"b"
+        assert cache.get("c") == b"c"
+        assert cache.stats()["entries"] == 2
+
+    def test_zero_entries_disables(self, make_backend):
+        cache = make_backend(max_entries=0)
+        cache.set("a", b"a")
+
+        assert cache.get("a") is None
+
+    def test_add_only_when_absent(self, make_backend):
+        cache = make_backend()
+
+        assert cache.add("lock", 1, ttl=60) is True
+        assert cache.add("lock", 2, ttl=60) is False
+        assert cache.peek("lock") == 1
+        cache.delete("lock")
+        assert cache.add("lock", 3, ttl=0.01) is True
+        time.sleep(0.02)
+        assert cache.add("lock", 4, ttl=60) is True
+        assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+    def test_delete_and_clear(self, make_backend):
+        cache = make_backend()
+        cache.set("a", b"a")
+        cache.set("b", b"b")
+        cache.delete("a")
+
+        assert cache.get("a") is None
+        cache.clear()
+        assert cache.get("b") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_hit_rate(self, make_backend):
+        cache = make_backend()
+        cache.set("a", b"a")
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+
+        stats = cache.stats()
+        assert (stats["backend"], stats["hits"], stats["misses"]) == (make_backend.kind, 2, 1)
+        assert stats["hit_rate"] == 0.667
+
+    def test_workers_share_sqlite_and_redis(self, make_backend):
+        writer, reader = make_backend(), make_backend()
+        writer.set("a", b"a")
+
+        expected = None if make_backend.kind == "memory" else b"a"
+        assert reader.get("a") == expected
+
+
+class TestRedisBackend:
+    def test_unreachable_server_is_a_miss(self):
+        cache = RedisBackend(BrokenRedis(), max_entries=10)
+        cache.set("a", b"a")
+
+        assert cache.get("a") is None
+        assert cache.stats()["errors"] == 2
+        assert cache.stats()["entries"] is None
+
+    def test_unreachable_server_on_delete(self):
+        cache = RedisBackend(BrokenRedis(), max_entries=10)
+        cache.add("a", b"a", ttl=10)
+        cache.delete("a")
+
+        assert cache.stats()["errors"] == 2
+
+    def test_keys_are_prefixed(self):
+        client = FakeRedis()
+        RedisBackend(client, max_entries=10, prefix="site:").set("feed", b"x", ttl=60)
+
+        assert "site:feed" in client.values
+        assert client.expiries["site:feed"] > time.time() + 59
+
+
+class TestCacheFromUrl:
+    def test_schemes(self, tmp_path):
+        assert isinstance(cache_from_url("memory://", 10), MemoryBackend)
+        sqlite = cache_from_url(f"sqlite:///{tmp_path}/cache.db", 10)
+        assert isinstance(sqlite, SQLiteBackend) and sqlite.path == f"{tmp_path}/cache.db"
+        assert isinstance(cache_from_url("redis://localhost:6379/0", 10), RedisBackend)
+
+    def test_unknown_scheme(self):
+        with pytest.raises(ValueError):
+            cache_from_url("memcached://localhost", 10)
+
+
+class TestFeedCache:
+    def test_feed_is_served_from_a_shared_store(self, client, sample_post, count_queries, monkeypatch):
+        import main
+
+        store = FakeRedis()
+        monkeypatch.setattr(main, "refiller", Refiller(RedisBackend(store, max_entries=10), grace=60))
+        first = client.get("/feed.xml")
+
+        # Another worker on the same store doesn't rebuild the feed
+        monkeypatch.setattr(main, "refiller", Refiller(RedisBackend(store, max_entries=10), grace=60))
+        with count_queries() as queries:
+            second = client.get("/feed.xml")
+
+        assert second.content == first.content
+        assert "Test Post" in second.text
+        assert main.refiller.cache.stats()["hits"] == 1
+        assert not any("posts.summary" in statement for statement in queries.statements)
+
+    def test_feed_is_served_while_the_store_is_down(self, client, sample_post, monkeypatch):
+        import main
+
+        # Every call fails, including the refill lock's add and delete
+        monkeypatch.setattr(main, "refiller", Refiller(RedisBackend(BrokenRedis(), max_entries=10), grace=60))
+        resp = client.get("/feed.xml")
+
+        assert resp.status_code == 200
+        assert "Test Post" in resp.text
+        assert main.refiller.cache.stats()["errors"] == 4
+
+    def test_admin_write_refills_the_entry(self, admin_client, sample_post):
+        from cache_utils.backends import shared_cache
+
+        admin_client.get("/feed.xml")
+        edit_page = admin_client.get(f"/admin/posts/{sample_post.id}/edit").text
+        csrf = re.search(r'name="csrf_token"\s+value="([^"]+)"', edit_page).group(1)
+        admin_client.post(
+            f"/admin/posts/{sample_post.id}/edit",
+            data={
+                "title": "Renamed Post", "meta_title": "", "slug": "test-post", "summary": "S",
+                "tags_input": "", "post_content": "Body", "publish_date": "", "csrf_token": csrf,
+            },
+        )
+
+        assert "Renamed Post" in admin_client.get("/feed.xml").text
+        assert shared_cache.stats()["entries"] == 1
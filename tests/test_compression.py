@@ -0,0 +1,114 @@
+"""Tests for pre-compressed page and feed variants."""
+import asyncio
+import gzip
+
+import brotli
+
+from cache_utils.compression import choose_encoding, encode_variants, minify_html
+from cache_utils.page_cache import PageCacheMiddleware, page_cache
+
+
+
+def _build_page(middleware, start, chunks):
+    # A private loop: asyncio.run() would leave this thread without a current one
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(middleware._build_page(start, chunks))
+    finally:
+        loop.close()
+
+class TestChooseEncoding:
+    def test_prefers_brotli(self):
+        assert choose_encoding("gzip, deflate, br", {"identity", "gzip", "br"}) == "br"
+
+    def test_respects_quality_values(self):
+        assert choose_encoding("br;q=0.1, gzip;q=0.9", {"identity", "gzip", "br"}) == "gzip"
+
+    def test_zero_quality_excludes_encoding(self):
+        assert choose_encoding("br;q=0, gzip", {"identity", "gzip", "br"}) == "gzip"
+
+    def test_missing_header_is_identity(self):
+        assert choose_encoding("", {"identity", "gzip", "br"}) == "identity"
+
+    def test_unavailable_variant_falls_back(self):
+        assert choose_encoding("br", {"identity"}) == "identity"
+
+    def test_wildcard(self):
+        assert choose_encoding("*", {"identity", "gzip"}) == "gzip"
+
+
+class TestEncodeVariants:
+    def test_variants_round_trip(self):
+        body = b"<p>hello world</p>" * 100
+        variants = encode_variants(body)
+
+        assert variants["identity"] == body
+        assert gzip.decompress(variants["gzip"]) == body
+        assert brotli.decompress(variants["br"]) == body
+
+    def test_brotli_quality(self):
+        body = b"<p>hello world</p>" * 100
+
+        assert brotli.decompress(encode_variants(body, brotli_quality=11)["br"]) == body
+        assert brotli.decompress(encode_variants(body, brotli_quality=1)["br"]) == body
+
+    def test_small_bodies_are_not_compressed(self):
+        assert set(encode_variants(b"tiny")) == {"identity"}
+
+    def test_minify_collapses_whitespace_outside_pre(self):
+        body = b"<div>\n        <p>a    b</p>\n    </div>\n<pre>  keep\n    this</pre>"
+        result = minify_html(body)
+
+        assert b"<div>\n<p>a b</p>\n</div>" in result
+        assert b"<pre>  keep\n    this</pre>" in result
+
+
+class TestCompressedPages:
+    def test_page_served_with_brotli(self, client, sample_post):
+        for _ in range(2):
+            resp = client.get("/", headers={"Accept-Encoding": "br"})
+            assert resp.headers["content-encoding"] == "br"
+            assert resp.headers["vary"] == "Accept-Encoding"
+            assert "Test Post" in resp.text
+
+    def test_page_served_with_gzip(self, client, sample_post):
+        resp = client.get("/posts/test-post", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["content-encoding"] == "gzip"
+        assert resp.headers["etag"].endswith('-gzip"')
+        assert "Test Post" in resp.text
+
+    def test_identity_when_not_accepted(self, client, sample_post):
+        resp = client.get("/posts/test-post", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in resp.headers
+        assert int(resp.headers["content-length"]) == len(resp.content)
+
+    def test_compressed_etag_revalidates(self, client, sample_post):
+        etag = client.get("/posts/test-post", headers={"Accept-Encoding": "br"}).headers["etag"]
+        page_cache.clear()
+
+        resp = client.get("/posts/test-post", headers={"Accept-Encoding": "br", "If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.headers["etag"] == etag
+
+    def test_feed_served_compressed(self, client, sample_post):
+        from cache_utils.backends import shared_cache
+        shared_cache.clear()
+
+        resp = client.get("/feed.xml", headers={"Accept-Encoding": "gzip"})
+        assert resp.status_code == 200
+        assert resp.headers["vary"] == "Accept-Encoding"
+        assert "Test Post" in resp.text
+
+    def test_middleware_minifies_stored_html(self):
+        middleware = PageCacheMiddleware(app=None, minify=True)
+        start = {"status": 200, "headers": [(b"content-type", b"text/html; charset=utf-8")]}
+
+        _, _, _, variants = _build_page(middleware, start, [b"<p>\n      a</p>"])
+        assert variants["identity"] == b"<p>\na</p>"
+
+    def test_middleware_does_not_minify_other_types(self):
+        middleware = PageCacheMiddleware(app=None, minify=True)
+        start = {"status": 200, "headers": [(b"content-type", b"text/plain")]}
+
+        _, _, _, variants = _build_page(middleware, start, [b"a\n      b"])
+        assert variants["identity"] == b"a\n      b"
@@ -0,0 +1,133 @@
+"""Tests for ETag / Last-Modified validation and 304 responses."""
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event
+from starlette.datastructures import Headers
+
+from cache_utils.conditional import http_date, is_not_modified, make_etag
+from cache_utils.page_cache import page_cache
+
+
+class TestIsNotModified:
+    def test_matching_etag(self):
+        headers = Headers({"if-none-match": '"abc"'})
+        assert is_not_modified(headers, '"abc"')
+
+    def test_weak_etag_in_list_matches(self):
+        headers = Headers({"if-none-match": '"x", W/"abc"'})
+        assert is_not_modified(headers, '"abc"')
+
+    def test_star_matches(self):
+        assert is_not_modified(Headers({"if-none-match": "*"}), '"abc"')
+
+    def test_mismatched_etag(self):
+        assert not is_not_modified(Headers({"if-none-match": '"old"'}), '"new"')
+
+    def test_etag_takes_precedence_over_date(self):
+        modified = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        headers = Headers({
+            "if-none-match": '"old"',
+            "if-modified-since": http_date(datetime(2026, 6, 1, tzinfo=timezone.utc)),
+        })
+        assert not is_not_modified(headers, '"new"', modified)
+
+    def test_if_modified_since(self):
+        modified = datetime(2026, 1, 1, 12, 0, 0, 500, tzinfo=timezone.utc)
+        assert is_not_modified(Headers({"if-modified-since": http_date(modified)}), '"e"', modified)
+
+        earlier = http_date(datetime(2025, 1, 1, tzinfo=timezone.utc))
+        assert not is_not_modified(Headers({"if-modified-since": earlier}), '"e"', modified)
+
+    def test_invalid_date_is_ignored(self):
+        modified = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        assert not is_not_modified(Headers({"if-modified-since": "garbage"}), '"e"', modified)
+
+    def test_make_etag_is_quoted(self):
+        assert make_etag("post", 1, 2) == '"post-1-2"'
+
+
+@pytest.mark.parametrize("path", ["/", "/posts/test-post", "/feed.xml", "/examples/cpu_and_memory.html"])
+class TestConditionalRoutes:
+    def test_response_carries_validators(self, client, sample_post, path):
+        resp = client.get(path)
+        assert resp.status_code == 200
+        assert resp.headers["etag"].startswith('"')
+        assert "last-modified" in resp.headers
+
+    def test_if_none_match_returns_304(self, client, sample_post, path):
+        etag = client.get(path).headers["etag"]
+        page_cache.clear()
+
+        resp = client.get(path, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+        assert resp.headers["etag"] == etag
+
+    def test_if_modified_since_returns_304(self, client, sample_post, path):
+        last_modified = client.get(path).headers["last-modified"]
+        page_cache.clear()
+
+        resp = client.get(path, headers={"If-Modified-Since": last_modified})
+        assert resp.status_code == 304
+
+
+class TestConditionalPages:
+    def test_cache_hit_answers_304(self, client, sample_post):
+        etag = client.get("/posts/test-post").headers["etag"]
+        resp = client.get("/posts/test-post", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.headers["x-cache"] == "HIT"
+
+    def test_stale_etag_gets_full_page(self, client, sample_post):
+        resp = client.get("/posts/test-post", headers={"If-None-Match": '"stale"'})
+        assert resp.status_code == 200
+        assert "Test Post" in resp.text
+
+    def test_304_does_not_load_post_body(self, client, sample_post):
+        from tests.conftest import engine
+
+        etag = client.get("/posts/test-post").headers["etag"]
+        page_cache.clear()
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            resp = client.get("/posts/test-post", headers={"If-None-Match": etag})
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert resp.status_code == 304
+        assert not any("post_content" in statement for statement in statements)
+
+    def test_etag_changes_after_content_version_bump(self, client, sample_post, db):
+        from db_utils.content_version import bump_content_version
+
+        etag = client.get("/posts/test-post").headers["etag"]
+        bump_content_version(db)
+        db.commit()
+
+        assert client.get("/posts/test-post").headers["etag"] != etag
+
+
+class TestExamplePages:
+    def test_each_page_has_its_own_etag(self, client):
+        first = client.get("/examples/cpu_and_memory.html").headers["etag"]
+        other = client.get("/examples/display_info.html")
+
+        assert other.headers["etag"] != first
+        assert client.get("/examples/display_info.html", headers={"If-None-Match": first}).status_code == 200
+
+    def test_last_modified_follows_the_templates(self, client, monkeypatch):
+        import main
+
+        edited = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        monkeypatch.setattr(main, "TEMPLATES_MODIFIED", edited)
+
+        resp = client.get("/examples/cpu_and_memory.html")
+
+        assert resp.headers["last-modified"] == http_date(edited)
@@ -0,0 +1,230 @@
+"""Tests for the full-page response cache and content version invalidation."""
+import re
+
+from sqlalchemy import select, update
+
+from db_utils import content_version
+from db_utils.models import ContentVersion, Post
+
+
+def _get_csrf(response):
+    match = re.search(r'name="csrf_token"\s+value="([^"]+)"', response.text)
+    if match:
+        return match.group(1)
+    raise ValueError("CSRF token not found")
+
+
+class TestPageCache:
+    def test_second_request_is_served_from_cache(self, client, sample_post):
+        first = client.get("/posts/test-post")
+        second = client.get("/posts/test-post")
+
+        assert first.headers["x-cache"] == "MISS"
+        assert second.headers["x-cache"] == "HIT"
+        assert first.text == second.text
+
+    def test_home_page_is_cached(self, client, sample_post):
+        client.get("/")
+        assert client.get("/").headers["x-cache"] == "HIT"
+
+    def test_404_is_not_cached(self, client):
+        from cache_utils.page_cache import page_cache
+
+        client.get("/posts/missing")
+        resp = client.get("/posts/missing")
+        assert resp.status_code == 404
+        assert "x-cache" not in resp.headers
+        assert page_cache.stats()["entries"] == 0
+
+    def test_other_routes_bypass_cache(self, client):
+        resp = client.get("/robots.txt")
+        assert "x-cache" not in resp.headers
+
+    def test_disabled_cache_passes_responses_through(self, client, sample_post, monkeypatch):
+        from cache_utils.page_cache import page_cache
+
+        monkeypatch.setattr(page_cache, "max_entries", 0)
+        client.get("/posts/test-post")
+        resp = client.get("/posts/test-post")
+
+        assert resp.status_code == 200
+        assert "x-cache" not in resp.headers
+        assert page_cache.stats()["entries"] == 0
+
+    def test_variants_are_encoded_off_the_event_loop(self, client, sample_post, monkeypatch):
+        import asyncio
+
+        from cache_utils import page_cache as module
+
+        on_loop = []
+        encode_variants = module.encode_variants
+
+        def recording(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return encode_variants(*args, **kwargs)
+
+        monkeypatch.setattr(module, "encode_variants", recording)
+        client.get("/posts/test-post")
+
+        assert on_loop == [False]
+
+    def test_cache_hit_skips_database_session(self, client, sample_post, monkeypatch):
+        from main import app, get_db
+
+        client.get("/posts/test-post")
+
+        def fail():
+            raise AssertionError("session opened on a cache hit")
+            yield
+
+        monkeypatch.setitem(app.dependency_overrides, get_db, fail)
+        assert client.get("/posts/test-post").headers["x-cache"] == "HIT"
+
+
+class TestInvalidation:
+    def test_admin_update_invalidates_post_page(self, admin_client, sample_post):
+        assert "Test Post" in admin_client.get("/posts/test-post").text
+
+        csrf = _get_csrf(admin_client.get(f"/admin/posts/{sample_post.id}/edit"))
+        admin_client.post(
+            f"/admin/posts/{sample_post.id}/edit",
+            data={
+                "title": "Edited Title",
+                "meta_title": "",
+                "slug": "test-post",
+                "summary": "S",
+                "tags_input": "",
+                "post_content": "Body",
+                "publish_date": "",
+                "csrf_token": csrf,
+            },
+            follow_redirects=False,
+        )
+
+        resp = admin_client.get("/posts/test-post")
+        assert resp.headers["x-cache"] == "MISS"
+        assert "Edited Title" in resp.text
+
+    def test_admin_writes_bump_content_version(self, admin_client, sample_tag, db):
+        csrf = _get_csrf(admin_client.get("/admin/tags"))
+        admin_client.post(
+            f"/admin/tags/{sample_tag.id}/rename",
+            data={"name": "renamed", "csrf_token": csrf},
+            follow_redirects=False,
+        )
+        admin_client.post(
+            f"/admin/tags/{sample_tag.id}/delete",
+            data={"csrf_token": csrf},
+            follow_redirects=False,
+        )
+
+        assert db.query(ContentVersion.version).scalar() == 2
+
+    def test_write_in_another_worker_is_picked_up(self, client, sample_post, db, monkeypatch):
+        monkeypatch.setattr(content_version, "VERSION_CHECK_INTERVAL", 0.0)
+        client.get("/posts/test-post")
+
+        # Simulate another worker: change the row and the version without
+        # bump_content_version, so no listener in this process fires.
+        db.execute(update(Post).where(Post.id == sample_post.id).values(title="Changed Elsewhere"))
+        db.add(ContentVersion(id=1, version=1))
+        db.commit()
+
+        resp = client.get("/posts/test-post")
+        assert resp.headers["x-cache"] == "MISS"
+        assert "Changed Elsewhere" in resp.text
+
+    def test_page_from_the_old_snapshot_is_not_stored_during_a_rebuild(self, client, sample_post, db, monkeypatch):
+        import asyncio
+
+        import httpx
+
+        from db_utils.snapshot import snapshots
+        from main import app
+
+        client.get("/")
+        old = snapshots.snapshot
+
+        # Another worker's write; this one still holds the old snapshot
+        db.execute(update(Post).where(Post.id == sample_post.id).values(title="Changed Elsewhere"))
+        db.add(ContentVersion(id=1, version=1))
+        db.commit()
+        snapshots.snapshot = old
+        content_version.reset()
+
+        refresh = snapshots.refresh
+        rebuilding = None
+
+        async def slow_refresh(*args, **kwargs):
+            rebuilding.set()
+            await asyncio.sleep(0.1)
+            return await refresh(*args, **kwargs)
+
+        monkeypatch.setattr(snapshots, "refresh", slow_refresh)
+
+        async def home_during_rebuild(concurrent):
+            await rebuilding.wait()
+            return await concurrent.get("/")
+
+        async def run():
+            nonlocal rebuilding
+            rebuilding = asyncio.Event()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as concurrent:
+                # The post request rebuilds; the home page is answered from the old snapshot meanwhile
+                return await asyncio.gather(concurrent.get("/posts/test-post"), home_during_rebuild(concurrent))
+
+        loop = asyncio.new_event_loop()
+        try:
+            post, home = loop.run_until_complete(run())
+        finally:
+            loop.close()
+        assert "Changed Elsewhere" in post.text
+        assert "Changed Elsewhere" not in home.text
+
+        resp = client.get("/")
+        assert resp.headers["x-cache"] == "MISS"
+        assert "Changed Elsewhere" in resp.text
+
+    def test_async_read_matches_sync_read(self, db):
+        import asyncio
+
+        content_version.bump_content_version(db)
+        db.commit()
+
+        content_version.reset()
+        from_async = asyncio.run(content_version.current_content_version_async())
+        content_version.reset()
+
+        assert from_async == content_version.current_content_version() == 1
+
+    def test_async_read_reuses_the_request_session(self, db):
+        import asyncio
+        from sqlalchemy import event
+        import db_utils.database as database
+
+        content_version.bump_content_version(db)
+        db.commit()
+
+        checkouts = []
+        pool = database.async_engine.sync_engine.pool
+
+        def record(*args):
+            checkouts.append(args)
+
+        async def read():
+            async with database.AsyncSessionLocal() as session:
+                await session.execute(select(Post.id))
+                event.listen(pool, "checkout", record)
+                try:
+                    return await content_version.current_content_version_async(session)
+                finally:
+                    event.remove(pool, "checkout", record)
+
+        content_version.reset()
+        assert asyncio.run(read()) == 1
+        assert checkouts == []
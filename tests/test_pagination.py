@@ -0,0 +1,122 @@
+"""Tests for keyset pagination of the post lists."""
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from cache_utils.backends import shared_cache
+from db_utils.models import Post
+from db_utils.pagination import decode_cursor, encode_cursor, paginate_posts
+
+
+def _add_posts(db, count, dated=True):
+    for i in range(count):
+        post = Post(title=f"Post {i}", slug=f"post-{i}", summary="S", post_content="Body")
+        if dated:
+            # Pairs share a timestamp so ties are broken by id
+            post.publish_date = datetime(2024, 1, 1 + i // 2, 12, 0, 0)
+        db.add(post)
+    db.commit()
+
+
+def _walk(db, per_page):
+    pages, cursor = [], None
+    while True:
+        page = paginate_posts(db, select(Post), per_page, after=cursor)
+        pages.append(page)
+        if not page.older:
+            return pages
+        cursor = page.older
+
+
+class TestCursor:
+    def test_round_trip(self):
+        post = Post(id=7, publish_date=datetime(2024, 5, 1, 8, 30, 15, 123))
+        assert decode_cursor(encode_cursor(post)) == (post.publish_date, 7)
+
+    def test_round_trip_undated(self):
+        assert decode_cursor(encode_cursor(Post(id=7, publish_date=None))) == (None, 7)
+
+    @pytest.mark.parametrize("cursor", ["", "not-base64!", "bm9waXBl"])
+    def test_malformed(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestPaginatePosts:
+    def test_first_page(self, db):
+        _add_posts(db, 5)
+
+        page = paginate_posts(db, select(Post), 2)
+
+        assert [post.slug for post in page.items] == ["post-4", "post-3"]
+        assert page.newer is None
+        assert page.older is not None
+
+    def test_walk_covers_every_post_once_in_order(self, db):
+        _add_posts(db, 7)
+
+        pages = _walk(db, 3)
+        slugs = [post.slug for page in pages for post in page.items]
+
+        assert slugs == [f"post-{i}" for i in range(6, -1, -1)]
+        assert [len(page.items) for page in pages] == [3, 3, 1]
+
+    def test_newer_returns_previous_page(self, db):
+        _add_posts(db, 7)
+        first, second, third = _walk(db, 3)
+
+        back = paginate_posts(db, select(Post), 3, before=third.newer)
+        assert [post.id for post in back.items] == [post.id for post in second.items]
+        assert back.newer is not None
+
+        top = paginate_posts(db, select(Post), 3, before=back.newer)
+        assert [post.id for post in top.items] == [post.id for post in first.items]
+        assert top.newer is None
+
+    def test_server_default_timestamps(self, db):
+        _add_posts(db, 5, dated=False)
+
+        slugs = [post.slug for page in _walk(db, 2) for post in page.items]
+
+        assert slugs == [f"post-{i}" for i in range(4, -1, -1)]
+
+
+class TestPaginatedRoutes:
+    def test_home_links_older_page(self, client, db, monkeypatch):
+        import main
+        monkeypatch.setattr(main, "POSTS_PER_PAGE", 2)
+        _add_posts(db, 3)
+
+        first = client.get("/")
+        assert "Post 2" in first.text and "Post 0" not in first.text
+        older = re.search(r'href="(/\?after=[^"#]+)', first.text).group(1)
+
+        second = client.get(older)
+        assert "Post 0" in second.text and "Post 2" not in second.text
+        assert "/?before=" in second.text
+
+    def test_home_rejects_bad_cursor(self, client):
+        assert client.get("/?after=garbage").status_code == 400
+
+    def test_dashboard_is_paginated(self, admin_client, db, monkeypatch):
+        import admin.routes
+        monkeypatch.setattr(admin.routes, "ADMIN_POSTS_PER_PAGE", 2)
+        _add_posts(db, 3)
+
+        response = admin_client.get("/admin/")
+
+        assert "Post 2" in response.text and "Post 0" not in response.text
+        assert "/admin/?after=" in response.text
+
+    def test_feed_item_cap(self, client, db, monkeypatch):
+        import main
+        monkeypatch.setattr(main, "_RSS_MAX_ITEMS", 2)
+        shared_cache.clear()
+        _add_posts(db, 4)
+
+        response = client.get("/feed.xml")
+
+        assert response.text.count("<item>") == 2
+        assert "Post 3" in response.text and "Post 1" not in response.text
@@ -0,0 +1,144 @@
+"""Tests for forwarded-header handling and the admin-only session."""
+import asyncio
+
+import pytest
+
+from http_utils.proxy_headers import PathScopedMiddleware, ProxyHeadersMiddleware, TrustedProxies
+
+
+def _call(middleware, path="/", client=("10.0.0.2", 1234), headers=(), scope_type="http"):
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen.update(scope)
+
+    scope = {
+        "type": scope_type, "method": "GET", "path": path, "scheme": "http",
+        "client": client, "headers": [(name.encode(), value.encode()) for name, value in headers],
+    }
+    asyncio.run(middleware(app)(scope, None, None))
+    return seen
+
+
+def _proxy(spec):
+    return lambda app: ProxyHeadersMiddleware(app, trusted=TrustedProxies(spec))
+
+
+class TestTrustedProxies:
+    @pytest.mark.parametrize("host, trusted", [
+        ("127.0.0.1", True),
+        ("172.18.0.5", True),
+        ("::1", True),
+        ("172.32.0.1", False),
+        ("nginx", True),
+        ("not-an-ip", False),
+        (None, False),
+    ])
+    def test_membership(self, host, trusted):
+        assert (host in TrustedProxies("127.0.0.1, 172.16.0.0/12, ::1, nginx")) is trusted
+
+    def test_everything(self):
+        assert "203.0.113.9" in TrustedProxies("*")
+        assert "127.0.0.1" not in TrustedProxies("")
+
+    @pytest.mark.parametrize("chain, client", [
+        ("203.0.113.9", "203.0.113.9"),
+        # The client made up the first entry; the proxy appended the real one
+        ("1.2.3.4, 203.0.113.9", "203.0.113.9"),
+        ("203.0.113.9, 10.0.0.3", "203.0.113.9"),
+        ("10.0.0.3, 10.0.0.4", "10.0.0.4"),
+        (" , ", None),
+    ])
+    def test_client_from_chain(self, chain, client):
+        assert TrustedProxies("10.0.0.0/8").client(chain) == client
+
+    def test_leftmost_entry_is_never_believed(self):
+        # The client sent "6.6.6.6"; the proxy appended the address it saw
+        assert TrustedProxies("*").client("6.6.6.6, 203.0.113.9") == "203.0.113.9"
+
+
+class TestProxyHeadersMiddleware:
+    def test_trusted_proxy(self):
+        scope = _call(_proxy("10.0.0.0/8"), headers=[
+            ("x-forwarded-proto", "https"), ("x-forwarded-for", "203.0.113.9"),
+        ])
+
+        assert scope["scheme"] == "https"
+        assert scope["client"] == ("203.0.113.9", 0)
+
+    def test_untrusted_peer_is_ignored(self):
+        scope = _call(_proxy("127.0.0.1"), headers=[
+            ("x-forwarded-proto", "https"), ("x-forwarded-for", "203.0.113.9"),
+        ])
+
+        assert scope["scheme"] == "http"
+        assert scope["client"] == ("10.0.0.2", 1234)
+
+    def test_unknown_scheme_is_ignored(self):
+        scope = _call(_proxy("*"), headers=[("x-forwarded-proto", "javascript")])
+
+        assert scope["scheme"] == "http"
+
+    def test_nearest_proxy_wins(self):
+        scope = _call(_proxy("*"), headers=[
+            ("x-forwarded-proto", "http, https"),
+            ("x-forwarded-for", "1.2.3.4"), ("x-forwarded-for", "203.0.113.9"),
+        ])
+
+        assert scope["scheme"] == "https"
+        assert scope["client"] == ("203.0.113.9", 0)
+
+    def test_websocket(self):
+        scope = _call(_proxy("*"), headers=[("x-forwarded-proto", "https")], scope_type="websocket")
+
+        assert scope["scheme"] == "wss"
+
+    def test_rate_limit_sees_the_forwarded_client(self, client, monkeypatch):
+        from http_utils.proxy_headers import trusted_proxies
+
+        monkeypatch.setattr(trusted_proxies, "hosts", {"testclient"})
+
+        def attempt(address):
+            return client.post(
+                "/admin/login",
+                data={"username": "x", "password": "y", "csrf_token": "z"},
+                headers={"X-Forwarded-For": address},
+            ).status_code
+
+        # The login form allows 5 attempts per minute and address
+        assert 429 not in [attempt(f"203.0.113.{i}") for i in range(6)]
+        assert [attempt("203.0.113.0") for _ in range(5)][-1] == 429
+
+
+class TestAdminOnlySession:
+    def test_scoping(self):
+        def marked(app):
+            async def mark(scope, receive, send):
+                scope["marked"] = True
+                await app(scope, receive, send)
+            return mark
+
+        def middleware(app):
+            return PathScopedMiddleware(app, prefix="/admin", middleware=marked)
+
+        assert _call(middleware, path="/admin").get("marked")
+        assert _call(middleware, path="/admin/login").get("marked")
+        assert not _call(middleware, path="/administrator").get("marked")
+        assert not _call(middleware, path="/").get("marked")
+
+    def test_public_pages_leave_the_session_cookie_alone(self, admin_client, sample_post):
+        cookie = admin_client.cookies.get("admin_session")
+
+        for path in ("/", "/posts/test-post", "/feed.xml"):
+            assert "set-cookie" not in admin_client.get(path).headers
+        assert admin_client.cookies.get("admin_session") == cookie
+
+    def test_session_cookie_is_limited_to_admin(self, client):
+        resp = client.get("/admin/login")
+
+        assert "path=/admin" in resp.headers["set-cookie"].lower()
+
+    def test_public_pages_are_cached_for_logged_in_admins(self, admin_client, sample_post):
+        admin_client.get("/posts/test-post")
+
+        assert admin_client.get("/posts/test-post").headers["x-cache"] == "HIT"
@@ -0,0 +1,96 @@
+"""Per-request SQL statement budgets for the list pages."""
+import pytest
+
+from cache_utils.backends import shared_cache
+from cache_utils.page_cache import page_cache
+from db_utils import content_version
+from db_utils.models import Post, Tag
+from db_utils.snapshot import snapshots
+
+
+# Statements allowed per request, including the content version check. The
+# public pages read the content snapshot, measured below once it is loaded
+QUERY_BUDGETS = {
+    "/": 1,
+    "/feed.xml": 1,
+    "/admin/": 2,
+}
+# A public page with no snapshot loaded yet: the version check, then the
+# snapshot's version, posts and tags. The stored HTML is current by then
+COLD_SNAPSHOT_BUDGET = 4
+
+
+def _add_tagged_posts(db, count, start=0):
+    for i in range(start, start + count):
+        post = Post(title=f"Post {i}", slug=f"post-{i}", summary="S", post_content="Body")
+        post.tags = [Tag(name=f"tag-{i}-a"), Tag(name=f"tag-{i}-b")]
+        db.add(post)
+    db.commit()
+
+
+def _cold():
+    page_cache.clear()
+    content_version.reset()
+    shared_cache.clear()
+
+
+def _measure(client, count_queries, url, snapshot_loaded=True):
+    # Load the snapshot, then start the request cold so the full query path is counted
+    _cold()
+    client.get(url)
+    _cold()
+    if not snapshot_loaded:
+        snapshots.clear()
+
+    with count_queries() as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return queries
+
+
+@pytest.mark.parametrize("url", sorted(QUERY_BUDGETS))
+class TestQueryBudget:
+    def test_within_budget(self, url, admin_client, db, count_queries):
+        _add_tagged_posts(db, 10)
+
+        assert _measure(admin_client, count_queries, url).count <= QUERY_BUDGETS[url]
+
+    def test_independent_of_post_count(self, url, admin_client, db, count_queries):
+        _add_tagged_posts(db, 2)
+        few = _measure(admin_client, count_queries, url).count
+
+        _add_tagged_posts(db, 25, start=2)
+        many = _measure(admin_client, count_queries, url).count
+
+        assert few == many
+
+    def test_post_bodies_not_loaded(self, url, admin_client, db, count_queries):
+        _add_tagged_posts(db, 3)
+
+        statements = _measure(admin_client, count_queries, url).statements
+
+        assert not any("post_content" in sql or "content_html" in sql for sql in statements)
+
+
+@pytest.mark.parametrize("url", ["/", "/feed.xml", "/posts/post-0"])
+class TestColdSnapshotBudget:
+    def test_within_budget(self, url, client, db, count_queries):
+        _add_tagged_posts(db, 10)
+
+        assert _measure(client, count_queries, url, snapshot_loaded=False).count <= COLD_SNAPSHOT_BUDGET
+
+    def test_independent_of_post_count(self, url, client, db, count_queries):
+        _add_tagged_posts(db, 2)
+        few = _measure(client, count_queries, url, snapshot_loaded=False).count
+
+        _add_tagged_posts(db, 25, start=2)
+        many = _measure(client, count_queries, url, snapshot_loaded=False).count
+
+        assert few == many
+
+    def test_markdown_sources_not_loaded(self, url, client, db, count_queries):
+        _add_tagged_posts(db, 3)
+
+        statements = _measure(client, count_queries, url, snapshot_loaded=False).statements
+
+        assert not any("post_content" in sql for sql in statements)
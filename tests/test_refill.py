@@ -0,0 +1,166 @@
+"""Tests for single-flight cache refills, stale-while-revalidate and the grace window."""
+import asyncio
+
+import pytest
+from sqlalchemy import exc
+
+from cache_utils.backends import MemoryBackend, SQLiteBackend
+from cache_utils.page_cache import PageCache, PageCacheMiddleware
+from cache_utils.refill import Refiller
+
+
+def _unavailable():
+    return exc.OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+
+class Source:
+    """A refill that counts its calls and returns the next value."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise _unavailable()
+        return f"value-{self.calls}"
+
+
+class TestRefiller:
+    def test_concurrent_misses_share_one_refill(self):
+        refiller, source = Refiller(MemoryBackend(10), grace=60), Source()
+
+        async def run():
+            return await asyncio.gather(*(refiller.get("feed", source, ttl=60) for _ in range(10)))
+
+        assert asyncio.run(run()) == ["value-1"] * 10
+        assert source.calls == 1
+        assert refiller.stats()["coalesced"] == 9
+
+    def test_stale_value_served_while_refreshing(self):
+        refiller, source = Refiller(MemoryBackend(10), grace=60), Source()
+
+        async def run():
+            first = await refiller.get("feed", source, ttl=0)
+            stale = await refiller.get("feed", source, ttl=0)
+            again = await refiller.get("feed", source, ttl=0)
+            await asyncio.sleep(0.05)
+            return first, stale, again, refiller.cache.peek("feed")[0]
+
+        assert asyncio.run(run()) == ("value-1", "value-1", "value-1", "value-2")
+        assert source.calls == 2
+        assert refiller.stats()["stale_served"] == 2
+        assert refiller.stats()["background_refreshes"] == 1
+
+    def test_new_version_is_refilled_before_answering(self):
+        refiller, source = Refiller(MemoryBackend(10), grace=60), Source()
+
+        async def run():
+            await refiller.get("feed", source, ttl=60, version=1)
+            return await refiller.get("feed", source, ttl=60, version=2)
+
+        assert asyncio.run(run()) == "value-2"
+
+    def test_stale_value_covers_an_unavailable_database(self):
+        refiller, source = Refiller(MemoryBackend(10), grace=60), Source()
+
+        async def run():
+            await refiller.get("feed", source, ttl=60, version=1)
+            source.fail = True
+            return await refiller.get("feed", source, ttl=60, version=None)
+
+        assert asyncio.run(run()) == "value-1"
+        assert refiller.stats()["stale_on_error"] == 1
+
+    def test_failed_background_refresh_keeps_the_stale_value(self):
+        refiller, source = Refiller(MemoryBackend(10), grace=60), Source()
+
+        async def run():
+            await refiller.get("feed", source, ttl=0)
+            source.fail = True
+            await refiller.get("feed", source, ttl=0)
+            await asyncio.sleep(0.05)
+            return await refiller.get("feed", source, ttl=0)
+
+        assert asyncio.run(run()) == "value-1"
+        assert refiller.stats()["background_failures"] == 1
+
+    def test_nothing_to_fall_back_on(self):
+        refiller, source = Refiller(MemoryBackend(10), grace=60), Source()
+        source.fail = True
+
+        with pytest.raises(exc.OperationalError):
+            asyncio.run(refiller.get("feed", source, ttl=60))
+
+    def test_other_worker_waits_for_the_refill(self, tmp_path):
+        # Two workers: separate Refillers over one shared file
+        path = str(tmp_path / "cache.db")
+        first, second = Refiller(SQLiteBackend(path, 10), grace=60), Refiller(SQLiteBackend(path, 10), grace=60)
+        source = Source(delay=0.1)
+
+        async def run():
+            return await asyncio.gather(first.get("feed", source, ttl=60), second.get("feed", source, ttl=60))
+
+        assert asyncio.run(run()) == ["value-1", "value-1"]
+        assert source.calls == 1
+        # Cache calls run on threads, so either one may take the lock
+        assert first.stats()["waited_for_other_worker"] + second.stats()["waited_for_other_worker"] == 1
+
+
+class TestFeedGrace:
+    def test_feed_served_while_database_is_down(self, client, sample_post, monkeypatch):
+        from db_utils import content_version, in_memory, snapshot
+
+        first = client.get("/feed.xml")
+
+        async def unavailable(*args, **kwargs):
+            raise _unavailable()
+
+        # The version check is all the feed asks of the database; the last snapshot covers it
+        content_version.reset()
+        monkeypatch.setattr(in_memory, "current_content_version_async", unavailable)
+        resp = client.get("/feed.xml")
+
+        assert resp.status_code == 200
+        assert resp.content == first.content
+        assert snapshot.snapshots.stats()["served_on_error"] == 1
+
+
+class TestPageRenderCoalescing:
+    def test_concurrent_misses_render_once(self, db):
+        renders = []
+
+        async def app(scope, receive, send):
+            renders.append(scope["path"])
+            await asyncio.sleep(0.05)
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/html")]})
+            await send({"type": "http.response.body", "body": b"<p>home</p>"})
+
+        cache = PageCache(max_entries=10)
+        middleware = PageCacheMiddleware(app, cache=cache)
+
+        async def request():
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {
+                "type": "http", "method": "GET", "path": "/", "scheme": "http",
+                "query_string": b"", "headers": [(b"host", b"testserver")],
+            }
+            await middleware(scope, None, send)
+            return messages[-1]["body"], dict(messages[0]["headers"])[b"x-cache"]
+
+        async def run():
+            return await asyncio.gather(*(request() for _ in range(5)))
+
+        responses = asyncio.run(run())
+
+        assert renders == ["/"]
+        assert {body for body, _ in responses} == {b"<p>home</p>"}
+        assert sorted(status for _, status in responses) == [b"HIT"] * 4 + [b"MISS"]
+        assert cache.stats()["coalesced"] == 4
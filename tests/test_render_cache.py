@@ -0,0 +1,73 @@
+"""Tests for the shared Markdown render cache."""
+from render_utils.cache import RenderCache
+from render_utils.markdown import cached_markdown, render_cache
+
+
+class TestRenderCache:
+    def test_miss_then_hit(self):
+        cache = RenderCache(max_bytes=1024)
+        key = RenderCache.make_key("# Title", 1)
+
+        assert cache.get(key) is None
+        cache.put(key, "<h1>Title</h1>")
+        assert cache.get(key) == "<h1>Title</h1>"
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_key_depends_on_renderer_version(self):
+        assert RenderCache.make_key("text", 1) != RenderCache.make_key("text", 2)
+
+    def test_lru_eviction_respects_byte_cap(self):
+        cache = RenderCache(max_bytes=10)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        cache.get("a")  # "b" is now least recently used
+        cache.put("c", "cccc")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "aaaa"
+        assert cache.get("c") == "cccc"
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] <= 10
+
+    def test_oversized_entry_is_not_stored(self):
+        cache = RenderCache(max_bytes=4)
+        cache.put("a", "too large")
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+
+
+class TestCachedMarkdown:
+    def test_repeated_render_hits_cache(self):
+        render_cache.clear()
+        before = render_cache.stats()["hits"]
+
+        first = cached_markdown("**cached**")
+        second = cached_markdown("**cached**")
+
+        assert first == second
+        assert "<strong>cached</strong>" in first
+        assert render_cache.stats()["hits"] == before + 1
+
+    def test_home_page_summaries_use_cache(self, client, sample_post):
+        from cache_utils.page_cache import page_cache
+
+        render_cache.clear()
+        client.get("/")
+        hits = render_cache.stats()["hits"]
+        page_cache.clear()
+        client.get("/")
+        assert render_cache.stats()["hits"] > hits
+
+
+class TestMetricsEndpoint:
+    def test_metrics_requires_login(self, client):
+        resp = client.get("/admin/metrics", follow_redirects=False)
+        assert resp.status_code == 303
+
+    def test_metrics_reports_render_cache(self, admin_client):
+        resp = admin_client.get("/admin/metrics")
+        assert resp.status_code == 200
+        assert "hits" in resp.json()["render_cache"]
@@ -1,5 +1,5 @@
 """Tests for the custom Markdown renderer."""
-from main import CustomRenderer, markdown_processor
+from render_utils.markdown import CustomRenderer, markdown_processor
 import mistune
 
 
@@ -91,3 +91,38 @@ class TestMarkdownProcessor:
     def test_inline_code(self):
         result = markdown_processor("`inline`")
         assert "<code>inline</code>" in result
+
+
+class TestCustomRendererCodeBlocks:
+    def test_known_language_is_highlighted(self):
+        result = markdown_processor("```python\ndef f():\n    return 1\n```")
+        assert '<pre class="highlight"><code class="language-python">' in result
+        assert '<span class="k">def</span>' in result
+
+    def test_highlighted_code_is_escaped(self):
+        result = markdown_processor("```bash\necho '<script>'\n```")
+        assert "<script>" not in result
+        assert "&lt;script&gt;" in result
+
+    def test_unknown_language_falls_back_to_plain(self):
+        result = markdown_processor("```nosuchlang\na < b\n```")
+        assert result == '<pre><code class="language-nosuchlang">a &lt; b\n</code></pre>\n'
+
+    def test_no_client_side_highlighter(self, client):
+        response = client.get("/")
+        assert "prism" not in response.text
+        assert "/static/highlight.css" in response.text
+
+
+class TestRenderPost:
+    def test_render_post_stamps_version(self):
+        from db_utils.models import Post
+        from render_utils.markdown import RENDERER_VERSION, render_post, post_html_is_stale
+
+        post = Post(post_content="**bold**")
+        assert post_html_is_stale(post)
+
+        render_post(post)
+        assert "<strong>bold</strong>" in post.content_html
+        assert post.renderer_version == RENDERER_VERSION
+        assert not post_html_is_stale(post)
@@ -1,7 +1,26 @@
 """Tests for public-facing routes."""
+import asyncio
+
+import pytest
+
 from db_utils.models import Post
 
 
+class TestAsyncRoutes:
+    @pytest.mark.parametrize("name", ["root", "show_post", "rss_feed"])
+    def test_public_db_routes_are_async(self, name):
+        import main
+        assert asyncio.iscoroutinefunction(getattr(main, name))
+
+    def test_post_tags_render_without_lazy_loading(self, client, db, sample_post, sample_tag):
+        sample_post.tags.append(sample_tag)
+        db.commit()
+
+        resp = client.get("/posts/test-post")
+        assert resp.status_code == 200
+        assert "python" in resp.text
+
+
 class TestHomePage:
     def test_home_returns_200(self, client):
         resp = client.get("/")
@@ -23,6 +42,39 @@ class TestPostPage:
         resp = client.get("/posts/test-post")
         assert "<strong>bold</strong>" in resp.text
 
+    def test_stored_html_is_served(self, client, db):
+        from render_utils.markdown import RENDERER_VERSION
+        post = Post(
+            title="Stored",
+            slug="stored",
+            summary="S",
+            post_content="Markdown source",
+            content_html="<p>pre-rendered body</p>",
+            renderer_version=RENDERER_VERSION,
+        )
+        db.add(post)
+        db.commit()
+        resp = client.get("/posts/stored")
+        assert "pre-rendered body" in resp.text
+
+    def test_stale_html_is_rerendered_and_stored(self, client, db):
+        post = Post(
+            title="Stale",
+            slug="stale",
+            summary="S",
+            post_content="**fresh**",
+            content_html="<p>old render</p>",
+            renderer_version=0,
+        )
+        db.add(post)
+        db.commit()
+        resp = client.get("/posts/stale")
+        assert "<strong>fresh</strong>" in resp.text
+        assert "old render" not in resp.text
+
+        db.refresh(post)
+        assert "<strong>fresh</strong>" in post.content_html
+
     def test_missing_post_returns_404(self, client):
         resp = client.get("/posts/nonexistent-slug")
         assert resp.status_code == 404
@@ -68,9 +120,8 @@ class TestRSSFeed:
 
     def test_feed_contains_post(self, client, sample_post):
         # Clear RSS cache so the new post appears
-        from main import _rss_cache
-        _rss_cache["xml"] = None
-        _rss_cache["timestamp"] = 0.0
+        from cache_utils.backends import shared_cache
+        shared_cache.clear()
 
         resp = client.get("/feed.xml")
         assert resp.status_code == 200
@@ -0,0 +1,134 @@
+"""Tests for the scanner pre-router and the pre-rendered 404 page."""
+import re
+
+import pytest
+
+from db_utils.replicas import PRIMARY_COOKIE, primary_cookie_value
+from http_utils.scanner_guard import scanner_guard
+
+
+def _get_csrf(response):
+    match = re.search(r'name="csrf_token"\s+value="([^"]+)"', response.text)
+    if match:
+        return match.group(1)
+    raise ValueError("CSRF token not found")
+
+
+@pytest.fixture()
+def no_session(monkeypatch):
+    """Fail the test if a public route opens a database session."""
+    from main import app, get_db
+
+    def fail():
+        raise AssertionError("session opened for a scanner probe")
+        yield
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, fail)
+
+
+class TestScannerPatterns:
+    @pytest.mark.parametrize("path, counter", [
+        ("/wp-login.php", "php"),
+        ("/index.php/admin", "php"),
+        ("/wp-content/plugins/x/readme.txt", "wordpress"),
+        ("/xmlrpc", "wordpress"),
+        ("/.env", "dotfiles"),
+        ("/.git/config", "dotfiles"),
+        ("/backup/site.sql", "server_scripts"),
+        ("/default.aspx", "server_scripts"),
+        ("/phpmyadmin/", "admin_panels"),
+        ("/cgi-bin/luci", "admin_panels"),
+    ])
+    def test_probe_is_answered_up_front(self, client, no_session, path, counter):
+        resp = client.get(path)
+
+        assert resp.status_code == 404
+        assert "Page not found" in resp.text
+        assert "admin_session" not in resp.headers.get("set-cookie", "")
+        assert scanner_guard.stats()["blocked"][counter] == 1
+
+    @pytest.mark.parametrize("path", ["/", "/feed.xml", "/robots.txt", "/static/styles.css", "/admin/login"])
+    def test_site_paths_pass(self, client, sample_post, path):
+        assert client.get(path).status_code == 200
+        assert scanner_guard.stats()["blocked_total"] == 0
+
+    def test_well_known_is_not_a_dotfile(self, client):
+        client.get("/.well-known/security.txt")
+
+        assert scanner_guard.stats()["blocked_total"] == 0
+
+
+class TestUnknownSlugs:
+    def test_unknown_slug_runs_no_queries(self, client, sample_post, count_queries, no_session):
+        client.get("/posts/nope")
+
+        with count_queries() as queries:
+            resp = client.get("/posts/also-nope")
+
+        assert resp.status_code == 404
+        assert queries.count == 0
+        assert scanner_guard.stats()["blocked"]["unknown_slug"] == 2
+
+    def test_known_slug_is_served(self, client, sample_post):
+        assert client.get("/posts/test-post").status_code == 200
+        assert scanner_guard.stats()["blocked_total"] == 0
+
+    def test_new_post_is_reachable_after_admin_write(self, admin_client):
+        assert admin_client.get("/posts/fresh-post").status_code == 404
+
+        csrf = _get_csrf(admin_client.get("/admin/posts/new"))
+        admin_client.post(
+            "/admin/posts/new",
+            data={
+                "title": "Fresh", "meta_title": "", "slug": "fresh-post", "summary": "S",
+                "tags_input": "", "post_content": "Body", "publish_date": "", "csrf_token": csrf,
+            },
+        )
+
+        assert admin_client.get("/posts/fresh-post").status_code == 200
+
+    def test_reads_pinned_to_primary_pass(self, client, sample_post):
+        client.cookies.set(PRIMARY_COOKIE, primary_cookie_value())
+        resp = client.get("/posts/nope")
+
+        assert resp.status_code == 404
+        assert scanner_guard.stats()["blocked_total"] == 0
+
+    def test_head_has_no_body(self, client):
+        resp = client.head("/posts/nope")
+
+        assert resp.status_code == 404
+        assert resp.content == b""
+        assert int(resp.headers["content-length"]) > 0
+
+
+class TestNotFoundPage:
+    def test_matches_the_route_404(self, client):
+        probe = client.get("/posts/nope")
+        routed = client.get("/no-such-page")
+
+        assert probe.text == routed.text
+        assert 'href="http://testserver/static/styles.css"' in probe.text
+
+    def test_links_follow_forwarded_scheme_and_host(self, client, monkeypatch):
+        from http_utils.proxy_headers import trusted_proxies
+
+        monkeypatch.setattr(trusted_proxies, "hosts", {"testclient"})
+        resp = client.get("/.env", headers={"X-Forwarded-Proto": "https", "Host": "example.org"})
+
+        assert 'href="https://example.org/"' in resp.text
+        assert "not-found.invalid" not in resp.text
+
+    def test_forwarded_scheme_from_untrusted_client_is_ignored(self, client):
+        resp = client.get("/.env", headers={"X-Forwarded-Proto": "https"})
+
+        assert 'href="http://testserver/"' in resp.text
+
+    def test_metrics(self, admin_client):
+        admin_client.get("/.env")
+        admin_client.get("/posts/nope")
+        stats = admin_client.get("/admin/metrics").json()["scanner_guard"]
+
+        assert stats["blocked"]["dotfiles"] == stats["blocked"]["unknown_slug"] == 1
+        assert stats["passed"] >= 1
+        assert stats["known_slugs"] == 0
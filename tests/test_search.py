@@ -0,0 +1,129 @@
+"""Tests for /search and the full-text search helpers."""
+import asyncio
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import db_utils.database as database
+from db_utils.models import Post
+from search_utils.fulltext import _postgres_statement, search_posts
+
+
+@pytest.fixture()
+def posts(db):
+    rows = [
+        Post(title="Kernel modules", slug="kernel-modules", summary="Loading code into Linux",
+             post_content="How insmod and modprobe load a module."),
+        Post(title="Secure boot", slug="secure-boot", summary="Signing the kernel",
+             post_content="Shim, MOK keys and a signed kernel image."),
+        Post(title="Gardening", slug="gardening", summary="Tomatoes",
+             post_content="Nothing about computers here. <script>alert(1)</script> kernel"),
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def _search(query, limit=20):
+    async def run():
+        async with database.AsyncSessionLocal() as db:
+            return await search_posts(db, query, limit)
+
+    return asyncio.run(run())
+
+
+class TestSearchPosts:
+    def test_title_match_outranks_body_match(self, posts):
+        slugs = [result.slug for result in _search("kernel")]
+
+        assert slugs[0] == "kernel-modules"
+        assert slugs[-1] == "gardening"
+        assert set(slugs) == {"kernel-modules", "secure-boot", "gardening"}
+
+    def test_all_words_must_match(self, posts):
+        assert [result.slug for result in _search("signed kernel")] == ["secure-boot"]
+
+    def test_snippet_highlights_and_escapes(self, posts):
+        result = next(result for result in _search("kernel") if result.slug == "gardening")
+
+        assert "<mark>kernel</mark>" in result.snippet
+        assert "<script>" not in result.snippet
+        assert "&lt;script&gt;" in result.snippet
+
+    def test_limit(self, posts):
+        assert len(_search("kernel", limit=2)) == 2
+
+    def test_blank_query_returns_nothing(self, posts):
+        assert _search("   ") == []
+        assert _search("!!!") == []
+
+    def test_like_wildcards_are_literal(self, posts):
+        assert _search("a_b") == []
+
+
+class TestPostgresStatement:
+    def _sql(self):
+        return str(_postgres_statement("kernel", 20).compile(dialect=postgresql.psycopg.dialect()))
+
+    def test_uses_indexed_vector(self):
+        sql = self._sql()
+
+        assert "posts.search_vector @@ websearch_to_tsquery" in sql
+        assert "ts_rank_cd(posts.search_vector" in sql
+
+    def test_headline_only_for_returned_rows(self):
+        sql = self._sql()
+        outer, inner = sql.split("JOIN (", 1)
+
+        assert "ts_headline" in outer
+        assert "ts_headline" not in inner
+        assert "LIMIT" in inner
+
+
+class TestSearchRoute:
+    def test_results_page(self, client, posts):
+        resp = client.get("/search", params={"q": "signed kernel"})
+
+        assert resp.status_code == 200
+        assert 'href="/posts/secure-boot"' in resp.text
+        assert "<mark>" in resp.text
+        assert 'href="/posts/gardening"' not in resp.text
+
+    def test_no_results(self, client, posts):
+        resp = client.get("/search", params={"q": "zebra"})
+
+        assert resp.status_code == 200
+        assert "No posts match" in resp.text
+
+    def test_empty_query_shows_form(self, client):
+        resp = client.get("/search")
+
+        assert resp.status_code == 200
+        assert 'name="q"' in resp.text
+        assert "No posts match" not in resp.text
+
+    def test_query_is_escaped(self, client, posts):
+        resp = client.get("/search", params={"q": "<b>kernel</b>"})
+
+        assert "<b>kernel</b>" not in resp.text
+
+    def test_conditional_request(self, client, posts):
+        first = client.get("/search", params={"q": "kernel"})
+        again = client.get(
+            "/search", params={"q": "kernel"}, headers={"If-None-Match": first.headers["etag"]}
+        )
+        other = client.get(
+            "/search", params={"q": "boot"}, headers={"If-None-Match": first.headers["etag"]}
+        )
+
+        assert again.status_code == 304
+        assert other.status_code == 200
+
+    @pytest.mark.parametrize("q", ["קובץ", 'a"b'])
+    def test_etag_is_a_valid_header_for_any_query(self, client, posts, q):
+        resp = client.get("/search", params={"q": q})
+        etag = resp.headers["etag"]
+
+        assert resp.status_code == 200
+        assert etag.count('"') == 2 and etag.isascii()
+        assert client.get("/search", params={"q": q}, headers={"If-None-Match": etag}).status_code == 304
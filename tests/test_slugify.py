@@ -1,5 +1,10 @@
 """Tests for slug generation utilities."""
-from admin.routes import slugify, ensure_unique_slug
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from admin.routes import slugify
+from db_utils import slugs
+from db_utils.slugs import ensure_unique_slug
 from db_utils.models import Post
 
 
@@ -54,3 +59,72 @@ class TestEnsureUniqueSlug:
         db.refresh(post)
 
         assert ensure_unique_slug(db, "my-post", exclude_post_id=post.id) == "my-post"
+
+    def test_single_query_for_many_siblings(self, db, count_queries):
+        db.add(Post(title="T", slug="weekly-notes", summary="S", post_content="C"))
+        for i in range(2, 50):
+            db.add(Post(title="T", slug=f"weekly-notes-{i}", summary="S", post_content="C"))
+        db.commit()
+
+        with count_queries() as queries:
+            assert ensure_unique_slug(db, "weekly-notes") == "weekly-notes-50"
+        assert queries.count == 1
+
+    def test_lowest_free_suffix_is_reused(self, db):
+        for slug in ["my-post", "my-post-3"]:
+            db.add(Post(title="T", slug=slug, summary="S", post_content="C"))
+        db.commit()
+
+        assert ensure_unique_slug(db, "my-post") == "my-post-2"
+
+    def test_unrelated_siblings_are_ignored(self, db):
+        for slug in ["my-post", "my-post-extra", "my-post-2b", "myxpost-2"]:
+            db.add(Post(title="T", slug=slug, summary="S", post_content="C"))
+        db.commit()
+
+        assert ensure_unique_slug(db, "my-post") == "my-post-2"
+
+    def test_like_wildcards_in_slug_are_literal(self, db):
+        for slug in ["a_b", "axb-2"]:
+            db.add(Post(title="T", slug=slug, summary="S", post_content="C"))
+        db.commit()
+
+        assert ensure_unique_slug(db, "a_b") == "a_b-2"
+
+
+class TestAssignUniqueSlug:
+    def test_slug_column_is_unique(self, db):
+        db.add(Post(title="A", slug="same", summary="S", post_content="C"))
+        db.add(Post(title="B", slug="same", summary="S", post_content="C"))
+
+        with pytest.raises(IntegrityError):
+            db.commit()
+
+    def test_retries_after_conflict(self, db, monkeypatch):
+        db.add(Post(title="T", slug="my-post", summary="S", post_content="C"))
+        db.commit()
+
+        # Simulate a concurrent writer: the first allocation misses the existing row
+        calls = []
+        real = slugs.ensure_unique_slug
+
+        def racy(db, slug, exclude_post_id=None):
+            calls.append(slug)
+            return slug if len(calls) == 1 else real(db, slug, exclude_post_id)
+
+        monkeypatch.setattr(slugs, "ensure_unique_slug", racy)
+        post = Post(title="T", summary="S", post_content="C")
+        slugs.assign_unique_slug(db, post, "my-post")
+        db.commit()
+
+        assert len(calls) == 2
+        assert post.slug == "my-post-2"
+
+    def test_gives_up_after_repeated_conflicts(self, db, monkeypatch):
+        db.add(Post(title="T", slug="my-post", summary="S", post_content="C"))
+        db.commit()
+
+        monkeypatch.setattr(slugs, "ensure_unique_slug", lambda db, slug, exclude_post_id=None: slug)
+
+        with pytest.raises(IntegrityError):
+            slugs.assign_unique_slug(db, Post(title="T", summary="S", post_content="C"), "my-post")
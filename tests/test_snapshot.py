@@ -0,0 +1,224 @@
+"""Tests for the in-memory content snapshot behind the public pages."""
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from db_utils.models import Post, Tag
+from db_utils.pagination import encode_cursor, paginate_posts
+from db_utils.snapshot import ContentSnapshot, PostRecord, snapshots
+
+
+def _get_csrf(response):
+    match = re.search(r'name="csrf_token"\s+value="([^"]+)"', response.text)
+    if match:
+        return match.group(1)
+    raise ValueError("CSRF token not found")
+
+
+def _add_posts(db, count, start=0):
+    base = datetime(2024, 1, 1)
+    tag = db.query(Tag).filter_by(name="shared").first() or Tag(name="shared")
+    for i in range(start, start + count):
+        post = Post(
+            title=f"Post {i}", slug=f"post-{i}", summary="S", post_content="Body",
+            content_html="<p>Body</p>", renderer_version=10**6,
+            # Pairs of posts share a date so the id breaks the tie
+            publish_date=base + timedelta(days=i // 2),
+        )
+        post.tags = [tag]
+        db.add(post)
+    db.commit()
+
+
+def _build():
+    return asyncio.run(snapshots.refresh())
+
+
+class TestContentSnapshot:
+    def test_records(self, db, sample_post, sample_tag):
+        sample_post.tags.append(sample_tag)
+        db.commit()
+
+        snapshot = _build()
+        post = snapshot.by_slug["test-post"]
+
+        assert isinstance(post, PostRecord)
+        assert post.title == "Test Post"
+        assert [tag.name for tag in post.tags] == ["python"]
+        assert "<strong>bold</strong>" in post.content_html
+
+    def test_tags_are_shared_between_posts(self, db):
+        _add_posts(db, 3)
+        snapshot = _build()
+
+        assert snapshot.tags == 1
+        assert len({id(post.tags[0]) for post in snapshot.posts}) == 1
+
+    def test_records_are_immutable(self, sample_post):
+        with pytest.raises(AttributeError):
+            _build().by_slug["test-post"].title = "Changed"
+
+    @pytest.mark.parametrize("per_page", [1, 3, 4])
+    def test_pages_match_the_database(self, db, per_page):
+        _add_posts(db, 9)
+        snapshot = _build()
+        statement = db.query(Post).statement
+
+        # Walk to the last page and back, comparing every page with the keyset query
+        cursor, direction, seen = None, "after", 0
+        while seen < 20:
+            seen += 1
+            kwargs = {direction: cursor} if cursor else {}
+            expected = paginate_posts(db, statement, per_page, **kwargs)
+            page = snapshot.page(per_page, **kwargs)
+
+            assert [post.id for post in page.items] == [post.id for post in expected.items]
+            assert (page.older, page.newer) == (expected.older, expected.newer)
+
+            if direction == "after" and page.older:
+                cursor = page.older
+            elif page.newer:
+                cursor, direction = page.newer, "before"
+            else:
+                break
+        assert direction == "before"
+
+    def test_undated_posts_sort_like_the_database(self, db):
+        from sqlalchemy import update
+
+        _add_posts(db, 3)
+        db.execute(update(Post).where(Post.slug == "post-1").values(publish_date=None))
+        db.commit()
+        expected = paginate_posts(db, db.query(Post).statement, 10).items
+
+        # SQLite sorts datetime(NULL) below every date
+        assert [post.id for post in _build().page(10).items] == [post.id for post in expected]
+        assert expected[-1].slug == "post-1"
+
+    def test_undated_posts_first_on_postgres(self, db):
+        _add_posts(db, 3)
+        rows = db.query(Post).all()
+        rows[1].publish_date = None
+
+        snapshot = ContentSnapshot(rows, [], version=1, nulls_first=True)
+
+        assert [post.slug for post in snapshot.posts] == ["post-1", "post-2", "post-0"]
+        assert snapshot.last_published == rows[2].publish_date
+
+    @pytest.mark.parametrize("undated", ["post-0", "post-2", "post-4"])
+    def test_pages_past_an_undated_post_match_the_database(self, db, undated):
+        from sqlalchemy import update
+
+        _add_posts(db, 5)
+        db.execute(update(Post).where(Post.slug == undated).values(publish_date=None))
+        db.commit()
+        snapshot = _build()
+        statement = db.query(Post).statement
+
+        # Walk to the last page one post at a time and back, comparing every page with the keyset query
+        walked, kwargs = {"after": [], "before": []}, {}
+        while True:
+            page = snapshot.page(1, **kwargs)
+            expected = paginate_posts(db, statement, 1, **kwargs)
+            assert [post.id for post in page.items] == [post.id for post in expected.items]
+            assert (page.older, page.newer) == (expected.older, expected.newer)
+            walked["before" if "before" in kwargs else "after"] += [post.id for post in page.items]
+
+            if "before" not in kwargs and page.older:
+                kwargs = {"after": page.older}
+            elif page.newer:
+                kwargs = {"before": page.newer}
+            else:
+                break
+
+        assert walked["after"] == [post.id for post in snapshot.posts]
+        assert walked["before"] == walked["after"][-2::-1]
+
+    def test_undated_post_at_a_page_boundary_on_postgres(self, db):
+        _add_posts(db, 3)
+        rows = db.query(Post).all()
+        rows[1].publish_date = None
+        snapshot = ContentSnapshot(rows, [], version=1, nulls_first=True)
+
+        first = snapshot.page(1)
+        second = snapshot.page(1, after=first.older)
+
+        assert [post.slug for post in first.items + second.items] == ["post-1", "post-2"]
+        assert [post.slug for post in snapshot.page(1, before=second.newer).items] == ["post-1"]
+
+    def test_invalid_cursor(self, db):
+        _add_posts(db, 2)
+        snapshot = _build()
+        aware = encode_cursor(Post(id=1, publish_date=datetime(2024, 1, 1, tzinfo=timezone.utc)))
+
+        for cursor in ("not-a-cursor", aware):
+            with pytest.raises(ValueError):
+                snapshot.page(10, after=cursor)
+
+    def test_empty(self):
+        snapshot = ContentSnapshot([], [], version=0)
+
+        assert snapshot.page(10).items == []
+        assert snapshot.last_published is None
+        assert snapshots.stats()["built"] is False
+
+
+class TestRebuilds:
+    def test_rebuild_is_a_fixed_number_of_queries(self, db, count_queries):
+        _add_posts(db, 2)
+        with count_queries() as few:
+            _build()
+
+        _add_posts(db, 30, start=2)
+        with count_queries() as many:
+            _build()
+
+        assert few.count == many.count == 3
+
+    def test_admin_write_swaps_the_snapshot(self, admin_client, sample_post):
+        admin_client.get("/posts/test-post")
+        before = snapshots.snapshot
+
+        csrf = _get_csrf(admin_client.get(f"/admin/posts/{sample_post.id}/edit"))
+        admin_client.post(
+            f"/admin/posts/{sample_post.id}/edit",
+            data={
+                "title": "Renamed Post", "meta_title": "", "slug": "test-post", "summary": "S",
+                "tags_input": "", "post_content": "Body", "publish_date": "", "csrf_token": csrf,
+            },
+        )
+
+        assert "Renamed Post" in admin_client.get("/posts/test-post").text
+        assert snapshots.snapshot is not before
+        assert snapshots.snapshot.version == before.version + 1
+        assert before.by_slug["test-post"].title == "Test Post"
+
+
+class TestPublicRoutes:
+    @pytest.mark.parametrize("path", ["/", "/posts/test-post", "/feed.xml"])
+    def test_no_queries_per_request(self, client, sample_post, count_queries, path):
+        from cache_utils.page_cache import page_cache
+
+        client.get(path)
+        page_cache.clear()
+
+        with count_queries() as queries:
+            resp = client.get(path)
+
+        assert resp.status_code == 200
+        assert "Test Post" in resp.text
+        assert queries.count == 0
+
+    def test_unknown_cursor_format_is_rejected(self, client, sample_post):
+        assert client.get("/?after=garbage").status_code == 400
+
+    def test_metrics(self, admin_client, sample_post):
+        admin_client.get("/")
+        stats = admin_client.get("/admin/metrics").json()["content_snapshot"]
+
+        assert stats["built"] is True
+        assert stats["posts"] == 1
+        assert stats["kib_per_1k_posts"] > 0
+        assert stats["refresh_ms"] >= stats["build_ms"] >= 0
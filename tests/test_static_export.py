@@ -0,0 +1,130 @@
+"""Tests for the static site export."""
+import asyncio
+import re
+
+import pytest
+
+from db_utils.content_version import bump_content_version
+from db_utils.models import Post
+from render_utils.markdown import render_post
+from render_utils import static_export
+from render_utils.static_export import export_site, write_atomic
+
+
+def _export(tmp_path, base_url="https://example.com", **kwargs):
+    from main import app
+    return asyncio.run(export_site(app, tmp_path, base_url, **kwargs))
+
+
+class TestExport:
+    def test_full_export_writes_all_pages(self, tmp_path, sample_post):
+        report = _export(tmp_path)
+
+        for name in ["index.html", "posts/test-post.html", "feed.xml", "sitemap.xml", "404.html",
+                     "examples/cpu_and_memory.html"]:
+            assert name in report["rendered"]
+            assert (tmp_path / name).exists()
+
+        assert "Test Post" in (tmp_path / "posts/test-post.html").read_text()
+        assert "https://example.com/static/styles.css" in (tmp_path / "index.html").read_text()
+        assert "https://example.com/posts/test-post" in (tmp_path / "sitemap.xml").read_text()
+        assert "404" in (tmp_path / "404.html").read_text()
+
+    def test_second_export_is_a_no_op(self, tmp_path, sample_post):
+        _export(tmp_path)
+        report = _export(tmp_path)
+
+        assert report["rendered"] == []
+        assert "posts/test-post.html" in report["skipped"]
+
+    def test_changed_post_only_rerenders_affected_pages(self, tmp_path, sample_post, db):
+        other = Post(title="Other", slug="other", summary="O", post_content="O")
+        db.add(other)
+        db.commit()
+        _export(tmp_path)
+
+        other.post_content = "Changed body"
+        render_post(other)
+        bump_content_version(db)
+        db.commit()
+        report = _export(tmp_path)
+
+        assert report["rendered"] == ["posts/other.html"]
+        assert "Changed body" in (tmp_path / "posts/other.html").read_text()
+
+    def test_deleted_post_is_removed(self, tmp_path, sample_post, db):
+        _export(tmp_path)
+        db.delete(sample_post)
+        bump_content_version(db)
+        db.commit()
+
+        report = _export(tmp_path)
+        assert "posts/test-post.html" in report["removed"]
+        assert not (tmp_path / "posts/test-post.html").exists()
+
+    def test_new_base_url_rerenders_every_page(self, tmp_path, sample_post):
+        first = _export(tmp_path)
+        report = _export(tmp_path, base_url="https://mirror.example.org")
+
+        assert sorted(report["rendered"]) == sorted(first["rendered"])
+        assert "https://mirror.example.org/static/styles.css" in (tmp_path / "index.html").read_text()
+        assert "https://example.com" not in (tmp_path / "posts/test-post.html").read_text()
+
+    def test_force_rerenders_everything(self, tmp_path, sample_post):
+        _export(tmp_path)
+        report = _export(tmp_path, force=True)
+        assert report["skipped"] == []
+
+    def test_large_pages_get_gzip_sibling(self, tmp_path, sample_post):
+        _export(tmp_path)
+        assert (tmp_path / "index.html.gz").exists()
+
+
+    def test_concurrent_exports_take_turns(self, tmp_path, sample_post, monkeypatch):
+        from main import app
+
+        rendering, overlaps = set(), []
+        fetch_page = static_export.fetch_page
+
+        async def tracked(app, base_url, path):
+            overlaps.append(bool(rendering))
+            rendering.add(path)
+            try:
+                return await fetch_page(app, base_url, path)
+            finally:
+                rendering.discard(path)
+
+        monkeypatch.setattr(static_export, "fetch_page", tracked)
+
+        async def run():
+            return await asyncio.gather(*(export_site(app, tmp_path, "https://example.com") for _ in range(2)))
+
+        first, second = asyncio.run(run())
+
+        assert not any(overlaps)
+        # The second starts from the first one's manifest
+        assert second["rendered"] == [] or first["rendered"] == []
+
+
+class TestWriteAtomic:
+    def test_replaces_file_without_leftovers(self, tmp_path):
+        target = tmp_path / "page.html"
+        write_atomic(target, b"one")
+        write_atomic(target, b"two")
+
+        assert target.read_bytes() == b"two"
+        assert [p.name for p in tmp_path.iterdir()] == ["page.html"]
+
+
+class TestAdminTrigger:
+    def test_export_button_rebuilds(self, admin_client, sample_post, tmp_path, monkeypatch):
+        monkeypatch.setattr(static_export, "EXPORT_DIR", str(tmp_path))
+        monkeypatch.setattr(static_export, "SITE_URL", "https://example.com")
+
+        resp = admin_client.get("/admin/")
+        assert "Rebuild Static Site" in resp.text
+        csrf = re.search(r'name="csrf_token"\s+value="([^"]+)"', resp.text).group(1)
+
+        resp = admin_client.post("/admin/export", data={"csrf_token": csrf}, follow_redirects=False)
+        assert resp.status_code == 303
+        assert (tmp_path / "posts/test-post.html").exists()
@@ -0,0 +1,68 @@
+"""Tests for streamed template rendering and render timings."""
+import pytest
+
+from db_utils.models import Post, Tag
+from render_utils import streaming
+from render_utils.streaming import _coalesce, render_timings
+
+
+@pytest.fixture()
+def streaming_on(monkeypatch):
+    monkeypatch.setattr(streaming, "STREAM_TEMPLATES", True)
+    render_timings.clear()
+
+
+class TestCoalesce:
+    def test_small_events_are_grouped(self):
+        assert list(_coalesce(["a", "b", "c"], 10)) == ["abc"]
+
+    def test_buffer_flushed_before_large_event(self):
+        chunks = list(_coalesce(["<head>", "x" * 50, "</html>"], 10))
+        assert chunks == ["<head>", "x" * 50, "</html>"]
+
+    def test_full_buffer_is_flushed(self):
+        assert list(_coalesce(["aaaa", "bbbb", "cc"], 8)) == ["aaaabbbb", "cc"]
+
+
+class TestStreamedPages:
+    def test_post_page_is_streamed(self, client, streaming_on, db):
+        tag = Tag(name="linux")
+        db.add(Post(title="Streamed", slug="streamed", summary="S", post_content="**body**", tags=[tag]))
+        db.commit()
+
+        resp = client.get("/posts/streamed", headers={"Accept-Encoding": "identity"})
+        assert resp.status_code == 200
+        assert "content-length" not in resp.headers
+        assert resp.text.startswith("<!DOCTYPE html>")
+        assert "<strong>body</strong>" in resp.text
+        assert "linux" in resp.text
+
+    def test_streamed_page_is_cached(self, client, streaming_on, sample_post):
+        first = client.get("/", headers={"Accept-Encoding": "identity"})
+        second = client.get("/", headers={"Accept-Encoding": "identity"})
+
+        assert second.headers["x-cache"] == "HIT"
+        assert first.text == second.text
+
+    def test_streamed_page_keeps_validators(self, client, streaming_on, sample_post):
+        resp = client.get("/posts/test-post")
+        assert resp.headers["etag"]
+        assert resp.headers["last-modified"]
+
+
+class TestRenderTimings:
+    def test_timings_recorded_per_route_and_mode(self, client, streaming_on, sample_post):
+        client.get("/posts/test-post")
+        stats = render_timings.stats()["show_post:stream"]
+
+        assert stats["count"] == 1
+        assert 0 <= stats["ttfb_ms_avg"] <= stats["render_ms_avg"]
+
+    def test_buffered_mode_recorded(self, client, sample_post):
+        render_timings.clear()
+        client.get("/")
+        assert render_timings.stats()["root:buffered"]["count"] == 1
+
+    def test_timings_in_metrics(self, admin_client, sample_post):
+        admin_client.get("/")
+        assert "render_timings" in admin_client.get("/admin/metrics").json()
@@ -0,0 +1,80 @@
+"""Tests for bulk tag lookup and tag syncing."""
+from sqlalchemy import event
+
+from db_utils.models import Post, Tag
+from db_utils.tags import get_or_create_tags, parse_tag_names, sync_tags
+
+
+class TestParseTagNames:
+    def test_strips_blanks_and_repeats(self):
+        assert parse_tag_names(" python, ,linux,python ") == ["python", "linux"]
+
+    def test_empty(self):
+        assert parse_tag_names("") == []
+
+
+class TestGetOrCreateTags:
+    def test_existing_tags_in_one_query(self, db, count_queries):
+        db.add_all([Tag(name=f"tag-{i}") for i in range(10)])
+        db.commit()
+
+        with count_queries() as queries:
+            tags = get_or_create_tags(db, [f"tag-{i}" for i in range(10)])
+
+        assert [tag.name for tag in tags] == [f"tag-{i}" for i in range(10)]
+        assert queries.count == 1
+
+    def test_missing_tags_inserted_in_bulk(self, db, sample_tag, count_queries):
+        names = ["python", "a", "b", "c"]
+
+        with count_queries() as queries:
+            tags = get_or_create_tags(db, names)
+
+        assert [tag.name for tag in tags] == names
+        assert tags[0].id == sample_tag.id
+        assert queries.count == 3
+        assert db.query(Tag).count() == 4
+
+    def test_concurrently_created_tag_is_reused(self, db):
+        from tests.conftest import engine
+
+        # Another writer inserts "python" between our lookup and our insert
+        def race(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT INTO tags"):
+                cursor.execute("INSERT INTO tags (name) VALUES ('python')")
+
+        event.listen(engine, "before_cursor_execute", race)
+        try:
+            tags = get_or_create_tags(db, ["python", "linux"])
+        finally:
+            event.remove(engine, "before_cursor_execute", race)
+
+        assert [tag.name for tag in tags] == ["python", "linux"]
+        assert db.query(Tag).filter(Tag.name == "python").count() == 1
+
+    def test_empty(self, db, count_queries):
+        with count_queries() as queries:
+            assert get_or_create_tags(db, []) == []
+        assert queries.count == 0
+
+
+class TestSyncTags:
+    def test_unchanged_tags_are_a_no_op(self, db, sample_post, count_queries):
+        sync_tags(db, sample_post, "python,linux")
+        db.commit()
+
+        with count_queries() as queries:
+            assert sync_tags(db, sample_post, "linux, python") is False
+            db.commit()
+
+        assert not any(sql.startswith(("INSERT", "DELETE", "UPDATE")) for sql in queries.statements)
+
+    def test_changed_tags(self, db, sample_post):
+        sync_tags(db, sample_post, "python,linux")
+        db.commit()
+
+        assert sync_tags(db, sample_post, "python") is True
+        db.commit()
+
+        db.refresh(sample_post)
+        assert [tag.name for tag in sample_post.tags] == ["python"]
@@ -0,0 +1,34 @@
+"""Tests for the Jinja environment modes."""
+from main import TEMPLATE_DIR
+from render_utils.templates import create_environment, precompile_templates
+
+
+class TestTemplateEnvironment:
+    def test_development_mode_reloads(self):
+        env = create_environment(TEMPLATE_DIR, production=False)
+        assert env.auto_reload
+        assert env.bytecode_cache is None
+
+    def test_production_mode_disables_reload(self, tmp_path):
+        env = create_environment(TEMPLATE_DIR, production=True, cache_dir=str(tmp_path))
+        assert not env.auto_reload
+        assert env.bytecode_cache is not None
+
+    def test_precompile_writes_bytecode_for_every_template(self, tmp_path):
+        env = create_environment(TEMPLATE_DIR, production=True, cache_dir=str(tmp_path))
+        names = precompile_templates(env)
+
+        assert "post.html" in names
+        assert "examples/cpu_and_memory.html" in names
+        assert len(list(tmp_path.iterdir())) == len(names)
+
+    def test_new_worker_loads_from_bytecode_cache(self, tmp_path, monkeypatch):
+        precompile_templates(create_environment(TEMPLATE_DIR, production=True, cache_dir=str(tmp_path)))
+
+        fresh = create_environment(TEMPLATE_DIR, production=True, cache_dir=str(tmp_path))
+
+        def fail(*args, **kwargs):
+            raise AssertionError("template was recompiled")
+
+        monkeypatch.setattr(fresh, "compile", fail)
+        assert fresh.get_template("home.html") is not None
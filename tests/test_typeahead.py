@@ -0,0 +1,172 @@
+"""Tests for the in-memory typeahead index and /search/suggest."""
+import re
+
+import pytest
+
+from db_utils.models import Post, Tag
+from search_utils.typeahead import TypeaheadIndex, typeahead
+
+
+ROWS = [
+    ("post", "Kernel modules", "kernel-modules"),
+    ("post", "Loading kernel modules at boot", "insmod-and-modprobe"),
+    ("post", "Secure boot on Linux", "secure-boot"),
+    ("post", "Café notes", "cafe-notes"),
+    ("tag", "kernel", "kernel"),
+    ("tag", "linux", "linux"),
+]
+
+
+def _labels(index, query, **kwargs):
+    return [suggestion.label for suggestion in index.suggest(query, **kwargs)]
+
+
+def _get_csrf(response):
+    match = re.search(r'name="csrf_token"\s+value="([^"]+)"', response.text)
+    if match:
+        return match.group(1)
+    raise ValueError("CSRF token not found")
+
+
+@pytest.fixture()
+def posts(db):
+    tag = Tag(name="kernel")
+    db.add_all([
+        Post(title="Kernel modules", slug="kernel-modules", summary="S", post_content="x", tags=[tag]),
+        Post(title="Secure boot", slug="secure-boot", summary="S", post_content="x"),
+        Tag(name="unused"),
+    ])
+    db.commit()
+
+
+class TestTypeaheadIndex:
+    def test_prefix_of_any_word(self):
+        index = TypeaheadIndex(ROWS)
+
+        assert _labels(index, "modu") == ["Kernel modules", "Loading kernel modules at boot"]
+
+    def test_labels_starting_with_the_query_come_first(self):
+        index = TypeaheadIndex(ROWS)
+
+        assert _labels(index, "kern") == [
+            "Kernel modules", "kernel", "Loading kernel modules at boot",
+        ]
+
+    def test_posts_before_tags_then_shorter_first(self):
+        index = TypeaheadIndex(ROWS)
+
+        assert _labels(index, "lin") == ["linux", "Secure boot on Linux"]
+        assert _labels(index, "boo") == ["Secure boot on Linux", "Loading kernel modules at boot"]
+
+    def test_every_query_word_must_match(self):
+        index = TypeaheadIndex(ROWS)
+
+        assert _labels(index, "boot kern") == ["Loading kernel modules at boot"]
+
+    def test_slug_words_match(self):
+        index = TypeaheadIndex(ROWS)
+
+        assert _labels(index, "modprobe") == ["Loading kernel modules at boot"]
+
+    def test_accents_are_ignored(self):
+        index = TypeaheadIndex(ROWS)
+
+        assert _labels(index, "cafe") == ["Café notes"]
+        assert _labels(index, "CAFÉ") == ["Café notes"]
+
+    def test_typo_falls_back_to_closest_word(self):
+        index = TypeaheadIndex(ROWS)
+
+        assert _labels(index, "kernal") == [
+            "Kernel modules", "Loading kernel modules at boot", "kernel",
+        ]
+        assert _labels(index, "zzzz") == []
+
+    def test_blank_query(self):
+        index = TypeaheadIndex(ROWS)
+
+        assert _labels(index, "") == []
+        assert _labels(index, " !? ") == []
+
+    def test_limit(self):
+        index = TypeaheadIndex(ROWS)
+
+        assert len(_labels(index, "kern", limit=2)) == 2
+
+    def test_urls(self):
+        index = TypeaheadIndex(ROWS)
+        urls = {suggestion.label: suggestion.url for suggestion in index.suggest("linux")}
+
+        assert urls == {"Secure boot on Linux": "/posts/secure-boot", "linux": "/search?q=linux"}
+
+    def test_memory_and_build_time_are_reported(self):
+        index = TypeaheadIndex(ROWS, version=3)
+
+        assert index.posts == 4
+        assert index.memory_bytes() > 0
+        assert index.build_seconds > 0
+
+
+class TestSuggestRoute:
+    def test_index_is_built_at_startup(self, posts, client):
+        assert typeahead.index is not None
+        assert typeahead.index.posts == 2
+
+    def test_suggestions(self, posts, client):
+        resp = client.get("/search/suggest", params={"q": "ker"})
+
+        assert resp.status_code == 200
+        assert resp.json() == {
+            "query": "ker",
+            "suggestions": [
+                {"kind": "post", "label": "Kernel modules", "url": "/posts/kernel-modules"},
+                {"kind": "tag", "label": "kernel", "url": "/search?q=kernel"},
+            ],
+        }
+        assert resp.headers["server-timing"].startswith("suggest;dur=")
+
+    def test_tags_without_posts_are_left_out(self, posts, client):
+        assert client.get("/search/suggest", params={"q": "unused"}).json()["suggestions"] == []
+
+    def test_lookup_runs_no_queries(self, posts, client, count_queries):
+        client.get("/search/suggest", params={"q": "sec"})
+
+        with count_queries() as queries:
+            resp = client.get("/search/suggest", params={"q": "boot"})
+
+        assert resp.json()["suggestions"][0]["label"] == "Secure boot"
+        assert queries.count == 0
+
+    def test_rebuilt_after_admin_write(self, posts, admin_client):
+        assert admin_client.get("/search/suggest", params={"q": "tracing"}).json()["suggestions"] == []
+        rebuilds = typeahead.rebuilds
+
+        csrf = _get_csrf(admin_client.get("/admin/posts/new"))
+        resp = admin_client.post(
+            "/admin/posts/new",
+            data={
+                "title": "Tracing with eBPF",
+                "meta_title": "",
+                "slug": "tracing-ebpf",
+                "summary": "S",
+                "tags_input": "",
+                "post_content": "Body",
+                "publish_date": "",
+                "csrf_token": csrf,
+            },
+            follow_redirects=False,
+        )
+        assert resp.status_code == 303
+
+        labels = [s["label"] for s in admin_client.get("/search/suggest", params={"q": "tracing"}).json()["suggestions"]]
+        assert labels == ["Tracing with eBPF"]
+        assert typeahead.rebuilds == rebuilds + 1
+
+    def test_metrics_report_the_index(self, posts, admin_client):
+        admin_client.get("/search/suggest", params={"q": "ker"})
+        stats = admin_client.get("/admin/metrics").json()["typeahead"]
+
+        assert stats["built"] is True
+        assert stats["posts"] == 2
+        assert stats["memory_bytes_per_1k_posts"] > 0
+        assert stats["lookups"] == 1